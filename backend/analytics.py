@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from models import Product, CRITICALITY_LEVELS
+from columnar import ProductColumns, BatchReorderCalculator
+from reorder_logic import ReorderCalculator
+from store import Change, ProductStore
+
+# Urgency buckets for recommendations, by days of stock remaining
+URGENCY_LEVELS = ('critical', 'urgent', 'moderate')
+
+# Inventory value is accumulated in fixed-point units of 1/10000 so that
+# adding and subtracting products never drifts the running total
+_VALUE_SCALE = 10000
+
+
+def urgency_level(days_remaining: float) -> str:
+    """Urgency bucket of a recommendation"""
+    if days_remaining <= 3:
+        return 'critical'
+    elif days_remaining <= 7:
+        return 'urgent'
+    return 'moderate'
+
+
+class InventoryAggregates:
+    """Running dashboard aggregates, updated from store changes.
+
+    The criticality breakdown, urgency buckets, recommendation count and
+    total inventory value are adjusted by each change (subtracting the old
+    product and adding the new one), so reading the summary is O(1). With a
+    BatchReorderCalculator, the initial catalog is counted from the store's
+    columns in one vectorized pass.
+    """
+
+    def __init__(self, calculator: ReorderCalculator, store: Optional[ProductStore] = None):
+        self.calculator = calculator
+        self.product_count = 0
+        self.criticality_breakdown = {level: 0 for level in CRITICALITY_LEVELS}
+        self.urgency_levels = {level: 0 for level in URGENCY_LEVELS}
+        self.recommendation_count = 0
+        self._inventory_value = 0
+
+        if store is not None:
+            if isinstance(calculator, BatchReorderCalculator):
+                self._load(store.columns())
+            else:
+                self.apply([(None, product) for product in store])
+            store.subscribe(self.apply)
+
+    @property
+    def total_inventory_value(self) -> float:
+        return self._inventory_value / _VALUE_SCALE
+
+    def apply(self, changes: List[Change]):
+        """Update the aggregates from a list of (old, new) store changes"""
+        for old, new in changes:
+            if old is not None:
+                self._count(old, -1)
+            if new is not None:
+                self._count(new, 1)
+
+    def _load(self, columns: ProductColumns):
+        """Count a whole catalog from its columns, exactly as apply() would product by product"""
+        self.product_count += len(columns)
+        for code, count in enumerate(np.bincount(columns.criticality_code, minlength=len(CRITICALITY_LEVELS))):
+            self.criticality_breakdown[CRITICALITY_LEVELS[code]] += int(count)
+        # np.rint rounds half to even, like round()
+        self._inventory_value += int(np.rint(columns.current_stock * columns.cost_per_unit * _VALUE_SCALE)
+                                     .astype(np.int64).sum())
+        _, rounded_days, _ = self.calculator.recommended_days(columns)
+        self.recommendation_count += len(rounded_days)
+        for days_remaining in rounded_days:
+            self.urgency_levels[urgency_level(days_remaining)] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Current aggregates in the shape of the /api/analytics payload"""
+        return {
+            "product_count": self.product_count,
+            "criticality_breakdown": dict(self.criticality_breakdown),
+            "urgency_levels": dict(self.urgency_levels),
+            "recommendation_count": self.recommendation_count,
+            "total_inventory_value": round(self.total_inventory_value, 2)
+        }
+
+    def _count(self, product: Product, sign: int):
+        self.product_count += sign
+        self.criticality_breakdown[product.criticality] += sign
+        self._inventory_value += sign * round(product.current_stock * product.cost_per_unit * _VALUE_SCALE)
+
+        recommendation = self.calculator.process_product(product)
+        if recommendation:
+            self.recommendation_count += sign
+            self.urgency_levels[urgency_level(recommendation['days_remaining'])] += sign
@@ -1,49 +1,134 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
-import copy
+from datetime import date, datetime, timedelta, timezone
+import atexit
+import json
+import math
+import os
+import threading
+import time
 
 # Import your existing modules
 from models import Product
-from reorder_logic import ReorderCalculator
+from columnar import BatchReorderCalculator
 from simulator import DemandSpikeSimulator
-from report import ReorderReportGenerator
+from report import ReorderReportGenerator, csv_fieldnames, csv_headers
 from sample_data import get_sample_products
+from store import ProductStore
+from ingest import DecodedLines, ProductIngestor, SUPPORTED_FORMATS, iter_records
+from persistence import SQLiteRepository
+from shared_inventory import SharedInventory
+from recommendation_index import RecommendationIndex
+from product_index import ProductIndex, INSERTION_ORDER
+from analytics import InventoryAggregates
+from http_cache import ConditionalGet
+from metrics import REGISTRY, instrument_store
+from change_feed import ChangeFeed
+from fragment_cache import FragmentCache, assemble_json, encode_json
+from sales import SalesIngestor, day_and_fraction
+from planner import BudgetPlanner
+from projection import StockProjector, schedule_arrivals
 
 app = Flask(__name__)
-CORS(app) # This allows your React app to connect
+CORS(app, expose_headers=['Date', 'ETag']) # This allows your React app to connect
 
-# --- In-Memory Data Store ---
-# This acts as a simple database. It's initialized once and then modified by API calls.
-products_in_memory = get_sample_products()
+# --- Data Store ---
+# Products and orders are persisted in SQLite and served from the in-memory store.
+# Set WAREHOUSE_DB to choose the database file (":memory:" for a throwaway store);
+# a relative path is taken from this directory, not from where the server starts.
+# Every worker process (e.g. under gunicorn) shares the database: writes take
+# product_store.lock, which serializes them across threads and processes, and
+# each request first catches up on writes made by other workers.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+database = os.environ.get('WAREHOUSE_DB', 'warehouse.db')
+repository = SQLiteRepository(database if database == ':memory:' else os.path.join(BACKEND_DIR, database))
+shared_inventory = SharedInventory(repository)
+product_store: ProductStore = shared_inventory.store
+atexit.register(repository.write_snapshot)
 
-# Initialize system components
-calculator = ReorderCalculator()
+# Sample data is only a fixture for an empty database; disable with WAREHOUSE_SEED_SAMPLE_DATA=0
+if os.environ.get('WAREHOUSE_SEED_SAMPLE_DATA', '1') == '1':
+    with product_store.lock:
+        if not len(product_store):
+            product_store.add_many(get_sample_products())
+
+# Initialize system components; the batch calculator also lets the indexes
+# below build from the store's columns in one vectorized pass at startup
+calculator = BatchReorderCalculator()
 simulator = DemandSpikeSimulator()
 reporter = ReorderReportGenerator()
+planner = BudgetPlanner()
+projector = StockProjector()
+
+# Recommendations are kept up to date as products change, so reads never
+# re-evaluate the whole catalog
+recommendation_index = RecommendationIndex(calculator, product_store)
+# Product rows and their sort indexes are precomputed for paginated reads
+product_index = ProductIndex(calculator, product_store)
+# Dashboard counters and totals are adjusted on every change
+inventory_aggregates = InventoryAggregates(calculator, product_store)
+
+# Small delta events per store version, pushed to clients by /api/changes/stream
+change_feed = ChangeFeed(calculator, product_store, product_index.build_row)
+
+# Sales events keep current_stock and average_daily_sales up to date
+sales_ingestor = SalesIngestor(product_store, repository=repository)
+
+# Pre-encoded JSON per product row and recommendation; list responses are
+# assembled from these fragments instead of re-encoding every row
+fragment_cache = FragmentCache(product_store)
+
+# Read endpoints answer 304 / cached bodies while the catalog version is unchanged.
+# The ETag is the shared database version (with the database's generation ID),
+# which every worker process reports alike once it has caught up, so a
+# conditional GET gets its 304 whichever worker serves it. Bodies carry no
+# timestamp (it would be frozen in the cache); the time a response was
+# produced is in its Date header instead.
+conditional_get = ConditionalGet(lambda: shared_inventory.version, scope=f"{repository.generation():x}")
+
+# --- Instrumentation ---
+# Request latency per route, operation timings (see metrics.timed), mutation
+# counters and catalog gauges, all served at /api/metrics
+REQUEST_LATENCY = REGISTRY.histogram('warehouse_http_request_duration_seconds',
+                                     'HTTP request latency by route', ['method', 'endpoint'])
+REQUESTS = REGISTRY.counter('warehouse_http_requests_total',
+                            'HTTP requests by route and status code', ['method', 'endpoint', 'status'])
+REGISTRY.gauge('warehouse_recommendations', 'Products currently needing a reorder',
+               lambda: len(recommendation_index))
+instrument_store(product_store)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def refresh_inventory():
+    # One indexed read of the shared version; replays other workers' writes if behind
+    shared_inventory.refresh()
+
+@app.after_request
+def record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by route pattern, not the raw path, to keep the series count bounded
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, endpoint)
+        REQUESTS.inc(1, request.method, endpoint, str(response.status_code))
+    return response
 
 # --- ✨ NEW: API Endpoint to Add a New Product ---
 @app.route('/api/products/add', methods=['POST'])
 def add_product():
-    global products_in_memory
     data = request.get_json()
     try:
-        # Check if product ID already exists
-        if any(p.product_id == data.get('product_id') for p in products_in_memory):
-            return jsonify({"error": f"Product ID '{data.get('product_id')}' already exists."}), 409
-
-        # Create a new Product object with proper type casting
-        new_product = Product(
-            product_id=str(data.get('product_id')),
-            current_stock=int(data.get('current_stock')),
-            incoming_stock=int(data.get('incoming_stock', 0)),
-            average_daily_sales=float(data.get('average_daily_sales')),
-            lead_time_days=int(data.get('lead_time_days')),
-            min_reorder_quantity=int(data.get('min_reorder_quantity')),
-            cost_per_unit=float(data.get('cost_per_unit')),
-            criticality=str(data.get('criticality'))
-        )
-        products_in_memory.append(new_product)
+        with product_store.lock:
+            # Check if product ID already exists
+            if str(data.get('product_id')) in product_store:
+                return jsonify({"error": f"Product ID '{data.get('product_id')}' already exists."}), 409
+
+            # Create a new Product object with proper type casting
+            new_product = Product.from_dict(data)
+            product_store.add(new_product)
         return jsonify({"message": f"Product '{new_product.product_id}' added successfully."}), 201
 
     except (ValueError, TypeError) as e:
@@ -51,39 +136,69 @@ def add_product():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- API Endpoint to Bulk-Load Products from CSV or NDJSON ---
+@app.route('/api/products/bulk', methods=['POST'])
+def bulk_add_products():
+    """Stream-parse a CSV or NDJSON request body and add every valid product in one batch"""
+    catalog_format = request.args.get('format')
+    if catalog_format is None:
+        catalog_format = 'ndjson' if 'ndjson' in (request.content_type or '') else 'csv'
+    if catalog_format not in SUPPORTED_FORMATS:
+        return jsonify({"error": "Unsupported format, use csv or ndjson"}), 400
+
+    try:
+        # Rows with invalid UTF-8 are reported like any other unparseable row
+        lines = DecodedLines(request.stream)
+        # Duplicate checks and the commit see the same catalog state
+        with product_store.lock:
+            result = ProductIngestor(product_store).ingest(iter_records(lines, catalog_format))
+        return jsonify(result), 201 if result['accepted'] else 400
+    except Exception as e:
+        print(f"Error in bulk_add_products: {e}")
+        return jsonify({"error": str(e)}), 500
+
 # --- ✨ NEW: API Endpoint to Delete a Product ---
 @app.route('/api/products/delete/<product_id>', methods=['DELETE'])
 def delete_product(product_id):
-    global products_in_memory
-    product_to_delete = next((p for p in products_in_memory if p.product_id == product_id), None)
-    
-    if product_to_delete:
-        products_in_memory.remove(product_to_delete)
+    if product_store.remove(product_id):
         return jsonify({"message": f"Product '{product_id}' deleted successfully."})
     else:
         return jsonify({"error": "Product not found."}), 404
 
+# Upper bound on the units of one order line, far below what SQLite's 64-bit integers hold
+MAX_ORDER_QUANTITY = 1_000_000
+
+def _order_quantity(value):
+    """A purchase order quantity as an integer in [1, MAX_ORDER_QUANTITY]; raises ValueError otherwise"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("quantity must be an integer")
+    try:
+        quantity = int(value)
+    except ValueError:
+        raise ValueError("quantity must be an integer")
+    if not 0 < quantity <= MAX_ORDER_QUANTITY:
+        raise ValueError(f"quantity must be between 1 and {MAX_ORDER_QUANTITY:,}")
+    return quantity
+
 # --- MODIFIED: API Endpoint to Create an Order ---
 @app.route('/api/create-order', methods=['POST'])
 def create_order():
-    global products_in_memory
-    data = request.get_json()
-    product_id = data.get('product_id')
-    quantity = data.get('quantity')
-
-    if not all([product_id, quantity]):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('product_id') or data.get('quantity') is None:
         return jsonify({"error": "product_id and quantity are required"}), 400
+    product_id = str(data['product_id'])
+    try:
+        quantity = _order_quantity(data['quantity'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    product_found = False
-    for product in products_in_memory:
-        if product.product_id == product_id:
-            # Ensure quantity is an integer before adding
-            product.incoming_stock += int(quantity)
-            product_found = True
-            break
-    
-    if not product_found:
-        return jsonify({"error": "Product not found"}), 404
+    # The increment is atomic across threads and workers, and the stock
+    # update and the order record are committed together
+    with product_store.lock:
+        if product_id not in product_store:
+            return jsonify({"error": "Product not found"}), 404
+        product = product_store.increment(product_id, incoming_stock=quantity)
+        repository.record_order(product_id, quantity)
 
     return jsonify({
         "message": f"Order for {quantity} units of {product_id} created successfully. Incoming stock updated.",
@@ -91,82 +206,338 @@ def create_order():
         "new_incoming_stock": product.incoming_stock
     })
 
+# --- API Endpoints for Sales Events ---
+@app.route('/api/sales/events', methods=['POST'])
+def ingest_sales_events():
+    """Apply a batch of sales events: {"events": [{product_id, quantity, timestamp?}, ...]} or NDJSON.
+
+    Stock is decremented (never below 0) and each SKU's demand velocity is
+    updated incrementally, with one store update per SKU per batch.
+    """
+    try:
+        if 'ndjson' in (request.content_type or ''):
+            records = iter_records(DecodedLines(request.stream), 'ndjson')
+        else:
+            data = request.get_json()
+            events = data.get('events') if isinstance(data, dict) else data
+            if not isinstance(events, list):
+                return jsonify({"error": "events must be a list"}), 400
+            records = enumerate(events, 1)
+        result = sales_ingestor.ingest(records)
+        return jsonify(result), 200 if result['accepted'] or not result['rejected'] else 400
+    except Exception as e:
+        print(f"Error in ingest_sales_events: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/sales/<product_id>', methods=['GET'])
+def get_sales_velocity(product_id):
+    """Current demand estimate of a product from its tracked sales.
+
+    average_daily_sales is the stored value, updated on each sale; velocity
+    and window_average are decayed to today, so an idle SKU shows its
+    falling demand before its next sale updates the store. velocity also
+    counts today's sales so far (see sales.DemandTracker).
+    """
+    product = product_store.get(product_id)
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+    state = sales_ingestor.state(product_id)
+    tracker = sales_ingestor.tracker
+    today, fraction = day_and_fraction()
+    return jsonify({
+        "product_id": product_id,
+        "average_daily_sales": product.average_daily_sales,
+        "velocity": None if state is None else round(tracker.velocity(state, today, fraction), 4),
+        "tracked": state is not None,
+        "last_sale_day": None if state is None else datetime.fromtimestamp(state.day * 86400, timezone.utc).date().isoformat(),
+        "window_days": tracker.window_days,
+        "window_average": None if state is None else round(tracker.window_average(state, today), 4)
+    })
+
+# Upper bound on lines per batch order, to keep one transaction reasonably short
+MAX_ORDER_LINES = 10000
+
+@app.route('/api/orders/batch', methods=['POST'])
+def create_orders_batch():
+    """Create purchase orders for many products at once, all or nothing.
+
+    Body: {"orders": [{"product_id": ..., "quantity": ...}, ...]}. Lines
+    without a quantity use suggested_reorder_quantity, so the output of
+    /api/recommendations can be posted as is. Every line is validated
+    first; if any is invalid nothing is applied and the per-line errors are
+    returned. Otherwise the incoming_stock updates are applied in one store
+    batch (one index and analytics update) and recorded in one transaction.
+    """
+    data = request.get_json(silent=True)
+    lines = data.get('orders') if isinstance(data, dict) else data
+    if not isinstance(lines, list) or not lines:
+        return jsonify({"error": "orders must be a non-empty list"}), 400
+    if len(lines) > MAX_ORDER_LINES:
+        return jsonify({"error": f"At most {MAX_ORDER_LINES} order lines per batch"}), 400
+
+    try:
+        with product_store.lock:
+            results, increments = [], {}
+            for number, line in enumerate(lines, 1):
+                try:
+                    product_id = str(line['product_id'])
+                    quantity = _order_quantity(line['quantity'] if line.get('quantity') is not None
+                                               else line['suggested_reorder_quantity'])
+                    if product_id not in product_store:
+                        raise ValueError("Product not found")
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    error = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+                    results.append({"line": number, "status": "error", "error": error})
+                    continue
+                increments[product_id] = increments.get(product_id, 0) + quantity
+                results.append({"line": number, "status": "ok", "product_id": product_id, "quantity": quantity})
+
+            errors = [result for result in results if result["status"] == "error"]
+            if errors:
+                return jsonify({
+                    "error": f"{len(errors)} invalid order line(s); no orders were created",
+                    "results": results
+                }), 400
+
+            updated = product_store.increment_many({product_id: {"incoming_stock": quantity}
+                                                    for product_id, quantity in increments.items()})
+            repository.record_orders([(result["product_id"], result["quantity"]) for result in results])
+
+        incoming = {product.product_id: product.incoming_stock for product in updated}
+        for result in results:
+            result["new_incoming_stock"] = incoming[result["product_id"]]
+        return jsonify({
+            "message": f"Created {len(results)} orders for {len(incoming)} products.",
+            "results": results,
+            "timestamp": datetime.now().isoformat()
+        }), 201
+    except Exception as e:
+        print(f"Error in create_orders_batch: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
 
-# --- MODIFIED: All endpoints below now use `products_in_memory` ---
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request latencies, operation timings, counters and gauges"""
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
+# --- MODIFIED: All endpoints below now read from `product_store` ---
 
 @app.route('/api/products', methods=['GET'])
+@conditional_get
 def get_products():
-    """Get all products with their current status from memory"""
-    global products_in_memory
+    """Get products with their current status, optionally filtered, sorted and paginated.
+
+    Query parameters: criticality and warehouse (comma-separated), needs_reorder
+    (true/false), min_days_remaining, max_days_remaining, sort (any product column),
+    order (asc/desc), limit and cursor (the next_cursor of the previous page).
+    total_count is the number of products matching the filters, across all pages.
+    """
     try:
-        products_data = []
-        for product in products_in_memory:
-            days_remaining = calculator.calculate_days_remaining(product)
-            needs_reorder = calculator.needs_reorder(product)
-            
-            product_data = {
-                'product_id': product.product_id,
-                'current_stock': product.current_stock,
-                'incoming_stock': product.incoming_stock,
-                'average_daily_sales': product.average_daily_sales,
-                'lead_time_days': product.lead_time_days,
-                'min_reorder_quantity': product.min_reorder_quantity,
-                'cost_per_unit': product.cost_per_unit,
-                'criticality': product.criticality,
-                'days_remaining': round(days_remaining, 1),
-                'needs_reorder': needs_reorder,
-                'safety_threshold': calculator.calculate_safety_threshold(product)
-            }
-            products_data.append(product_data)
+        args = request.args
+        criticality = args.get('criticality')
+        needs_reorder = args.get('needs_reorder')
+        warehouse = args.get('warehouse')
+        filters = dict(
+            criticality=criticality.split(',') if criticality else None,
+            needs_reorder=None if needs_reorder is None else needs_reorder.lower() in ('1', 'true', 'yes'),
+            min_days_remaining=args.get('min_days_remaining', type=float),
+            max_days_remaining=args.get('max_days_remaining', type=float),
+            warehouse=warehouse.split(',') if warehouse else None
+        )
+        # Lock-free read, retried if a write overlaps it
+        (products_data, next_cursor), total_count = product_store.read(lambda: (
+            product_index.query(sort=args.get('sort', INSERTION_ORDER),
+                                descending=args.get('order', 'asc') == 'desc',
+                                cursor=args.get('cursor'),
+                                limit=args.get('limit', type=int),
+                                **filters),
+            product_index.count(**filters)
+        ))
         
-        return jsonify({
-            "products": products_data,
-            "total_count": len(products_data),
-            "timestamp": datetime.now().isoformat()
-        })
+        body = assemble_json({
+            "total_count": total_count,
+            "next_cursor": next_cursor
+        }, "products", fragment_cache.fragments('product', products_data))
+        return Response(body, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_products: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/recommendations', methods=['GET'])
+@conditional_get
 def get_recommendations():
-    """Get reorder recommendations based on data in memory"""
-    global products_in_memory
+    """Get reorder recommendations based on data in memory.
+
+    Optional query parameters: limit (the N most urgent),
+    max_days_remaining (everything stocking out within that many days) and
+    warehouse (one site; all warehouses are merged by default).
+    """
     try:
-        recommendations = calculator.generate_reorder_recommendations(products_in_memory)
-        return jsonify({
-            "recommendations": recommendations,
-            "timestamp": datetime.now().isoformat()
-        })
+        limit = request.args.get('limit', type=int)
+        max_days_remaining = request.args.get('max_days_remaining', type=float)
+        warehouse = request.args.get('warehouse') or None
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
+        recommendations = product_store.read(
+            lambda: recommendation_index.recommendations(limit=limit, max_days_remaining=max_days_remaining,
+                                                         warehouse=warehouse))
+        body = assemble_json({}, "recommendations", fragment_cache.fragments('recommendation', recommendations))
+        return Response(body, mimetype='application/json')
     except Exception as e:
         print(f"Error in get_recommendations: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/plan', methods=['POST'])
+def plan_purchases():
+    """Fit the reorder recommendations to a purchasing budget.
+
+    Body: {"budget": amount, "warehouse": optional site}. Returns the
+    orders to place with their quantities (full or partial), the deferred
+    recommendations and the totals (see planner.BudgetPlanner). The orders
+    can be posted to /api/orders/batch as they are.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or data.get('budget') is None:
+        return jsonify({"error": "budget is required"}), 400
+    try:
+        budget = float(data['budget'])
+        # NaN and infinity would make the response invalid JSON
+        if not math.isfinite(budget) or budget < 0:
+            raise ValueError("budget must be a finite, non-negative amount")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid budget: {e}"}), 400
+    warehouse = data.get('warehouse')
+    if warehouse is not None and not isinstance(warehouse, str):
+        return jsonify({"error": "warehouse must be a string"}), 400
+
+    try:
+        plan = planner.plan(product_store.columns().select(warehouse=warehouse), budget)
+        plan["timestamp"] = datetime.now().isoformat()
+        return jsonify(plan)
+    except Exception as e:
+        print(f"Error in plan_purchases: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Bounds of the projection query parameters
+MAX_PROJECTION_DAYS = 365
+
+@app.route('/api/projection', methods=['GET'])
+@conditional_get.varying(lambda: date.today().isoformat())
+def get_projection():
+    """Projected on-hand stock curves and stockout dates, soonest stockout first.
+
+    Query parameters: horizon_days (default 90), points per curve (default
+    31, at most horizon_days + 1), limit, warehouse and product_id
+    (comma-separated). Open purchase
+    orders land lead_time_days after they were placed (see
+    projection.schedule_arrivals); orders older than the longest lead time
+    are overdue and read as per-product totals. Every curve is sampled on
+    the same days, returned once as "days". Days count from today, so the
+    ETag also changes with the date.
+    """
+    args = request.args
+    horizon_days = args.get('horizon_days', 90, type=int)
+    limit = args.get('limit', type=int)
+    if not 0 < horizon_days <= MAX_PROJECTION_DAYS:
+        return jsonify({"error": f"horizon_days must be between 1 and {MAX_PROJECTION_DAYS}"}), 400
+    points = args.get('points', min(31, horizon_days + 1), type=int)
+    # More points than days would only repeat samples, and a huge count would be allocated first
+    if not 2 <= points <= horizon_days + 1:
+        return jsonify({"error": f"points must be between 2 and horizon_days + 1 ({horizon_days + 1})"}), 400
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    product_ids = args.get('product_id')
+    columns = product_store.columns().select(warehouse=args.get('warehouse'),
+                                             product_ids=product_ids.split(',') if product_ids else None)
+    today = date.today()
+    longest_lead_time = int(columns.lead_time_days.max()) if len(columns) else 0
+    orders, earlier = repository.orders_since(today - timedelta(days=longest_lead_time))
+    projection = projector.project(columns, horizon_days, points,
+                                   schedule_arrivals(columns, orders, today, earlier))
+
+    order, stockouts = projector.soonest_stockouts(projection, limit)
+    return jsonify({
+        "horizon_days": horizon_days,
+        "start_date": today.isoformat(),
+        "days": projection['days'].tolist(),
+        "stockouts_within_horizon": stockouts,
+        "total_count": len(columns),
+        "projections": projector.rows(columns, projection, order, today)
+    })
+
+@app.route('/api/warehouses', methods=['GET'])
+@conditional_get
+def get_warehouses():
+    """Warehouses with their product and recommendation counts"""
+    products, recommendations = product_store.read(
+        lambda: (product_index.value_counts('warehouse'), recommendation_index.warehouses()))
+    return jsonify({
+        "warehouses": [
+            {"warehouse": warehouse, "products": count, "recommendations": recommendations.get(warehouse, 0)}
+            for warehouse, count in sorted(products.items())
+        ]
+    })
+
+# Bounds of the spike simulation parameters; a Monte Carlo run holds
+# scenarios x SKUs matrices for every day of the horizon
+MAX_SPIKE_MULTIPLIER = 100.0
+MAX_SIMULATION_DAYS = 365
+MAX_SCENARIOS = 10000
+MAX_RISK_PRODUCTS = 1000
+MAX_SCENARIO_CELLS = 1_000_000
+
+def _bounded_int(data, name, default, low, high):
+    """An integer request field within [low, high]; raises ValueError otherwise"""
+    value = data.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
 @app.route('/api/simulate-spike', methods=['POST'])
 def simulate_demand_spike():
     """Simulate demand spike without changing the persistent in-memory data"""
-    global products_in_memory
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('product_id'):
+        return jsonify({"error": "product_id is required"}), 400
+    product_id = str(data['product_id'])
     try:
-        data = request.get_json()
-        product_id = data.get('product_id')
-        multiplier = data.get('multiplier', 3.0)
-        days = data.get('days', 7)
-        
-        if not product_id:
-            return jsonify({"error": "product_id is required"}), 400
-        
-        products_for_simulation = copy.deepcopy(products_in_memory)
-        
-        simulated_products = simulator.simulate_spike(
-            products_for_simulation, product_id, multiplier, days
-        )
+        multiplier = float(data.get('multiplier', 3.0))
+        if not 0 < multiplier <= MAX_SPIKE_MULTIPLIER:
+            raise ValueError(f"multiplier must be above 0 and at most {MAX_SPIKE_MULTIPLIER:g}")
+        days = _bounded_int(data, 'days', 7, 0, MAX_SIMULATION_DAYS)
+        scenarios = data.get('scenarios')
+        if scenarios:
+            scenarios = _bounded_int(data, 'scenarios', None, 1, MAX_SCENARIOS)
+            horizon_days = _bounded_int(data, 'horizon_days', 60, 1, MAX_SIMULATION_DAYS)
+            seed = None if data.get('seed') is None else _bounded_int(data, 'seed', None, 0, 2 ** 63 - 1)
+            risk_ids = data.get('risk_product_ids') or [product_id]
+            if not isinstance(risk_ids, list) or len(risk_ids) > MAX_RISK_PRODUCTS:
+                raise ValueError(f"risk_product_ids must be a list of at most {MAX_RISK_PRODUCTS} IDs")
+            if scenarios * len(risk_ids) > MAX_SCENARIO_CELLS:
+                raise ValueError(f"scenarios x risk products must be at most {MAX_SCENARIO_CELLS:,}")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid simulation parameters: {e}"}), 400
+
+    try:
+        # The scenario overlay copies only the spiked product; the live store is untouched
+        scenario = simulator.simulate_spike(product_store, product_id, multiplier, days)
         
-        recommendations = calculator.generate_reorder_recommendations(simulated_products)
+        recommendations = product_store.read(lambda: recommendation_index.recommendations_for(scenario))
         
-        return jsonify({
+        response = {
             "simulation": {
                 "product_id": product_id,
                 "multiplier": multiplier,
@@ -174,77 +545,79 @@ def simulate_demand_spike():
             },
             "recommendations": recommendations,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+        
+        # Optional Monte Carlo run: stockout risk for the spiked product (or the given list)
+        if scenarios:
+            risk_products = [p for p in map(product_store.get, map(str, risk_ids)) if p is not None]
+            response["stockout_risk"] = simulator.simulate_stockout_risk(
+                risk_products, product_id, multiplier, days,
+                scenarios=scenarios,
+                horizon_days=horizon_days,
+                seed=seed
+            )
+        
+        return jsonify(response)
     except Exception as e:
         print(f"Error in simulate_demand_spike: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/analytics', methods=['GET'])
+@conditional_get
 def get_analytics():
-    """Get analytics data for dashboard from memory"""
-    global products_in_memory
+    """Get the analytics summary for the dashboard from running aggregates (O(1))"""
     try:
-        recommendations = calculator.generate_reorder_recommendations(products_in_memory)
-        
-        criticality_breakdown = {'high': 0, 'medium': 0, 'low': 0}
-        stock_levels = []
-        
-        for product in products_in_memory:
-            criticality_breakdown[product.criticality] += 1
-            days_remaining = calculator.calculate_days_remaining(product)
-            
-            stock_levels.append({
-                'product_id': product.product_id,
-                'days_remaining': round(days_remaining, 1),
-                'criticality': product.criticality,
-                'current_stock': product.current_stock
-            })
-        
-        urgency_levels = {'critical': 0, 'urgent': 0, 'moderate': 0}
-        for rec in recommendations:
-            if rec['days_remaining'] <= 3:
-                urgency_levels['critical'] += 1
-            elif rec['days_remaining'] <= 7:
-                urgency_levels['urgent'] += 1
-            else:
-                urgency_levels['moderate'] += 1
-        
-        total_inventory_value = sum(p.current_stock * p.cost_per_unit for p in products_in_memory)
-        
-        return jsonify({
-            "criticality_breakdown": criticality_breakdown,
-            "stock_levels": stock_levels,
-            "urgency_levels": urgency_levels,
-            "total_inventory_value": round(total_inventory_value, 2),
-            "timestamp": datetime.now().isoformat()
-        })
+        return jsonify(product_store.read(inventory_aggregates.summary))
     except Exception as e:
         print(f"Error in get_analytics: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analytics/stock-levels', methods=['GET'])
+@conditional_get
+def get_stock_levels():
+    """Get per-SKU stock levels, optionally paginated with limit and cursor"""
+    try:
+        rows, next_cursor = product_store.read(lambda: product_index.query(
+            sort=request.args.get('sort', INSERTION_ORDER),
+            descending=request.args.get('order', 'asc') == 'desc',
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        ))
+        body = assemble_json({
+            "next_cursor": next_cursor
+        }, "stock_levels", fragment_cache.fragments('stock_level', rows, _encode_stock_level))
+        return Response(body, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_stock_levels: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def _encode_stock_level(row):
+    return encode_json({
+        'product_id': row['product_id'],
+        'days_remaining': row['days_remaining'],
+        'criticality': row['criticality'],
+        'current_stock': row['current_stock']
+    })
+
 @app.route('/api/export', methods=['POST'])
 def export_data():
-    """Export recommendations data from memory"""
-    global products_in_memory
+    """Export recommendations data from memory; "with_warehouse" adds a Warehouse column to CSV"""
     try:
         data = request.get_json()
         export_format = data.get('format', 'csv')
+        with_warehouse = bool(data.get('with_warehouse'))
         
-        recommendations = calculator.generate_reorder_recommendations(products_in_memory)
+        recommendations = product_store.read(recommendation_index.recommendations)
         
         if export_format == 'csv':
             csv_data = []
-            headers = ['Product ID', 'Current Stock', 'Incoming Stock', 'Days Remaining',
-                       'Suggested Reorder Quantity', 'Estimated Cost', 'Criticality', 'Lead Time Days']
-            csv_data.append(headers)
+            csv_data.append(csv_headers(with_warehouse))
             
+            fieldnames = csv_fieldnames(with_warehouse)
             for rec in recommendations:
-                row = [
-                    rec['product_id'], rec['current_stock'], rec['incoming_stock'],
-                    rec['days_remaining'], rec['suggested_reorder_quantity'],
-                    rec['estimated_cost'], rec['criticality'], rec['lead_time_days']
-                ]
-                csv_data.append(row)
+                csv_data.append([rec[field] for field in fieldnames])
             
             return jsonify({
                 "format": "csv", "data": csv_data,
@@ -271,6 +644,95 @@ def export_data():
         print(f"Error in export_data: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/export/stream', methods=['GET'])
+def export_stream():
+    """Stream recommendations as a chunked CSV or NDJSON download; ?with_warehouse=true adds a CSV column"""
+    export_format = request.args.get('format', 'csv')
+    with_warehouse = request.args.get('with_warehouse', '').lower() in ('1', 'true', 'yes')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # Rows are pulled lazily from the recommendation index while the response is sent
+    if export_format == 'csv':
+        body = reporter.iter_csv(iter(recommendation_index), with_warehouse=with_warehouse)
+        mimetype, extension = 'text/csv', 'csv'
+    elif export_format == 'ndjson':
+        body = reporter.iter_ndjson(iter(recommendation_index))
+        mimetype, extension = 'application/x-ndjson', 'ndjson'
+    else:
+        return jsonify({"error": "Unsupported export format"}), 400
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=reorder_report_{timestamp}.{extension}"}
+    )
+
+# Open change streams per worker process, each holding a thread for its lifetime;
+# gunicorn.conf.py keeps this below the worker's thread count
+MAX_STREAMS = int(os.environ.get('WAREHOUSE_MAX_STREAMS', '48'))
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+# How often the process's poller checks for other workers' writes to push
+STREAM_POLL_SECONDS = 1.0
+
+@app.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    """Server-Sent Events feed of product and recommendation deltas.
+
+    Every batch ends with an event ID that encodes the store version, so
+    browsers resume from where they left off via Last-Event-ID (or ?since=
+    with an event ID). Clients that cannot resume get a 'resync' event and
+    should refetch. A comment line is sent every keepalive seconds.
+
+    Streams wait on the change feed, which one poller thread per process
+    wakes when another worker commits, so an idle stream does no work.
+    Each stream still holds a connection and a thread for its lifetime:
+    at most MAX_STREAMS streams are open per process, beyond which clients
+    get a 503, leaving the worker's other threads (see gunicorn.conf.py)
+    for ordinary requests.
+    """
+    keepalive = request.args.get('keepalive', 15, type=float)
+    if not math.isfinite(keepalive) or keepalive <= 0:
+        return jsonify({"error": "keepalive must be a positive number of seconds"}), 400
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({"error": "Too many open change streams, retry later"}), 503, {'Retry-After': '5'}
+    shared_inventory.start_polling(STREAM_POLL_SECONDS)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    since = change_feed.parse_event_id(last_event_id)
+
+    def events():
+        version = change_feed.version if since is None else since
+        # The first message tells the client where the stream starts, or that
+        # its ID (from another worker or before a restart) cannot be resumed
+        if last_event_id and since is None:
+            yield "retry: 3000\n" + _sse(change_feed.event_id(version), [{'type': 'resync', 'version': version}])
+        else:
+            yield f"retry: 3000\nid: {change_feed.event_id(version)}\n\n"
+        while True:
+            # Every batch up to `latest` is already logged when it is read
+            latest = change_feed.version
+            batches = change_feed.events_since(version)
+            if batches is None:
+                yield _sse(change_feed.event_id(latest), [{'type': 'resync', 'version': latest}])
+            else:
+                for batch_version, batch in batches:
+                    yield _sse(change_feed.event_id(batch_version), batch)
+            version = max(version, latest)
+
+            if not change_feed.wait(version, timeout=keepalive):
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the response is closed, whether or not the stream was ever iterated
+    response.call_on_close(stream_slots.release)
+    return response
+
+def _sse(event_id, batch):
+    """Encode a batch as SSE events; only the last carries the ID so a dropped batch is resent whole"""
+    lines = [f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in batch]
+    lines[-1] = f"id: {event_id}\n" + lines[-1]
+    return ''.join(lines)
+
 if __name__ == '__main__':
     print("Starting Flask server...")
     app.run(debug=True, host='localhost', port=5000)
\ No newline at end of file
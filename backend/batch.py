@@ -0,0 +1,169 @@
+import csv
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from columnar import ProductColumns, BatchReorderCalculator
+from ingest import DecodedLines, detect_format, iter_records, validate_record
+from reorder_logic import CRITICALITY_ORDER
+from report import csv_fieldnames
+
+# Sorted-run rows are the criticality rank followed by these fields; the warehouse is always kept
+_RUN_FIELDNAMES = csv_fieldnames(with_warehouse=True)
+# Position of days_remaining in a sorted-run row
+_DAYS_COLUMN = _RUN_FIELDNAMES.index('days_remaining') + 1
+# Recommendation fields that are numbers, for turning run rows back into recommendations
+_INT_FIELDS = ('current_stock', 'incoming_stock', 'suggested_reorder_quantity', 'lead_time_days')
+_FLOAT_FIELDS = ('days_remaining', 'estimated_cost')
+
+
+def _process_chunk(fmt: str, header: Optional[bytes], lines: List[bytes], first_row: int,
+                   run_path: str, max_errors: int) -> Dict[str, Any]:
+    """Validate one chunk of raw catalog lines and write its sorted recommendations to a run file"""
+    products, errors = [], []
+    rejected = 0
+    seen = set()
+    for row_number, record in iter_records(DecodedLines(([header] if header else []) + lines), fmt):
+        product, error = validate_record(record)
+        if product is not None and product.product_id in seen:
+            product, error = None, f"Product ID '{product.product_id}' already exists."
+        if product is None:
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append({'row': first_row + row_number - 1, 'error': error})
+            continue
+        seen.add(product.product_id)
+        products.append(product)
+
+    recommendations = BatchReorderCalculator().generate_reorder_recommendations_batch(
+        ProductColumns.from_products(products))
+    with open(run_path, 'w', newline='', encoding='utf-8') as run:
+        writer = csv.writer(run)
+        for rec in recommendations:
+            writer.writerow([CRITICALITY_ORDER[rec['criticality']]] + [rec[field] for field in _RUN_FIELDNAMES])
+    return {
+        'accepted': len(products),
+        'rejected': rejected,
+        'errors': errors,
+        'recommendations': len(recommendations),
+        'total_cost': sum(rec['estimated_cost'] for rec in recommendations)
+    }
+
+
+def _run_key(row: List[str]) -> Tuple[int, float]:
+    return int(row[0]), float(row[_DAYS_COLUMN])
+
+
+def _as_recommendation(row: List[str]) -> Dict[str, Any]:
+    rec = dict(zip(_RUN_FIELDNAMES, row[1:]))
+    for field in _INT_FIELDS:
+        rec[field] = int(rec[field])
+    for field in _FLOAT_FIELDS:
+        rec[field] = float(rec[field])
+    return rec
+
+
+class CatalogBatchRunner:
+    """Reorder analysis of catalog files of any size in bounded memory.
+
+    The file is read in chunks of `chunk_size` lines, and each chunk is
+    validated and evaluated by the batch engine on a worker process. Each
+    worker writes its recommendations, already sorted, to a run file in a
+    temporary directory. Only `workers * 2` chunks are in flight at a time.
+    The runs are then k-way merged with heapq.merge, which is stable, so
+    the output has exactly the (criticality, days_remaining, catalog order)
+    ordering of the in-memory path. The merged rows are streamed straight
+    into the CSV, and only the first `top` recommendations are kept for the
+    printed report. The CSV has the warehouse column only with
+    `with_warehouse`, like ReorderReportGenerator.export_to_csv.
+
+    Duplicate product IDs are rejected within a chunk but not across chunks,
+    which would need memory proportional to the catalog.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 100_000, max_errors: int = 10):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def iter_chunks(self, catalog, fmt: str) -> Iterator[Tuple[Optional[bytes], List[bytes], int]]:
+        """(CSV header, raw lines, number of the first row) for each chunk of a binary catalog file"""
+        header = next(catalog, None) if fmt == 'csv' else None
+        row = 1
+        while True:
+            lines = list(islice(catalog, self.chunk_size))
+            if not lines:
+                return
+            yield header, lines, row
+            row += sum(1 for line in lines if line.strip())
+
+    def run(self, filename: str, output: Optional[str] = None, top: int = 20,
+            fmt: Optional[str] = None, with_warehouse: bool = False) -> Dict[str, Any]:
+        """Analyze a CSV or NDJSON catalog, writing all recommendations to `output` if given"""
+        fmt = fmt or detect_format(filename)
+        totals = {'accepted': 0, 'rejected': 0, 'errors': [], 'recommendations': 0, 'total_cost': 0.0}
+        start = time.perf_counter()
+
+        def collect(result: Dict[str, Any]):
+            for key in ('accepted', 'rejected', 'recommendations', 'total_cost'):
+                totals[key] += result[key]
+            totals['errors'].extend(result['errors'][:self.max_errors - len(totals['errors'])])
+            processed = totals['accepted'] + totals['rejected']
+            print(f"\r⏳ {processed:,} SKUs processed "
+                  f"({processed / (time.perf_counter() - start):,.0f} SKUs/s)", end='', flush=True)
+
+        with tempfile.TemporaryDirectory() as tmp, open(filename, 'rb') as catalog:
+            runs = []
+            pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+            try:
+                pending = deque()
+                for header, lines, first_row in self.iter_chunks(catalog, fmt):
+                    run_path = os.path.join(tmp, f"run-{len(runs):05d}.csv")
+                    runs.append(run_path)
+                    args = (fmt, header, lines, first_row, run_path, self.max_errors)
+                    if pool is None:
+                        collect(_process_chunk(*args))
+                        continue
+                    pending.append(pool.submit(_process_chunk, *args))
+                    if len(pending) >= self.workers * 2:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+            totals['analysis_seconds'] = time.perf_counter() - start
+            print()
+
+            totals['top'] = self._merge(runs, output, top, with_warehouse)
+        totals['elapsed_seconds'] = time.perf_counter() - start
+        totals['chunks'] = len(runs)
+        return totals
+
+    def _merge(self, runs: List[str], output: Optional[str], top: int,
+               with_warehouse: bool = False) -> List[Dict[str, Any]]:
+        """K-way merge the sorted runs into the output CSV; returns the first `top` recommendations"""
+        files = [open(path, newline='', encoding='utf-8') for path in runs]
+        try:
+            merged = merge(*(csv.reader(f) for f in files), key=_run_key)
+            if output is None:
+                return [_as_recommendation(row) for row in islice(merged, top)]
+            first = []
+            fieldnames = csv_fieldnames(with_warehouse)
+            end = len(fieldnames) + 1
+            with open(output, 'w', newline='', encoding='utf-8') as out:
+                writer = csv.writer(out)
+                writer.writerow(fieldnames)
+                for row in merged:
+                    if len(first) < top:
+                        first.append(_as_recommendation(row))
+                    writer.writerow(row[1:end])
+            return first
+        finally:
+            for f in files:
+                f.close()
@@ -0,0 +1,323 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from typing import Any, Callable, Dict, List
+
+from models import Product
+from reorder_logic import ReorderCalculator
+from columnar import ProductColumns, ProductTable, BatchReorderCalculator
+from store import ProductStore
+from recommendation_index import RecommendationIndex
+from product_index import ProductIndex
+from analytics import InventoryAggregates
+from simulator import DemandSpikeSimulator
+from report import ReorderReportGenerator
+from sales import SalesIngestor
+from sharding import ShardedCatalog
+from planner import BudgetPlanner
+from projection import StockProjector
+from synthetic_data import get_synthetic_products
+
+# The pre-slots Product layout: a plain dataclass with a per-instance __dict__ (and the same defaults)
+LegacyProduct = make_dataclass('LegacyProduct', [
+    (f.name, f.type) if f.default is MISSING else (f.name, f.type, field(default=f.default))
+    for f in fields(Product)
+])
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(name: str, func: Callable[[], Any], repeat: int, items: int = 1,
+            track_memory: bool = True) -> Dict[str, Any]:
+    """Time `repeat` calls of func and record throughput, latency percentiles and peak memory.
+
+    `items` is the amount of work done per call (SKUs, rows, requests) and
+    is used for the throughput figure. Peak memory comes from one extra
+    call under tracemalloc, kept apart so tracing does not skew the timings.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        'name': name,
+        'calls': repeat,
+        'throughput': items * repeat / total if total else float('inf'),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_mb': None if peak is None else peak / 1e6
+    }
+
+
+def bench_components(products: List[Product], repeat: int) -> List[Dict[str, Any]]:
+    """Calculator, batch engine, incremental indexes, simulator and report exporter"""
+    size = len(products)
+    results = []
+    calculator = ReorderCalculator()
+    batch_calculator = BatchReorderCalculator()
+    columns = ProductColumns.from_products(products)
+
+    expected = calculator.generate_reorder_recommendations(products)
+    if batch_calculator.generate_reorder_recommendations_batch(columns) != expected:
+        raise AssertionError("Batch engine output differs from the per-product path")
+
+    results.append(measure('calculator.generate_reorder_recommendations',
+                           lambda: calculator.generate_reorder_recommendations(products), repeat, size))
+    results.append(measure('batch.generate_reorder_recommendations_batch',
+                           lambda: batch_calculator.generate_reorder_recommendations_batch(columns), repeat, size))
+    results.append(measure('calculator.iter_reorder_recommendations',
+                           lambda: sum(1 for _ in calculator.iter_reorder_recommendations(products)), repeat, size))
+
+    # Budget planning over the whole catalog, with a budget that funds about a tenth of the recommendations
+    planner = BudgetPlanner(batch_calculator)
+    budget = sum(rec['estimated_cost'] for rec in expected) / 10
+    results.append(measure('planner.plan (10% budget)', lambda: planner.plan(columns, budget), repeat, size))
+
+    projector = StockProjector()
+    results.append(measure('projector.project (90 days)', lambda: projector.project(columns, 90), repeat, size))
+
+    # Hash-partitioned shards in worker processes, k-way merged; each shard only ships its top 1000
+    for shards in (1, 2, 4):
+        with ShardedCatalog(products, by='hash', shards=shards) as catalog:
+            results.append(measure(f'sharded top-1000 recommendations ({shards} shards)',
+                                   lambda: catalog.recommendations(limit=1000), repeat, size, track_memory=False))
+
+    store = ProductStore(products)
+    results.append(measure('RecommendationIndex build',
+                           lambda: RecommendationIndex(calculator, store), repeat, size))
+    recommendation_index = RecommendationIndex(calculator, store)
+    ProductIndex(calculator, store)
+    InventoryAggregates(calculator, store)
+
+    # Single-product mutation with every incremental listener attached
+    rng = random.Random(7)
+    ids = [p.product_id for p in products]
+    updates = 1000
+
+    def update_products():
+        for _ in range(updates):
+            product_id = rng.choice(ids)
+            store.update(product_id, incoming_stock=store.get(product_id).incoming_stock + 1)
+
+    result = measure('store.update (all listeners)', update_products, max(1, repeat), updates, track_memory=False)
+    for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+        result[key] /= updates
+    results.append(result)
+
+    # Sales events with a long-tailed SKU mix, aggregated per SKU per batch
+    ingestor = SalesIngestor(store)
+    weights = [1 / (rank + 1) for rank in range(size)]
+    events = 20000
+    clock = [1_760_000_000]
+
+    def ingest_sales():
+        start = clock[0]
+        clock[0] += events
+        skus = rng.choices(ids, weights=weights, k=events)
+        ingestor.ingest(enumerate({'product_id': product_id, 'quantity': 1, 'timestamp': start + i}
+                                  for i, product_id in enumerate(skus)))
+
+    results.append(measure('sales_ingestor.ingest (20k events)', ingest_sales, repeat, events, track_memory=False))
+
+    simulator = DemandSpikeSimulator()
+
+    def simulate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario = simulator.simulate_spike(store, rng.choice(ids), 3.0, 7)
+        return recommendation_index.recommendations_for(scenario)
+
+    results.append(measure('simulate_spike + recommendations_for', simulate, repeat * 5))
+
+    sample = products[:min(size, 2000)]
+    scenarios = 200
+    results.append(measure('monte_carlo (2k SKUs x 200 scenarios)',
+                           lambda: simulator.simulate_stockout_risk(sample, scenarios=scenarios, seed=1, workers=1),
+                           1, len(sample) * scenarios))
+
+    reporter = ReorderReportGenerator()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.csv')
+
+        def export():
+            with contextlib.redirect_stdout(io.StringIO()):
+                reporter.export_to_csv(iter(recommendation_index), path)
+
+        results.append(measure('report.export_to_csv (streaming)', export, repeat, len(recommendation_index)))
+    return results
+
+
+def bench_endpoints(products: List[Product], repeat: int) -> List[Dict[str, Any]]:
+    """Latency of the Flask endpoints through the test client, bypassing the response cache"""
+    os.environ['WAREHOUSE_DB'] = ':memory:'
+    os.environ['WAREHOUSE_SEED_SAMPLE_DATA'] = '0'
+    import app as server
+
+    server.product_store.add_many(products)
+    client = server.app.test_client()
+    product_id = products[0].product_id
+    requests = [
+        ('GET /api/products?limit=100', lambda: client.get('/api/products?limit=100')),
+        ('GET /api/products?sort=days_remaining&limit=100',
+         lambda: client.get('/api/products?sort=days_remaining&limit=100')),
+        ('GET /api/products (full)', lambda: client.get('/api/products')),
+        ('GET /api/recommendations', lambda: client.get('/api/recommendations')),
+        ('GET /api/analytics', lambda: client.get('/api/analytics')),
+        ('GET /api/export/stream', lambda: client.get('/api/export/stream?format=csv')),
+        ('POST /api/create-order', lambda: client.post('/api/create-order',
+                                                       json={'product_id': product_id, 'quantity': 1})),
+        ('POST /api/simulate-spike', lambda: client.post('/api/simulate-spike',
+                                                         json={'product_id': product_id})),
+    ]
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, call in requests:
+            def uncached(name=name, call=call):
+                server.conditional_get.cache.clear()
+                response = call()
+                response.get_data()
+                if response.status_code >= 400:
+                    raise AssertionError(f"{name} failed with {response.status_code}")
+            results.append(measure(name, uncached, repeat * 5))
+    return results
+
+
+def bench_memory(products: List[Product]) -> List[Dict[str, Any]]:
+    """Bytes per SKU of the product representations (excluding product_id strings)"""
+    # Raw text rows, as read from a catalog file, so every layout owns its values
+    rows = [
+        (p.product_id, str(p.current_stock), str(p.incoming_stock), str(p.average_daily_sales),
+         str(p.lead_time_days), str(p.min_reorder_quantity), str(p.cost_per_unit), p.criticality, p.warehouse)
+        for p in products
+    ]
+
+    def parsed(cls):
+        return (cls(pid, int(stock), int(incoming), float(sales), int(lead), int(moq), float(cost), crit, site)
+                for pid, stock, incoming, sales, lead, moq, cost, crit, site in rows)
+
+    def bytes_per_sku(build):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            result = build()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del result
+        return (after - before) / len(rows)
+
+    return [
+        {'name': 'bytes/SKU dataclass with __dict__', 'value': bytes_per_sku(lambda: list(parsed(LegacyProduct)))},
+        {'name': 'bytes/SKU slotted Product', 'value': bytes_per_sku(lambda: list(parsed(Product)))},
+        {'name': 'bytes/SKU ProductTable', 'value': bytes_per_sku(lambda: ProductTable(parsed(Product)))},
+    ]
+
+
+def print_results(title: str, results: List[Dict[str, Any]]):
+    print(f"\n{'='*110}")
+    print(title)
+    print("="*110)
+    for r in results:
+        if 'value' in r:
+            print(f"{r['name']:<50} {r['value']:>10.1f}")
+            continue
+        peak = '-' if r['peak_mb'] is None else f"{r['peak_mb']:.1f}"
+        print(f"{r['name']:<50} {r['throughput']:>12,.0f}/s  p50 {r['p50_ms']:8.2f} ms"
+              f"  p95 {r['p95_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  peak {peak:>7} MB")
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     tolerance: float) -> List[str]:
+    """Compare against a saved run; slower p50 or lower throughput beyond tolerance is a regression"""
+    previous = {r['name']: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get(r['name'])
+        if old is None or 'p50_ms' not in r:
+            continue
+        if r['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{r['name']}: p50 {old['p50_ms']:.2f} -> {r['p50_ms']:.2f} ms")
+        elif r['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append(f"{r['name']}: throughput {old['throughput']:,.0f} -> {r['throughput']:,.0f}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Smart Warehouse Reordering System benchmarks')
+    parser.add_argument('--skus', type=int, default=100_000,
+                        help='Number of SKUs in the synthetic catalog (default: 100000)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Seed for the synthetic catalog (default: 42)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetitions per measurement (default: 3)')
+    parser.add_argument('--suite', choices=['components', 'endpoints', 'memory', 'all'], default='all',
+                        help='Which benchmarks to run (default: all)')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Save the results as JSON, e.g. as a baseline for later runs')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Compare against a saved run and exit non-zero on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown before a result counts as a regression (default: 0.25)')
+    args = parser.parse_args()
+
+    products = get_synthetic_products(args.skus, args.seed)
+    print(f"📦 Synthetic catalog: {args.skus:,} SKUs (seed {args.seed})")
+
+    results = []
+    if args.suite in ('components', 'all'):
+        component_results = bench_components(products, args.repeat)
+        print_results("⚙️  COMPONENTS", component_results)
+        results += component_results
+    if args.suite in ('endpoints', 'all'):
+        endpoint_results = bench_endpoints(products, args.repeat)
+        print_results("🌐 API ENDPOINTS (uncached)", endpoint_results)
+        results += endpoint_results
+    if args.suite in ('memory', 'all'):
+        memory_results = bench_memory(products)
+        print_results("🧠 MEMORY", memory_results)
+        results += memory_results
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as out:
+            json.dump({'skus': args.skus, 'seed': args.seed, 'results': results}, out, indent=2)
+        print(f"\n📄 Results saved to: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\n🚨 Performance regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from models import Product, PRODUCT_FIELDS
+from reorder_logic import ReorderCalculator
+from store import Change, ProductStore
+
+# Event types pushed to clients
+EVENT_TYPES = ('product_added', 'product_updated', 'product_removed',
+               'recommendation_entered', 'recommendation_updated', 'recommendation_left', 'resync')
+
+Event = Dict[str, Any]
+
+
+class ChangeFeed:
+    """A bounded log of small change events, one batch per store version.
+
+    Each store mutation becomes a few delta events: product added, updated
+    (only the fields that changed, plus the derived columns) or removed,
+    and recommendation entered, updated or left. Events carry the store
+    version they produced, and clients resume by passing back the last
+    version they saw.
+
+    Batches larger than BULK_THRESHOLD (a catalog load, for example) are
+    sent as a single 'resync' event that tells clients to refetch, rather
+    than as thousands of deltas. Clients that fall behind the retained
+    window, or that resume against another process, also get a 'resync'.
+    """
+
+    BULK_THRESHOLD = 256
+
+    def __init__(self, calculator: ReorderCalculator, store: ProductStore,
+                 build_row: Callable[[Product], Dict[str, Any]], max_batches: int = 1000):
+        self.calculator = calculator
+        self.store = store
+        self.build_row = build_row
+        # Event IDs are prefixed with a per-process boot ID, like ETags, so
+        # a resume against another process or after a restart is detected
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._batches: Deque[Tuple[int, List[Event]]] = deque(maxlen=max_batches)
+        # Latest version processed, and the oldest a client can resume from
+        self.version = store.version
+        self._floor = store.version
+        self._condition = threading.Condition()
+        store.subscribe(self.apply)
+
+    def event_id(self, version: int) -> str:
+        return f"{self.boot_id}-{version}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Version encoded in an event ID from this process, or None"""
+        if not event_id:
+            return None
+        boot_id, _, version = event_id.partition('-')
+        if boot_id != self.boot_id or not version.isdigit():
+            return None
+        return int(version)
+
+    def apply(self, changes: List[Change]):
+        """Store listener: turn a batch of changes into events for the new version"""
+        version = self.store.version
+        if len(changes) > self.BULK_THRESHOLD:
+            events = [{'type': 'resync', 'version': version}]
+        else:
+            events = []
+            for old, new in changes:
+                events.extend(self._events(old, new, version))
+        with self._condition:
+            if events:
+                if len(self._batches) == self._batches.maxlen:
+                    self._floor = self._batches[0][0]
+                self._batches.append((version, events))
+            self.version = version
+            self._condition.notify_all()
+
+    def events_since(self, version: int) -> Optional[List[Tuple[int, List[Event]]]]:
+        """Event batches newer than version, or None if they are no longer retained"""
+        with self._condition:
+            if version < self._floor:
+                return None
+            return [(v, events) for v, events in self._batches if v > version]
+
+    def wait(self, version: int, timeout: float) -> bool:
+        """Block until a version newer than the given one is processed or the timeout expires"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version > version, timeout)
+
+    def _events(self, old: Optional[Product], new: Optional[Product], version: int) -> List[Event]:
+        events: List[Event] = []
+        if new is None:
+            events.append({'type': 'product_removed', 'version': version, 'product_id': old.product_id})
+        elif old is None:
+            events.append({'type': 'product_added', 'version': version, 'product': self.build_row(new)})
+        else:
+            changed = {name: getattr(new, name) for name in PRODUCT_FIELDS
+                       if getattr(new, name) != getattr(old, name)}
+            if not changed:
+                return events
+            row = self.build_row(new)
+            changed.update(days_remaining=row['days_remaining'], needs_reorder=row['needs_reorder'],
+                           safety_threshold=row['safety_threshold'])
+            events.append({'type': 'product_updated', 'version': version,
+                           'product_id': new.product_id, 'changes': changed})
+
+        before = self.calculator.process_product(old) if old is not None else None
+        after = self.calculator.process_product(new) if new is not None else None
+        if before and not after:
+            events.append({'type': 'recommendation_left', 'version': version, 'product_id': old.product_id})
+        elif after and not before:
+            events.append({'type': 'recommendation_entered', 'version': version, 'recommendation': after})
+        elif after and after != before:
+            events.append({'type': 'recommendation_updated', 'version': version, 'recommendation': after})
+        return events
@@ -0,0 +1,316 @@
+from array import array
+from dataclasses import replace
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
+
+from models import Product, Criticality, DEFAULT_WAREHOUSE
+from reorder_logic import ReorderCalculator, CRITICALITY_ORDER
+from metrics import timed
+
+# Criticality labels indexed by their integer code (same order as the sort order)
+CRITICALITY_LABELS = sorted(CRITICALITY_ORDER, key=CRITICALITY_ORDER.get)
+
+
+class ProductColumns:
+    """Column arrays for a product catalog, consumed by the vectorized batch engine"""
+
+    def __init__(self, product_ids: List[str], current_stock, incoming_stock,
+                 average_daily_sales, lead_time_days, min_reorder_quantity,
+                 cost_per_unit, criticality_code, warehouses: Optional[List[str]] = None):
+        self.product_ids = product_ids if isinstance(product_ids, list) else list(product_ids)
+        self.current_stock = np.asarray(current_stock, dtype=np.int64)
+        self.incoming_stock = np.asarray(incoming_stock, dtype=np.int64)
+        self.average_daily_sales = np.asarray(average_daily_sales, dtype=np.float64)
+        self.lead_time_days = np.asarray(lead_time_days, dtype=np.int64)
+        self.min_reorder_quantity = np.asarray(min_reorder_quantity, dtype=np.int64)
+        self.cost_per_unit = np.asarray(cost_per_unit, dtype=np.float64)
+        self.criticality_code = np.asarray(criticality_code, dtype=np.int8)
+        self.warehouses = list(warehouses) if warehouses is not None else [DEFAULT_WAREHOUSE] * len(self.product_ids)
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> 'ProductColumns':
+        """Build column arrays from Product objects (catalog order is preserved)"""
+        products = list(products)
+        return cls(
+            product_ids=[p.product_id for p in products],
+            current_stock=[p.current_stock for p in products],
+            incoming_stock=[p.incoming_stock for p in products],
+            average_daily_sales=[p.average_daily_sales for p in products],
+            lead_time_days=[p.lead_time_days for p in products],
+            min_reorder_quantity=[p.min_reorder_quantity for p in products],
+            cost_per_unit=[p.cost_per_unit for p in products],
+            criticality_code=[CRITICALITY_ORDER[p.criticality] for p in products],
+            warehouses=[p.warehouse for p in products]
+        )
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def to_products(self) -> List[Product]:
+        """Validated Product objects for every row, in catalog order"""
+        return [
+            Product(product_id, stock, incoming, sales, lead, moq, cost, CRITICALITY_LABELS[code], warehouse)
+            for product_id, stock, incoming, sales, lead, moq, cost, code, warehouse in zip(
+                self.product_ids,
+                self.current_stock.tolist(),
+                self.incoming_stock.tolist(),
+                self.average_daily_sales.tolist(),
+                self.lead_time_days.tolist(),
+                self.min_reorder_quantity.tolist(),
+                self.cost_per_unit.tolist(),
+                self.criticality_code.tolist(),
+                self.warehouses)
+        ]
+
+    def row_index(self) -> Dict[str, int]:
+        """Row of each product ID, built on first use"""
+        index = getattr(self, '_row_index', None)
+        if index is None:
+            index = self._row_index = {product_id: row for row, product_id in enumerate(self.product_ids)}
+        return index
+
+    def warehouse_rows(self) -> Dict[str, List[int]]:
+        """Rows of each warehouse in catalog order, built on first use"""
+        rows = getattr(self, '_warehouse_rows', None)
+        if rows is None:
+            rows = {}
+            for row, warehouse in enumerate(self.warehouses):
+                rows.setdefault(warehouse, []).append(row)
+            self._warehouse_rows = rows
+        return rows
+
+    def take(self, rows: Iterable[int]) -> 'ProductColumns':
+        """The given rows as new columns, in the given order"""
+        rows = list(rows)
+        index = np.array(rows, dtype=np.int64)
+        product_ids, warehouses = self.product_ids, self.warehouses
+        return ProductColumns(
+            product_ids=[product_ids[row] for row in rows],
+            current_stock=self.current_stock[index],
+            incoming_stock=self.incoming_stock[index],
+            average_daily_sales=self.average_daily_sales[index],
+            lead_time_days=self.lead_time_days[index],
+            min_reorder_quantity=self.min_reorder_quantity[index],
+            cost_per_unit=self.cost_per_unit[index],
+            criticality_code=self.criticality_code[index],
+            warehouses=[warehouses[row] for row in rows]
+        )
+
+    def select(self, warehouse: Optional[str] = None,
+               product_ids: Optional[Iterable[str]] = None) -> 'ProductColumns':
+        """Rows of one warehouse and/or the given product IDs, in catalog order (self when unfiltered)"""
+        if warehouse is None and product_ids is None:
+            return self
+        if product_ids is None:
+            return self.take(self.warehouse_rows().get(warehouse, []))
+        index = self.row_index()
+        rows = sorted({index[product_id] for product_id in product_ids if product_id in index})
+        if warehouse is not None:
+            rows = [row for row in rows if self.warehouses[row] == warehouse]
+        return self.take(rows)
+
+    def freeze(self) -> 'ProductColumns':
+        """Make the arrays read-only so the columns can be shared between readers"""
+        for array in (self.current_stock, self.incoming_stock, self.average_daily_sales, self.lead_time_days,
+                      self.min_reorder_quantity, self.cost_per_unit, self.criticality_code):
+            array.flags.writeable = False
+        return self
+
+
+class ProductTable:
+    """Struct-of-arrays product catalog for million-SKU workloads.
+
+    Each numeric field lives in a typed array and criticality is stored as a
+    one-byte Criticality code, so a product costs a few dozen bytes instead
+    of a full Python object. Rows are validated on the way in by building a
+    Product, and reads hand back regular Product objects, so the existing
+    API keeps working. to_columns() hands the arrays to the batch engine.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self.product_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._current_stock = array('q')
+        self._incoming_stock = array('q')
+        self._average_daily_sales = array('d')
+        self._lead_time_days = array('q')
+        self._min_reorder_quantity = array('q')
+        self._cost_per_unit = array('d')
+        self._criticality = array('b')
+        self._warehouse: List[str] = []
+        self.extend(products)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._rows
+
+    def __getitem__(self, row: int) -> Product:
+        return Product(
+            product_id=self.product_ids[row],
+            current_stock=self._current_stock[row],
+            incoming_stock=self._incoming_stock[row],
+            average_daily_sales=self._average_daily_sales[row],
+            lead_time_days=self._lead_time_days[row],
+            min_reorder_quantity=self._min_reorder_quantity[row],
+            cost_per_unit=self._cost_per_unit[row],
+            criticality=Criticality(self._criticality[row]).label,
+            warehouse=self._warehouse[row]
+        )
+
+    def __iter__(self) -> Iterator[Product]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Return the product with the given ID, or None"""
+        row = self._rows.get(product_id)
+        return None if row is None else self[row]
+
+    def append(self, product: Product):
+        """Add a validated product; raises ValueError if the ID is taken"""
+        if product.product_id in self._rows:
+            raise ValueError(f"Product ID '{product.product_id}' already exists.")
+        self._rows[product.product_id] = len(self.product_ids)
+        self.product_ids.append(product.product_id)
+        self._current_stock.append(product.current_stock)
+        self._incoming_stock.append(product.incoming_stock)
+        self._average_daily_sales.append(product.average_daily_sales)
+        self._lead_time_days.append(product.lead_time_days)
+        self._min_reorder_quantity.append(product.min_reorder_quantity)
+        self._cost_per_unit.append(product.cost_per_unit)
+        self._criticality.append(CRITICALITY_ORDER[product.criticality])
+        self._warehouse.append(product.warehouse)
+
+    def extend(self, products: Iterable[Product]):
+        for product in products:
+            self.append(product)
+
+    def update(self, product_id: str, **changes) -> Product:
+        """Overwrite fields of a row after validating them through Product; raises KeyError if missing"""
+        row = self._rows[product_id]
+        updated = replace(self[row], **changes)
+        if updated.product_id != product_id:
+            raise ValueError("product_id cannot be changed by an update")
+        self._current_stock[row] = updated.current_stock
+        self._incoming_stock[row] = updated.incoming_stock
+        self._average_daily_sales[row] = updated.average_daily_sales
+        self._lead_time_days[row] = updated.lead_time_days
+        self._min_reorder_quantity[row] = updated.min_reorder_quantity
+        self._cost_per_unit[row] = updated.cost_per_unit
+        self._criticality[row] = CRITICALITY_ORDER[updated.criticality]
+        self._warehouse[row] = updated.warehouse
+        return updated
+
+    def to_columns(self) -> ProductColumns:
+        """Snapshot of the table as ProductColumns for the batch engine.
+
+        The arrays are copied (a plain memcpy) so the table can keep growing
+        while the snapshot is in use.
+        """
+        return ProductColumns(
+            product_ids=list(self.product_ids),
+            current_stock=np.array(self._current_stock, dtype=np.int64),
+            incoming_stock=np.array(self._incoming_stock, dtype=np.int64),
+            average_daily_sales=np.array(self._average_daily_sales, dtype=np.float64),
+            lead_time_days=np.array(self._lead_time_days, dtype=np.int64),
+            min_reorder_quantity=np.array(self._min_reorder_quantity, dtype=np.int64),
+            cost_per_unit=np.array(self._cost_per_unit, dtype=np.float64),
+            criticality_code=np.array(self._criticality, dtype=np.int8),
+            warehouses=list(self._warehouse)
+        )
+
+
+class BatchReorderCalculator(ReorderCalculator):
+    """Vectorized reorder logic over ProductColumns.
+
+    Produces exactly the same recommendations, in the same order, as the
+    per-product ReorderCalculator path.
+    """
+
+    def calculate_days_remaining_batch(self, columns: ProductColumns) -> np.ndarray:
+        """Days of stock remaining for every product, based on current stock only"""
+        return columns.current_stock / columns.average_daily_sales
+
+    def needs_reorder_batch(self, columns: ProductColumns, days_remaining: np.ndarray = None) -> np.ndarray:
+        """Boolean mask of products whose stock falls below the safety threshold"""
+        if days_remaining is None:
+            days_remaining = self.calculate_days_remaining_batch(columns)
+        return days_remaining < (columns.lead_time_days + self.SAFETY_BUFFER_DAYS)
+
+    def calculate_reorder_quantity_batch(self, columns: ProductColumns) -> np.ndarray:
+        """Reorder quantity for every product considering incoming stock (0 if none needed)"""
+        required_stock = columns.average_daily_sales * self.TARGET_STOCK_DAYS
+        stock_needed = required_stock - columns.current_stock - columns.incoming_stock
+        quantity = np.maximum(np.trunc(stock_needed).astype(np.int64), columns.min_reorder_quantity)
+        return np.where(stock_needed > 0, quantity, 0)
+
+    def generate_reorder_recommendations_batch(self, columns: ProductColumns, limit: Optional[int] = None,
+                                               max_days_remaining: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Generate sorted reorder recommendations from column arrays"""
+        days_remaining = self.calculate_days_remaining_batch(columns)
+        reorder_qty = self.calculate_reorder_quantity_batch(columns)
+        selected = np.flatnonzero(self.needs_reorder_batch(columns, days_remaining) & (reorder_qty > 0))
+
+        # Rounding stays in Python so the values match the per-product path bit
+        # for bit; the sort key is then ordered with a stable lexsort, which
+        # reproduces the (criticality, days_remaining) list sort exactly.
+        rounded_days = [round(days, 1) for days in days_remaining[selected].tolist()]
+        if max_days_remaining is not None:
+            keep = [j for j, days in enumerate(rounded_days) if days <= max_days_remaining]
+            selected = selected[keep]
+            rounded_days = [rounded_days[j] for j in keep]
+        order = np.lexsort((np.array(rounded_days), columns.criticality_code[selected]))[:limit]
+        return self.build_recommendations(columns, selected[order], [rounded_days[j] for j in order.tolist()],
+                                          reorder_qty)
+
+    def recommended_days(self, columns: ProductColumns) -> Tuple[np.ndarray, List[float], np.ndarray]:
+        """Rows that need a reorder in catalog order, their rounded days remaining and every reorder quantity"""
+        days_remaining = self.calculate_days_remaining_batch(columns)
+        reorder_qty = self.calculate_reorder_quantity_batch(columns)
+        rows = np.flatnonzero(self.needs_reorder_batch(columns, days_remaining) & (reorder_qty > 0))
+        return rows, [round(days, 1) for days in days_remaining[rows].tolist()], reorder_qty
+
+    def recommendation_rows(self, columns: ProductColumns) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Rows that need a reorder, in catalog order, with their recommendations (unsorted)"""
+        rows, rounded_days, reorder_qty = self.recommended_days(columns)
+        return rows, self.build_recommendations(columns, rows, rounded_days, reorder_qty)
+
+    def build_recommendations(self, columns: ProductColumns, rows: np.ndarray, rounded_days: List[float],
+                              reorder_qty: np.ndarray) -> List[Dict[str, Any]]:
+        """Recommendation dicts for the given rows, identical to ReorderCalculator.process_product's"""
+        product_ids, warehouses = columns.product_ids, columns.warehouses
+        return [
+            {
+                'product_id': product_ids[i],
+                'current_stock': stock,
+                'incoming_stock': incoming,
+                'days_remaining': days,
+                'suggested_reorder_quantity': qty,
+                'estimated_cost': round(qty * cost, 2),
+                'criticality': CRITICALITY_LABELS[code],
+                'lead_time_days': lead_time,
+                'warehouse': warehouses[i]
+            }
+            for i, stock, incoming, days, qty, cost, code, lead_time in zip(
+                rows.tolist(),
+                columns.current_stock[rows].tolist(),
+                columns.incoming_stock[rows].tolist(),
+                rounded_days,
+                reorder_qty[rows].tolist(),
+                columns.cost_per_unit[rows].tolist(),
+                columns.criticality_code[rows].tolist(),
+                columns.lead_time_days[rows].tolist())
+        ]
+
+    @timed('generate_reorder_recommendations_batch')
+    def generate_reorder_recommendations(self, products: Union[ProductColumns, Iterable[Product]],
+                                         limit: Optional[int] = None,
+                                         max_days_remaining: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Generate reorder recommendations for all products using the batch engine"""
+        if isinstance(products, ProductTable):
+            products = products.to_columns()
+        elif not isinstance(products, ProductColumns):
+            products = ProductColumns.from_products(products)
+        return self.generate_reorder_recommendations_batch(products, limit, max_days_remaining)
@@ -0,0 +1,89 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from store import Change, ProductStore
+
+Row = Dict[str, Any]
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact JSON with sorted keys, byte-identical to jsonify outside debug mode"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def assemble_json(envelope: Dict[str, Any], list_key: str, fragments: Iterable[bytes]) -> bytes:
+    """Encode envelope with the already-encoded list items spliced in under list_key"""
+    head, tail = encode_json({**envelope, list_key: []}).split(f'"{list_key}":[]'.encode('utf-8'), 1)
+    return b''.join((head, f'"{list_key}":['.encode('utf-8'), b','.join(fragments), b']', tail))
+
+
+class FragmentCache:
+    """LRU cache of pre-encoded JSON fragments for per-product rows.
+
+    Entries are keyed by (kind, product_id), e.g. ('product', 'SKU_1'), and
+    remember the row object they were encoded from. The indexes build a
+    new row dict whenever a product changes, so a fragment is only reused
+    while the row is the very same object, and a stale fragment can never be
+    served, even if it races with a write. Store changes also evict the
+    product's fragments right away so their memory is released.
+    """
+
+    def __init__(self, store: Optional[ProductStore] = None, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Row, bytes]]' = OrderedDict()
+        self._kinds = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if store is not None:
+            store.subscribe(self.apply)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fragment(self, kind: str, row: Row, encode: Callable[[Row], bytes] = encode_json) -> bytes:
+        """Encoded form of a row, from the cache while the row object is unchanged"""
+        return self.fragments(kind, [row], encode)[0]
+
+    def fragments(self, kind: str, rows: List[Row], encode: Callable[[Row], bytes] = encode_json) -> List[bytes]:
+        """Encoded forms of many rows; the cache lock is taken once for lookups and once for inserts"""
+        encoded: List[Optional[bytes]] = [None] * len(rows)
+        missing = []
+        entries = self._entries
+        with self._lock:
+            for i, row in enumerate(rows):
+                key = (kind, row['product_id'])
+                entry = entries.get(key)
+                if entry is not None and entry[0] is row:
+                    entries.move_to_end(key)
+                    encoded[i] = entry[1]
+                else:
+                    missing.append(i)
+            self.hits += len(rows) - len(missing)
+
+        if missing:
+            for i in missing:
+                encoded[i] = encode(rows[i])
+            with self._lock:
+                self.misses += len(missing)
+                self._kinds.add(kind)
+                for i in missing:
+                    key = (kind, rows[i]['product_id'])
+                    entries[key] = (rows[i], encoded[i])
+                    entries.move_to_end(key)
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+        return encoded
+
+    def apply(self, changes: List[Change]):
+        """Drop the fragments of every product in a batch of store changes"""
+        with self._lock:
+            if len(changes) > len(self._entries):
+                self._entries.clear()
+                return
+            for old, new in changes:
+                product_id = (new or old).product_id
+                for kind in self._kinds:
+                    self._entries.pop((kind, product_id), None)
@@ -0,0 +1,14 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get('WAREHOUSE_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('WAREHOUSE_WORKERS', '4'))
+# Threaded workers: the app makes blocking SQLite calls (a writer can wait on
+# another process's write lock), which would stall every greenlet of an async
+# worker but only hold up one thread here. Each open /api/changes/stream
+# holds a thread for its lifetime, so a worker serves at most `threads`
+# concurrent requests and streams together.
+worker_class = 'gthread'
+threads = int(os.environ.get('WAREHOUSE_THREADS', '64'))
+# Streams are capped below the thread count so ordinary requests always get a thread
+os.environ.setdefault('WAREHOUSE_MAX_STREAMS', str(max(threads * 3 // 4, 1)))
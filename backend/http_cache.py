@@ -0,0 +1,114 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import Response, make_response, request
+
+
+class ResponseCache:
+    """Serialized read responses keyed by (endpoint, query, version).
+
+    Entries for older versions are dropped as soon as a newer version is
+    seen, and the cache is bounded with LRU eviction. Only the current
+    catalog state is ever kept.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, bytes], Tuple[bytes, int, str]]' = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, query: bytes, version: int) -> Optional[Tuple[bytes, int, str]]:
+        with self._lock:
+            self._sync(version)
+            entry = self._entries.get((endpoint, query))
+            if entry is not None:
+                self._entries.move_to_end((endpoint, query))
+            return entry
+
+    def put(self, endpoint: str, query: bytes, version: int, entry: Tuple[bytes, int, str]):
+        with self._lock:
+            self._sync(version)
+            if version != self._version:
+                return
+            self._entries[(endpoint, query)] = entry
+            self._entries.move_to_end((endpoint, query))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _sync(self, version: int):
+        if self._version is None or version > self._version:
+            self._entries.clear()
+            self._version = version
+
+
+class ConditionalGet:
+    """ETag / If-None-Match support plus a server-side cache for read endpoints.
+
+    The ETag of a read is the current catalog version, prefixed with a
+    scope naming what the versions count (by default a per-process boot
+    ID, so tags from before a restart never match). An
+    unchanged state is answered with 304 without running the view, and
+    repeated reads of the same query at the same version are served from
+    the ResponseCache. Cached views must not put the current time in their
+    bodies; every response is stamped with a fresh Date header instead.
+    """
+
+    def __init__(self, version: Callable[[], int], cache: Optional[ResponseCache] = None,
+                 scope: Optional[str] = None):
+        self.version = version
+        self.cache = cache or ResponseCache()
+        self._scope = scope or uuid.uuid4().hex[:8]
+
+    def etag(self, version: int, variant: str = '') -> str:
+        return f"{self._scope}-{version}{'-' + variant if variant else ''}"
+
+    def __call__(self, view):
+        return self._wrap(view)
+
+    def varying(self, variant: Callable[[], str]):
+        """Decorator for views whose body also depends on variant(), e.g. today's date.
+
+        The variant is part of the ETag and of the cache key, so a new value
+        invalidates both even while the store version is unchanged.
+        """
+        return lambda view: self._wrap(view, variant)
+
+    def _wrap(self, view, variant: Optional[Callable[[], str]] = None):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = self.version()
+            suffix = variant() if variant is not None else ''
+            etag = self.etag(version, suffix)
+            if request.if_none_match.contains(etag):
+                return self._tag(Response(status=304), etag)
+
+            endpoint, query = request.endpoint, request.query_string
+            if suffix:
+                query += b'#' + suffix.encode('utf-8')
+            entry = self.cache.get(endpoint, query, version)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = (response.get_data(), response.status_code, response.mimetype)
+                self.cache.put(endpoint, query, version, entry)
+
+            body, status, mimetype = entry
+            return self._tag(Response(body, status=status, mimetype=mimetype), etag)
+        return wrapper
+
+    @staticmethod
+    def _tag(response: Response, etag: str) -> Response:
+        response.set_etag(etag)
+        response.date = datetime.now(timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,166 @@
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Product
+from store import ProductStore
+
+SUPPORTED_FORMATS = ('csv', 'ndjson')
+
+
+def detect_format(filename: str) -> str:
+    """Guess the catalog format from a file name (defaults to CSV)"""
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+class DecodedLines:
+    """UTF-8 lines of a binary stream, remembering which lines held invalid bytes.
+
+    Invalid bytes are replaced so parsing can go on past them;
+    iter_records then reports the rows built from those lines as
+    unparseable instead of failing the whole load.
+    """
+
+    def __init__(self, stream: Iterable[bytes]):
+        self._lines = iter(stream)
+        self.line_number = 0
+        self.errors: Dict[int, UnicodeDecodeError] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        raw = next(self._lines)
+        self.line_number += 1
+        try:
+            return raw.decode('utf-8')
+        except UnicodeDecodeError as e:
+            self.errors[self.line_number] = e
+            return raw.decode('utf-8', errors='replace')
+
+
+def iter_records(lines: Iterable[str], fmt: str = 'csv') -> Iterator[Tuple[int, Any]]:
+    """Incrementally parse CSV or NDJSON lines into (row_number, record) pairs.
+
+    Rows are numbered from 1, not counting the CSV header. A row that
+    cannot be parsed, including one with invalid UTF-8 when the lines are
+    DecodedLines, yields its exception in place of the record, so the
+    caller can report it and keep going.
+    """
+    decode_errors = lines.errors if isinstance(lines, DecodedLines) else {}
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        row_number = 0
+        while True:
+            first_line = reader.line_num + 1
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                record = e
+            row_number += 1
+            if decode_errors:
+                # A quoted field can span several lines
+                for line_number in range(first_line, reader.line_num + 1):
+                    if line_number in decode_errors:
+                        record = decode_errors[line_number]
+                        break
+            yield row_number, record
+    elif fmt == 'ndjson':
+        row_number = 0
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            row_number += 1
+            if line_number in decode_errors:
+                yield row_number, decode_errors[line_number]
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+    else:
+        raise ValueError(f"Unsupported catalog format '{fmt}'")
+
+
+def validate_record(record: Any) -> Tuple[Optional[Product], Optional[str]]:
+    """Build a Product from a parsed record, or return why the record is invalid"""
+    if isinstance(record, Exception):
+        return None, f"Unparseable row: {record}"
+    if not isinstance(record, dict):
+        return None, "Row must be an object"
+    try:
+        return Product.from_dict(record), None
+    except (ValueError, TypeError) as e:
+        return None, f"Invalid data provided: {e}"
+
+
+class ProductIngestor:
+    """Bulk product loader with batched validation and a single commit.
+
+    Records are validated in batches with the same casting and rules as
+    POST /api/products/add (Product.from_dict and Product.__post_init__).
+    Invalid rows are reported individually without aborting the load, and
+    all valid rows are committed to the store as one batch at the end.
+    """
+
+    def __init__(self, store: ProductStore, batch_size: int = 1000, max_errors: int = 1000):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def ingest(self, records: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        """Validate and load parsed records; returns a summary with per-row errors"""
+        valid: List[Product] = []
+        seen = set()
+        errors: List[Dict[str, Any]] = []
+        error_count = 0
+        batch = []
+
+        def flush():
+            nonlocal error_count
+            for row_number, record in batch:
+                product, error = self._validate(record, seen)
+                if product is not None:
+                    seen.add(product.product_id)
+                    valid.append(product)
+                else:
+                    error_count += 1
+                    if len(errors) < self.max_errors:
+                        errors.append({
+                            'row': row_number,
+                            'product_id': record.get('product_id') if isinstance(record, dict) else None,
+                            'error': error
+                        })
+            batch.clear()
+
+        for item in records:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                flush()
+        flush()
+
+        self.store.add_many(valid)
+        return {
+            'accepted': len(valid),
+            'rejected': error_count,
+            'errors': errors,
+            'errors_truncated': error_count > len(errors)
+        }
+
+    def _validate(self, record: Any, seen: set) -> Tuple[Optional[Product], Optional[str]]:
+        product, error = validate_record(record)
+        if product is None:
+            return None, error
+        if product.product_id in self.store or product.product_id in seen:
+            return None, f"Product ID '{product.product_id}' already exists."
+        return product, None
+
+
+def load_catalog(filename: str, store: ProductStore, fmt: Optional[str] = None,
+                 batch_size: int = 1000) -> Dict[str, Any]:
+    """Stream a CSV or NDJSON catalog file into the store"""
+    fmt = fmt or detect_format(filename)
+    with open(filename, 'rb') as catalog:
+        return ProductIngestor(store, batch_size=batch_size).ingest(iter_records(DecodedLines(catalog), fmt))
@@ -0,0 +1,135 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from persistence import SQLiteRepository
+from sample_data import get_sample_products
+from store import ProductStore
+
+
+def _worker(db_path: str, product_ids: List[str], threads: int, orders: int) -> int:
+    """One server process: `threads` concurrent clients each placing `orders` orders of 1 unit"""
+    os.environ['WAREHOUSE_DB'] = db_path
+    os.environ['WAREHOUSE_SEED_SAMPLE_DATA'] = '0'
+    import app as server
+
+    def client(index: int) -> int:
+        test_client = server.app.test_client()
+        placed = 0
+        for i in range(orders):
+            product_id = product_ids[(index + i) % len(product_ids)]
+            response = test_client.post('/api/create-order', json={'product_id': product_id, 'quantity': 1})
+            if response.status_code != 200:
+                raise AssertionError(f"create-order failed with {response.status_code}: {response.get_data()}")
+            placed += 1
+        return placed
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return sum(pool.map(client, range(threads)))
+
+
+def _final_view(db_path: str) -> dict:
+    """incoming_stock per product as seen by a worker process that started before the load"""
+    os.environ['WAREHOUSE_DB'] = db_path
+    os.environ['WAREHOUSE_SEED_SAMPLE_DATA'] = '0'
+    import app as server
+    server.shared_inventory.refresh()
+    return {product.product_id: product.incoming_stock for product in server.product_store}
+
+
+def run_local(processes: int, threads: int, orders: int) -> bool:
+    """Hammer create_order from several processes sharing one database file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load_test.db')
+        repository = SQLiteRepository(db_path)
+        store = ProductStore()
+        store.subscribe(repository.apply)
+        store.add_many(get_sample_products())
+        before = {product.product_id: product.incoming_stock for product in store}
+        product_ids = list(before)
+        repository.close()
+
+        context = multiprocessing.get_context('spawn')
+        start = time.perf_counter()
+        with context.Pool(processes) as pool:
+            placed = sum(pool.starmap(_worker, [(db_path, product_ids, threads, orders)] * processes))
+        elapsed = time.perf_counter() - start
+
+        connection = sqlite3.connect(db_path)
+        after = dict(connection.execute("SELECT product_id, incoming_stock FROM products"))
+        recorded = connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        connection.close()
+        with context.Pool(1) as pool:
+            view = pool.apply(_final_view, (db_path,))
+
+    added = sum(after.values()) - sum(before.values())
+    print(f"🧪 {processes} processes x {threads} threads x {orders} orders in {elapsed:.2f}s "
+          f"({placed / elapsed:,.0f} orders/s)")
+    print(f"   Orders placed: {placed:,}   recorded: {recorded:,}   incoming_stock added: {added:,}")
+    ok = placed == recorded == added and view == after
+    print("✅ No lost updates" if ok else "❌ Lost or inconsistent updates")
+    return ok
+
+
+def run_remote(url: str, threads: int, orders: int) -> bool:
+    """Hammer a running server (e.g. gunicorn with several workers) over HTTP"""
+    def call(method: str, path: str, payload=None) -> dict:
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def totals() -> dict:
+        return {row['product_id']: row['incoming_stock'] for row in call('GET', '/api/products')['products']}
+
+    before = totals()
+    product_ids = list(before)
+
+    def client(index: int) -> int:
+        for i in range(orders):
+            call('POST', '/api/create-order', {'product_id': product_ids[(index + i) % len(product_ids)], 'quantity': 1})
+        return orders
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        placed = sum(pool.map(client, range(threads)))
+    elapsed = time.perf_counter() - start
+    added = sum(totals().values()) - sum(before.values())
+
+    print(f"🧪 {threads} HTTP clients x {orders} orders against {url} in {elapsed:.2f}s "
+          f"({placed / elapsed:,.0f} orders/s)")
+    print(f"   Orders placed: {placed:,}   incoming_stock added: {added:,}")
+    ok = placed == added
+    print("✅ No lost updates" if ok else "❌ Lost updates")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent create_order load test (checks for lost updates)')
+    parser.add_argument('--processes', type=int, default=4,
+                        help='Worker processes sharing the database (default: 4)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Concurrent clients per process (default: 8)')
+    parser.add_argument('--orders', type=int, default=50,
+                        help='Orders placed by each client (default: 50)')
+    parser.add_argument('--url', help='Test a running server instead, e.g. http://localhost:8000')
+    args = parser.parse_args()
+
+    if args.url:
+        ok = run_remote(args.url.rstrip('/'), args.threads, args.orders)
+    else:
+        ok = run_local(args.processes, args.threads, args.orders)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import argparse
+import math
 from sample_data import get_sample_products
+from store import ProductStore
+from ingest import load_catalog
 from reorder_logic import ReorderCalculator
 from simulator import DemandSpikeSimulator
 from report import ReorderReportGenerator
+from planner import BudgetPlanner
+from batch import CatalogBatchRunner
 
 def main():
     parser = argparse.ArgumentParser(description='Smart Warehouse Reordering System')
+    parser.add_argument('--catalog', type=str, metavar='FILE',
+                       help='Load products from a CSV or NDJSON catalog file instead of sample data')
     parser.add_argument('--simulate-spike', type=str, metavar='PRODUCT_ID',
                        help='Simulate demand spike for specific product')
     parser.add_argument('--spike-multiplier', type=float, default=3.0,
@@ -14,16 +21,65 @@ def main():
                        help='Duration of spike in days (default: 7)')
     parser.add_argument('--export-csv', action='store_true',
                        help='Export recommendations to CSV')
+    parser.add_argument('--with-warehouse', action='store_true',
+                       help='Add a Warehouse column to the exported CSV')
+    parser.add_argument('--monte-carlo', type=int, metavar='SCENARIOS',
+                       help='Run a Monte Carlo stockout simulation with this many scenarios')
+    parser.add_argument('--horizon-days', type=int, default=60,
+                       help='Monte Carlo simulation horizon in days (default: 60)')
+    parser.add_argument('--seed', type=int,
+                       help='Random seed for reproducible Monte Carlo runs')
+    parser.add_argument('--workers', type=int,
+                       help='Worker processes for the Monte Carlo simulation and batch mode (default: CPU count)')
+    parser.add_argument('--budget', type=float, metavar='AMOUNT',
+                       help='Plan order quantities within this purchasing budget')
+    parser.add_argument('--batch', action='store_true',
+                       help='Analyze a --catalog file of any size in chunks on a worker pool, in bounded memory')
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                       help='Catalog lines per batch-mode chunk (default: 100000)')
+    parser.add_argument('--top', type=int, default=20,
+                       help='Recommendations printed in batch mode (default: 20)')
     
     args = parser.parse_args()
     
+    if args.budget is not None and not (math.isfinite(args.budget) and args.budget >= 0):
+        parser.error("--budget must be a finite, non-negative amount")
+    if args.batch:
+        if not args.catalog:
+            parser.error("--batch requires --catalog")
+        if args.simulate_spike or args.monte_carlo or args.budget is not None:
+            parser.error("--batch cannot be combined with --simulate-spike, --monte-carlo or --budget")
+        run_batch(args)
+        return
+    
     # Initialize system components
     calculator = ReorderCalculator()
     simulator = DemandSpikeSimulator()
     reporter = ReorderReportGenerator()
     
-    # Load sample data
-    products = get_sample_products()
+    # Load the catalog file, or sample data if none was given
+    if args.catalog:
+        products = ProductStore()
+        result = load_catalog(args.catalog, products)
+        print(f"📥 Loaded {result['accepted']} products from {args.catalog} ({result['rejected']} rejected)")
+        for error in result['errors'][:10]:
+            print(f"   ❌ Row {error['row']}: {error['error']}")
+    else:
+        products = get_sample_products()
+    
+    # Run the stochastic simulation on the unmodified catalog, with the spike if requested
+    risks = None
+    if args.monte_carlo:
+        risks = simulator.simulate_stockout_risk(
+            products,
+            args.simulate_spike,
+            args.spike_multiplier,
+            args.spike_days,
+            scenarios=args.monte_carlo,
+            horizon_days=args.horizon_days,
+            seed=args.seed,
+            workers=args.workers
+        )
     
     # Handle demand spike simulation
     if args.simulate_spike:
@@ -41,17 +97,54 @@ def main():
     # Generate reports
     reporter.print_summary(products, recommendations)
     reporter.print_recommendations(recommendations)
+    if risks is not None:
+        reporter.print_stockout_risk(risks)
+    
+    # Fit the recommendations to the budget, weighting by Monte Carlo risk when available
+    if args.budget is not None:
+        stockout_risk = None if risks is None else {r['product_id']: r['stockout_probability'] for r in risks}
+        reporter.print_plan(BudgetPlanner().plan(products, args.budget, stockout_risk))
     
     # Export to CSV if requested
     if args.export_csv:
-        reporter.export_to_csv(recommendations)
+        reporter.export_to_csv(recommendations, with_warehouse=args.with_warehouse)
     
     print(f"\n{'='*80}")
     print("✅ Analysis Complete!")
     if recommendations:
         print(f"💡 Use --export-csv to save recommendations to file")
         print(f"🧪 Try --simulate-spike PRODUCT_ID to test demand scenarios")
+        print(f"🎲 Add --monte-carlo 1000 to estimate stockout risk")
+        print(f"💰 Add --budget 50000 to plan purchases within a budget")
+    print("="*80)
+
+def run_batch(args):
+    """Nightly-style run over a large catalog file: chunked, parallel, merged and streamed to CSV"""
+    reporter = ReorderReportGenerator()
+    runner = CatalogBatchRunner(workers=args.workers, chunk_size=args.chunk_size)
+    output = "reorder_report.csv" if args.export_csv else None
+    print(f"📥 Analyzing {args.catalog} in chunks of {args.chunk_size:,} on {runner.workers} worker(s)")
+    result = runner.run(args.catalog, output=output, top=args.top, with_warehouse=args.with_warehouse)
+    
+    skus = result['accepted'] + result['rejected']
+    print(f"⚡ {skus:,} SKUs in {result['chunks']} chunks, {result['elapsed_seconds']:.1f}s "
+          f"({skus / max(result['elapsed_seconds'], 1e-9):,.0f} SKUs/s)")
+    if result['rejected']:
+        print(f"   {result['rejected']:,} rows rejected")
+        for error in result['errors']:
+            print(f"   ❌ Row {error['row']}: {error['error']}")
+    
+    print("\n" + "="*80)
+    print("📦 SMART WAREHOUSE REORDERING SYSTEM - BATCH SUMMARY")
     print("="*80)
+    reporter.print_totals(result['accepted'], result['recommendations'], result['total_cost'])
+    if result['top']:
+        print(f"\n{'='*80}")
+        print(f"🚨 TOP {len(result['top'])} REORDER RECOMMENDATIONS")
+        print("="*80)
+        reporter.print_recommendations(result['top'])
+    if output:
+        print(f"\n📄 Report exported to: {output}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
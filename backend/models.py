@@ -1,9 +1,32 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, fields
+from enum import IntEnum
 from typing import Optional
 
-@dataclass
+class Criticality(IntEnum):
+    """Criticality levels as small integer codes, most critical first"""
+    HIGH = 0
+    MEDIUM = 1
+    LOW = 2
+    
+    @property
+    def label(self) -> str:
+        return CRITICALITY_LEVELS[self]
+
+# Valid criticality labels, indexed by their Criticality code
+CRITICALITY_LEVELS = ('high', 'medium', 'low')
+_CRITICALITY_LABELS = {label: label for label in CRITICALITY_LEVELS}
+
+# Warehouse of products that do not name one (single-site catalogs)
+DEFAULT_WAREHOUSE = 'main'
+
+@dataclass(slots=True)
 class Product:
-    """Product data model for warehouse inventory management"""
+    """Product data model for warehouse inventory management.
+    
+    Slotted to avoid a per-instance __dict__; see columnar.ProductTable for
+    a struct-of-arrays layout for very large catalogs.
+    """
     product_id: str
     current_stock: int
     incoming_stock: int  # Stock that's ordered but not yet received
@@ -12,6 +35,22 @@ class Product:
     min_reorder_quantity: int
     cost_per_unit: float
     criticality: str  # 'high', 'medium', 'low'
+    warehouse: str = DEFAULT_WAREHOUSE  # Site holding the stock
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Product':
+        """Build a product from raw request or file data, casting each field to its type"""
+        return cls(
+            product_id=str(data.get('product_id')),
+            current_stock=int(data.get('current_stock')),
+            incoming_stock=int(data.get('incoming_stock') or 0),
+            average_daily_sales=float(data.get('average_daily_sales')),
+            lead_time_days=int(data.get('lead_time_days')),
+            min_reorder_quantity=int(data.get('min_reorder_quantity')),
+            cost_per_unit=float(data.get('cost_per_unit')),
+            criticality=str(data.get('criticality')),
+            warehouse=str(data.get('warehouse') or DEFAULT_WAREHOUSE)
+        )
     
     def __post_init__(self):
         """Validate product data"""
@@ -19,4 +58,13 @@ class Product:
             raise ValueError(f"Average daily sales must be positive for {self.product_id}")
         if self.current_stock < 0 or self.incoming_stock < 0:
             raise ValueError(f"Stock values cannot be negative for {self.product_id}")
+        if self.criticality not in _CRITICALITY_LABELS:
+            raise ValueError(f"Criticality must be one of {', '.join(CRITICALITY_LEVELS)} for {self.product_id}")
+        # Share one string object per level instead of one per product
+        self.criticality = _CRITICALITY_LABELS[self.criticality]
+        if not self.warehouse:
+            raise ValueError(f"Warehouse cannot be empty for {self.product_id}")
+        self.warehouse = sys.intern(self.warehouse)
 
+# Product field names in declaration order (the column order of catalog files)
+PRODUCT_FIELDS = tuple(field.name for field in fields(Product))
@@ -0,0 +1,345 @@
+import marshal
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from models import Product, PRODUCT_FIELDS
+from columnar import ProductColumns
+from reorder_logic import CRITICALITY_ORDER
+from store import Change
+
+PRODUCT_COLUMNS = PRODUCT_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL UNIQUE,
+    current_stock INTEGER NOT NULL,
+    incoming_stock INTEGER NOT NULL,
+    average_daily_sales REAL NOT NULL,
+    lead_time_days INTEGER NOT NULL,
+    min_reorder_quantity INTEGER NOT NULL,
+    cost_per_unit REAL NOT NULL,
+    criticality TEXT NOT NULL,
+    warehouse TEXT NOT NULL DEFAULT 'main'
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at);
+CREATE TABLE IF NOT EXISTS order_totals (
+    product_id TEXT PRIMARY KEY,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS change_log (
+    version INTEGER NOT NULL,
+    product_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS change_log_version ON change_log (version);
+CREATE TABLE IF NOT EXISTS demand_state (
+    product_id TEXT PRIMARY KEY,
+    day INTEGER NOT NULL,
+    ewma REAL NOT NULL,
+    ring BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', abs(random() % 4294967296));
+"""
+
+_ADD_ORDER_TOTAL = (
+    "INSERT INTO order_totals (product_id, quantity) VALUES (?, ?) "
+    "ON CONFLICT(product_id) DO UPDATE SET quantity = quantity + excluded.quantity"
+)
+
+_UPSERT = (
+    f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))}) "
+    "ON CONFLICT(product_id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in PRODUCT_COLUMNS[1:])
+)
+
+
+# Snapshot layout: (SNAPSHOT_FORMAT, product IDs, warehouses, raw bytes of each numeric column);
+# snapshots in any other layout are ignored and rebuilt from the tables
+SNAPSHOT_FORMAT = 2
+_SNAPSHOT_ARRAYS = ('current_stock', 'incoming_stock', 'average_daily_sales', 'lead_time_days',
+                    'min_reorder_quantity', 'cost_per_unit', 'criticality_code')
+
+
+def _encode_snapshot(columns: ProductColumns) -> bytes:
+    return marshal.dumps((SNAPSHOT_FORMAT, columns.product_ids, columns.warehouses)
+                         + tuple(getattr(columns, name).tobytes() for name in _SNAPSHOT_ARRAYS))
+
+
+def _decode_snapshot(data: bytes) -> Optional[ProductColumns]:
+    payload = marshal.loads(data)
+    if not isinstance(payload, tuple) or not payload or payload[0] != SNAPSHOT_FORMAT:
+        return None
+    _, product_ids, warehouses, *arrays = payload
+    # ProductColumns casts each buffer to its dtype without copying
+    dtypes = (np.int64, np.int64, np.float64, np.int64, np.int64, np.float64, np.int8)
+    return ProductColumns(product_ids, *(np.frombuffer(raw, dtype) for raw, dtype in zip(arrays, dtypes)),
+                          warehouses=[sys.intern(warehouse) for warehouse in warehouses])
+
+
+def _columns(rows: List[tuple]) -> ProductColumns:
+    """Columns from product table rows (ordered like PRODUCT_COLUMNS), which were validated when written"""
+    if not rows:
+        return ProductColumns([], [], [], [], [], [], [], [], [])
+    product_ids, current, incoming, sales, lead, moq, cost, criticality, warehouses = zip(*rows)
+    return ProductColumns(product_ids, current, incoming, sales, lead, moq, cost,
+                          [CRITICALITY_ORDER[level] for level in criticality], warehouses)
+
+
+def _row(product: Product) -> tuple:
+    return (product.product_id, product.current_stock, product.incoming_stock, product.average_daily_sales,
+            product.lead_time_days, product.min_reorder_quantity, product.cost_per_unit, product.criticality,
+            product.warehouse)
+
+
+class SQLiteRepository:
+    """Durable SQLite storage for products and purchase orders.
+
+    The database runs in WAL mode. Every batch of store changes is written
+    in a single transaction, and callers can group several writes (for
+    example a stock update and its order record) with transaction().
+    A compact columnar snapshot of the catalog (raw numpy column bytes) is
+    kept alongside the tables. On startup it is used as long as no write
+    has happened since it was taken, which avoids a row-by-row table scan
+    and loads straight into ProductColumns (see load_columns).
+
+    Each batch also records the IDs it touched in a change log under the
+    new version, so other processes sharing the database can catch up on
+    just the products that changed (see changes_since).
+    """
+
+    # Change log entries kept behind the newest version; readers further
+    # behind than this reload the whole catalog instead
+    CHANGE_LOG_RETENTION = 10000
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        # timeout is how long a writer waits for another process's write transaction
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def close(self):
+        self._conn.close()
+
+    def _migrate(self):
+        """Add columns and tables introduced after a database was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(products)")}
+        if 'warehouse' not in columns:
+            self._conn.execute("ALTER TABLE products ADD COLUMN warehouse TEXT NOT NULL DEFAULT 'main'")
+        with self.transaction() as conn:
+            backfill = "SELECT NOT EXISTS (SELECT 1 FROM order_totals) AND EXISTS (SELECT 1 FROM orders)"
+            if conn.execute(backfill).fetchone()[0]:
+                conn.execute("INSERT INTO order_totals (product_id, quantity) "
+                             "SELECT product_id, SUM(quantity) FROM orders GROUP BY product_id")
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction; nested calls join the outer one"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def apply(self, changes: List[Change]):
+        """Persist a batch of (old, new) store changes in one transaction"""
+        with self.transaction() as conn:
+            # Consecutive upserts and deletes are sent as executemany runs,
+            # keeping the original order of operations
+            run_kind, run = None, []
+            for old, new in changes:
+                kind = 'delete' if new is None else 'upsert'
+                if kind != run_kind and run:
+                    self._execute_run(conn, run_kind, run)
+                    run = []
+                run_kind = kind
+                run.append((old.product_id,) if new is None else _row(new))
+            if run:
+                self._execute_run(conn, run_kind, run)
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            version = self._version()
+            conn.executemany("INSERT INTO change_log (version, product_id) VALUES (?, ?)",
+                             [(version, (new or old).product_id) for old, new in changes])
+            if version % 100 == 0:
+                conn.execute("DELETE FROM change_log WHERE version <= ?", (version - self.CHANGE_LOG_RETENTION,))
+
+    def record_order(self, product_id: str, quantity: int):
+        """Record a purchase order"""
+        self.record_orders([(product_id, quantity)])
+
+    def record_orders(self, lines: List[Tuple[str, int]]):
+        """Record several purchase orders in one transaction, keeping each product's running total"""
+        created_at = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO orders (product_id, quantity, created_at) VALUES (?, ?, ?)",
+                             [(product_id, quantity, created_at) for product_id, quantity in lines])
+            conn.executemany(_ADD_ORDER_TOTAL, lines)
+
+    def get_orders(self, product_id: str = None) -> List[dict]:
+        """Purchase orders, newest first, optionally for one product"""
+        query = "SELECT order_id, product_id, quantity, created_at FROM orders"
+        params = ()
+        if product_id is not None:
+            query += " WHERE product_id = ?"
+            params = (product_id,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY order_id DESC", params).fetchall()
+        return [dict(zip(('order_id', 'product_id', 'quantity', 'created_at'), row)) for row in rows]
+
+    def orders_since(self, since: date) -> Tuple[List[dict], Dict[str, int]]:
+        """Orders placed on or after a date, newest first, and the units per product ordered before it.
+
+        Uses the created_at index and the running order totals, so the cost
+        grows with the recent orders and the number of products ordered,
+        not with the whole order history. Both come from one statement,
+        hence one consistent snapshot.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT order_id, product_id, quantity, created_at FROM orders WHERE created_at >= ? "
+                "UNION ALL SELECT NULL, product_id, quantity, NULL FROM order_totals",
+                (since.isoformat(),)
+            ).fetchall()
+        recent = sorted((row for row in rows if row[0] is not None), key=lambda row: row[0], reverse=True)
+        earlier = {row[1]: row[2] for row in rows if row[0] is None}
+        for _, product_id, quantity, _ in recent:
+            earlier[product_id] -= quantity
+        orders = [dict(zip(('order_id', 'product_id', 'quantity', 'created_at'), row)) for row in recent]
+        return orders, {product_id: units for product_id, units in earlier.items() if units > 0}
+
+    def load_demand_states(self, product_ids: Optional[Iterable[str]] = None) -> Dict[str, tuple]:
+        """Serialized demand-tracking state (day, ewma, ring) per product, for the given IDs or all"""
+        query = "SELECT product_id, day, ewma, ring FROM demand_state"
+        with self._lock:
+            if product_ids is None:
+                rows = self._conn.execute(query).fetchall()
+            else:
+                product_ids = list(product_ids)
+                rows = []
+                # Stay below SQLite's limit on bound parameters
+                for start in range(0, len(product_ids), 900):
+                    chunk = product_ids[start:start + 900]
+                    rows += self._conn.execute(
+                        f"{query} WHERE product_id IN ({', '.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def save_demand_states(self, states: Dict[str, tuple]):
+        """Upsert serialized demand-tracking states"""
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO demand_state (product_id, day, ewma, ring) VALUES (?, ?, ?, ?)",
+                [(product_id,) + tuple(state) for product_id, state in states.items()]
+            )
+
+    def version(self) -> int:
+        """Version of the stored catalog, bumped by every committed batch"""
+        with self._lock:
+            return self._version()
+
+    def generation(self) -> int:
+        """Random ID drawn when the database was created, so versions of a recreated database never match"""
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[Product], List[str]]]:
+        """Products upserted and IDs deleted after the given version.
+
+        Upserts come in insertion order. Returns None when the change log
+        no longer reaches back that far, in which case the caller should
+        reload the catalog with load_products().
+        """
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(version) FROM change_log").fetchone()[0]
+            if version < self._version() and (oldest is None or oldest > version + 1):
+                return None
+            rows = self._conn.execute(
+                f"SELECT c.product_id, p.seq, {', '.join('p.' + column for column in PRODUCT_COLUMNS)} "
+                "FROM (SELECT DISTINCT product_id FROM change_log WHERE version > ?) c "
+                "LEFT JOIN products p ON p.product_id = c.product_id ORDER BY p.seq",
+                (version,)
+            ).fetchall()
+        upserts = [Product(*row[2:]) for row in rows if row[1] is not None]
+        deleted = [row[0] for row in rows if row[1] is None]
+        return upserts, deleted
+
+    def load_columns(self) -> ProductColumns:
+        """The catalog as column arrays in insertion order, from the snapshot when it is current"""
+        with self._lock:
+            version = self._version()
+            snapshot = self._conn.execute("SELECT version, data FROM snapshot WHERE id = 1").fetchone()
+            columns = _decode_snapshot(snapshot[1]) if snapshot and snapshot[0] == version else None
+            if columns is not None:
+                return columns
+            rows = self._conn.execute(
+                f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products ORDER BY seq"
+            ).fetchall()
+        columns = _columns(rows)
+        self._save_snapshot(columns, version)
+        return columns
+
+    def load_products(self) -> List[Product]:
+        """Load the catalog in insertion order, from the snapshot when it is current"""
+        return self.load_columns().to_products()
+
+    def write_snapshot(self, products: List[Product] = None):
+        """Store a columnar snapshot of the catalog tagged with the current version"""
+        with self.transaction() as conn:
+            if products is None:
+                columns = _columns(conn.execute(
+                    f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products ORDER BY seq").fetchall())
+            else:
+                columns = ProductColumns.from_products(products)
+            self._save_snapshot(columns, self._version())
+
+    def _save_snapshot(self, columns: ProductColumns, version: int):
+        with self.transaction() as conn:
+            # Skipped if a write landed since the columns were read
+            if self._version() == version:
+                conn.execute("INSERT OR REPLACE INTO snapshot (id, version, data) VALUES (1, ?, ?)",
+                             (version, _encode_snapshot(columns)))
+
+    def _version(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @staticmethod
+    def _execute_run(conn, kind: str, run: list):
+        if kind == 'delete':
+            conn.executemany("DELETE FROM products WHERE product_id = ?", run)
+            conn.executemany("DELETE FROM demand_state WHERE product_id = ?", run)
+        else:
+            conn.executemany(_UPSERT, run)
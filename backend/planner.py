@@ -0,0 +1,130 @@
+import math
+from typing import Any, Dict, Iterable, Optional, Union
+import numpy as np
+
+from models import Product
+from columnar import ProductColumns, BatchReorderCalculator, CRITICALITY_LABELS
+from metrics import timed
+
+# Value weight of a covered day per criticality code (high, medium, low)
+CRITICALITY_WEIGHTS = np.array([3.0, 2.0, 1.0])
+
+
+class BudgetPlanner:
+    """Chooses order quantities for the reorder recommendations within a purchasing budget.
+
+    Each recommended SKU is worth `weight * risk` per day of demand it
+    covers, up to the calculator's target stock. The weight comes from
+    criticality. The risk factor runs from 1 to 2 as the stock on hand plus
+    on order falls below the safety threshold, or is 1 + the Monte Carlo
+    stockout probability when one is given. Units that a minimum order
+    quantity forces beyond the target add cost but no value.
+
+    SKUs are funded greedily in order of value per dollar, the classic greedy
+    for the fractional knapsack, adapted to minimum order quantities:
+    - a SKU gets its full suggested quantity while the budget allows;
+    - otherwise it gets as many units as the rest of the budget buys, as
+      long as that is at least min_reorder_quantity;
+    - otherwise it is deferred, and cheaper SKUs further down can still use
+      the budget.
+
+    Everything up to the greedy pass is vectorized, and the leading SKUs
+    that fit in full are found with one cumulative sum. Re-planning 100k SKUs
+    takes well under a second.
+    """
+
+    def __init__(self, calculator: Optional[BatchReorderCalculator] = None):
+        self.calculator = calculator or BatchReorderCalculator()
+
+    @timed('plan_purchases')
+    def plan(self, products: Union[ProductColumns, Iterable[Product]], budget: float,
+             stockout_risk: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Plan purchases within budget; stockout_risk optionally maps product IDs to stockout probabilities"""
+        if not math.isfinite(budget) or budget < 0:
+            raise ValueError("budget must be a finite, non-negative amount")
+        columns = products if isinstance(products, ProductColumns) else ProductColumns.from_products(products)
+        calculator = self.calculator
+
+        days_remaining = calculator.calculate_days_remaining_batch(columns)
+        suggested = calculator.calculate_reorder_quantity_batch(columns)
+        candidates = np.flatnonzero(calculator.needs_reorder_batch(columns, days_remaining) & (suggested > 0))
+
+        sales = columns.average_daily_sales[candidates]
+        cost = columns.cost_per_unit[candidates]
+        suggested = suggested[candidates]
+        moq = columns.min_reorder_quantity[candidates]
+        code = columns.criticality_code[candidates]
+
+        cover = (columns.current_stock[candidates] + columns.incoming_stock[candidates]) / sales
+        needed_days = np.maximum(calculator.TARGET_STOCK_DAYS - cover, 0)
+        if stockout_risk is not None:
+            product_ids = columns.product_ids
+            risk = 1 + np.array([stockout_risk.get(product_ids[i], 0.0) for i in candidates.tolist()])
+        else:
+            threshold = columns.lead_time_days[candidates] + calculator.SAFETY_BUFFER_DAYS
+            risk = 1 + np.clip((threshold - cover) / threshold, 0, 1)
+        priority = CRITICALITY_WEIGHTS[code] * risk
+        full_cost = suggested * cost
+        value = priority * np.minimum(suggested / sales, needed_days)
+        # Free items come first
+        density = np.divide(value, full_cost, out=np.full(len(value), np.inf), where=full_cost > 0)
+        # Stable sort on the negated density keeps catalog order among ties
+        order = np.argsort(-density, kind='stable')
+
+        quantity = np.zeros(len(candidates), dtype=np.int64)
+        # Every SKU before the first one that does not fit is funded in full
+        funded = int(np.searchsorted(np.cumsum(full_cost[order]), budget, side='right'))
+        quantity[order[:funded]] = suggested[order[:funded]]
+        remaining = budget - float(full_cost[order[:funded]].sum())
+
+        # The greedy tail and the output rows run on plain lists, which index faster than arrays
+        suggested_list, cost_list, moq_list = suggested.tolist(), cost.tolist(), moq.tolist()
+        quantity_list = quantity.tolist()
+        for i in order[funded:].tolist():
+            if suggested_list[i] * cost_list[i] <= remaining:
+                quantity_list[i] = suggested_list[i]
+            else:
+                affordable = int(remaining // cost_list[i])
+                if affordable < moq_list[i]:
+                    continue
+                quantity_list[i] = affordable
+            remaining -= quantity_list[i] * cost_list[i]
+        quantity = np.array(quantity_list, dtype=np.int64)
+        covered = np.minimum(quantity / sales, needed_days)
+
+        lines, deferred = [], []
+        product_ids, warehouses = columns.product_ids, columns.warehouses
+        rows = candidates.tolist()
+        days = days_remaining[candidates].tolist()
+        code_list, priority_list, covered_list = code.tolist(), priority.tolist(), covered.tolist()
+        for i in order.tolist():
+            row = rows[i]
+            line = {
+                'product_id': product_ids[row],
+                'criticality': CRITICALITY_LABELS[code_list[i]],
+                'days_remaining': round(days[i], 1),
+                'suggested_reorder_quantity': suggested_list[i],
+                'warehouse': warehouses[row]
+            }
+            units = quantity_list[i]
+            if units:
+                line.update(quantity=units,
+                            estimated_cost=round(units * cost_list[i], 2),
+                            covered_days=round(covered_list[i], 1),
+                            priority=round(priority_list[i], 3),
+                            status='full' if units == suggested_list[i] else 'partial')
+                lines.append(line)
+            else:
+                line['estimated_cost'] = round(suggested_list[i] * cost_list[i], 2)
+                deferred.append(line)
+
+        spent = float((quantity * cost).sum())
+        return {
+            'budget': budget,
+            'spent': round(spent, 2),
+            'remaining': round(budget - spent, 2),
+            'unconstrained_cost': round(float(full_cost.sum()), 2),
+            'covered_days': round(float(covered.sum()), 1),
+            'orders': lines,
+            'deferred': deferred
+        }
@@ -0,0 +1,385 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from models import Product
+from columnar import ProductColumns, BatchReorderCalculator, CRITICALITY_LABELS
+from reorder_logic import ReorderCalculator, CRITICALITY_ORDER
+from store import Change, ProductStore
+
+# Columns of a product row that /api/products can sort on
+SORTABLE_COLUMNS = ('product_id', 'current_stock', 'incoming_stock', 'average_daily_sales',
+                    'lead_time_days', 'min_reorder_quantity', 'cost_per_unit', 'criticality',
+                    'days_remaining', 'needs_reorder', 'safety_threshold', 'warehouse')
+
+# Sortable columns with string values; the others are numbers, except the needs_reorder flag
+STRING_COLUMNS = ('product_id', 'warehouse')
+
+# Default order: catalog insertion order, like iterating the store
+INSERTION_ORDER = 'insertion'
+
+# Row columns the index is partitioned by, so filtering on them selects partitions instead of rows
+PARTITION_COLUMNS = ('criticality', 'needs_reorder', 'warehouse')
+Partition = Tuple[str, bool, str]
+# Orders kept as sorted lists in each partition; the partition columns use the insertion order
+INDEXED_COLUMNS = (INSERTION_ORDER,) + tuple(column for column in SORTABLE_COLUMNS
+                                             if column not in PARTITION_COLUMNS)
+
+
+def _partition(row: Dict[str, Any]) -> Partition:
+    return row['criticality'], row['needs_reorder'], row['warehouse']
+
+
+class ProductIndex:
+    """Precomputed product rows with sorted indexes for paginated reads.
+
+    Each product's API row (including days_remaining, needs_reorder and
+    safety_threshold) is computed once when the product changes. Rows are
+    partitioned by (criticality, needs_reorder, warehouse), the columns
+    /api/products filters on. For insertion order and every other sortable
+    column, each partition keeps its insertion sequences sorted by
+    (value, sequence); criticality sorts by urgency (CRITICALITY_ORDER),
+    not alphabetically, and the partition columns, constant within a
+    partition, reuse the insertion order. A query merges the lists of the
+    partitions its filters select from a bisected start, so a page costs
+    O(partitions * log n + page size) however selective the filters are.
+
+    A days_remaining range is bisected as well when sorting by it. Under
+    another sort, the rows in range are either gathered from the
+    days_remaining lists and sorted, or the sorted lists are walked with a
+    range check, whichever visits fewer rows. Cursors are opaque tokens
+    that encode the last (value, sequence) key returned.
+
+    With a BatchReorderCalculator, the initial catalog's rows and sorted
+    lists are built from the store's columns with vectorized sorts.
+    """
+
+    BULK_THRESHOLD = 256
+
+    def __init__(self, calculator: ReorderCalculator, store: Optional[ProductStore] = None):
+        self.calculator = calculator
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+        self._partitions: Dict[Partition, Dict[str, List[int]]] = {}
+        self._keys: Dict[str, Callable[[int], Tuple[Any, int]]] = {
+            column: self._key_function(column) for column in (INSERTION_ORDER,) + SORTABLE_COLUMNS
+        }
+
+        if store is not None:
+            if isinstance(calculator, BatchReorderCalculator):
+                self._load(store.columns())
+            else:
+                self.apply([(None, product) for product in store])
+            store.subscribe(self.apply)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def build_row(self, product: Product) -> Dict[str, Any]:
+        """API representation of a product with its computed reorder status"""
+        return {
+            'product_id': product.product_id,
+            'current_stock': product.current_stock,
+            'incoming_stock': product.incoming_stock,
+            'average_daily_sales': product.average_daily_sales,
+            'lead_time_days': product.lead_time_days,
+            'min_reorder_quantity': product.min_reorder_quantity,
+            'cost_per_unit': product.cost_per_unit,
+            'criticality': product.criticality,
+            'days_remaining': round(self.calculator.calculate_days_remaining(product), 1),
+            'needs_reorder': self.calculator.needs_reorder(product),
+            'safety_threshold': self.calculator.calculate_safety_threshold(product),
+            'warehouse': product.warehouse
+        }
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Precomputed row for a product, or None"""
+        sequence = self._sequence.get(product_id)
+        return None if sequence is None else self._rows[sequence]
+
+    def apply(self, changes: List[Change]):
+        """Update rows and sorted indexes from a list of (old, new) store changes"""
+        bulk = len(changes) > max(self.BULK_THRESHOLD, len(self._rows) // 8)
+        rows = self._rows
+        for old, new in changes:
+            if old is None:
+                sequence = self._next_sequence
+                self._next_sequence += 1
+                self._sequence[new.product_id] = sequence
+                rows[sequence] = self.build_row(new)
+                if not bulk:
+                    self._index(sequence)
+            elif new is None:
+                sequence = self._sequence.pop(old.product_id)
+                if not bulk:
+                    self._unindex(sequence)
+                del rows[sequence]
+            else:
+                sequence = self._sequence[old.product_id]
+                row = self.build_row(new)
+                previous = rows[sequence]
+                if bulk:
+                    rows[sequence] = row
+                elif _partition(previous) != _partition(row):
+                    self._unindex(sequence)
+                    rows[sequence] = row
+                    self._index(sequence)
+                else:
+                    # Only the sort keys of columns whose value changed move
+                    lists = self._partitions[_partition(row)]
+                    moved = [column for column in INDEXED_COLUMNS
+                             if column != INSERTION_ORDER and previous[column] != row[column]]
+                    for column in moved:
+                        key = self._keys[column]
+                        del lists[column][bisect_left(lists[column], key(sequence), key=key)]
+                    rows[sequence] = row
+                    for column in moved:
+                        insort(lists[column], sequence, key=self._keys[column])
+
+        if bulk:
+            members: Dict[Partition, List[int]] = {}
+            for sequence, row in rows.items():
+                members.setdefault(_partition(row), []).append(sequence)
+            self._partitions = {}
+            for partition, sequences in members.items():
+                sequences.sort()
+                self._partitions[partition] = self._sorted_lists(
+                    np.array(sequences, dtype=np.int64),
+                    lambda column, sequences=sequences: [rows[sequence][column] for sequence in sequences])
+
+    def _load(self, columns: ProductColumns):
+        """Index a whole catalog from its columns, computing the derived fields for all rows at once"""
+        calculator = self.calculator
+        days_remaining = [round(days, 1) for days in calculator.calculate_days_remaining_batch(columns).tolist()]
+        needs_reorder = calculator.needs_reorder_batch(columns)
+        safety_threshold = columns.lead_time_days + calculator.SAFETY_BUFFER_DAYS
+        fields = zip(columns.product_ids, columns.current_stock.tolist(), columns.incoming_stock.tolist(),
+                     columns.average_daily_sales.tolist(), columns.lead_time_days.tolist(),
+                     columns.min_reorder_quantity.tolist(), columns.cost_per_unit.tolist(),
+                     columns.criticality_code.tolist(), days_remaining, needs_reorder.tolist(),
+                     safety_threshold.tolist(), columns.warehouses)
+        for sequence, (product_id, stock, incoming, sales, lead_time, moq, cost, code, days, reorder,
+                       threshold, warehouse) in enumerate(fields, self._next_sequence):
+            self._sequence[product_id] = sequence
+            self._rows[sequence] = {
+                'product_id': product_id,
+                'current_stock': stock,
+                'incoming_stock': incoming,
+                'average_daily_sales': sales,
+                'lead_time_days': lead_time,
+                'min_reorder_quantity': moq,
+                'cost_per_unit': cost,
+                'criticality': CRITICALITY_LABELS[code],
+                'days_remaining': days,
+                'needs_reorder': reorder,
+                'safety_threshold': threshold,
+                'warehouse': warehouse
+            }
+
+        # Sequences equal catalog rows when the index starts empty, so the column arrays are the sort values
+        arrays = {
+            'product_id': np.array(columns.product_ids),
+            'current_stock': columns.current_stock,
+            'incoming_stock': columns.incoming_stock,
+            'average_daily_sales': columns.average_daily_sales,
+            'lead_time_days': columns.lead_time_days,
+            'min_reorder_quantity': columns.min_reorder_quantity,
+            'cost_per_unit': columns.cost_per_unit,
+            'days_remaining': np.array(days_remaining),
+            'safety_threshold': safety_threshold
+        }
+        group = columns.criticality_code.astype(np.int64) * 2 + needs_reorder
+        for warehouse, warehouse_rows in columns.warehouse_rows().items():
+            warehouse_rows = np.array(warehouse_rows, dtype=np.int64)
+            for code_and_reorder in np.unique(group[warehouse_rows]).tolist():
+                members = warehouse_rows[group[warehouse_rows] == code_and_reorder]
+                partition = (CRITICALITY_LABELS[code_and_reorder // 2], bool(code_and_reorder % 2), warehouse)
+                self._partitions[partition] = self._sorted_lists(
+                    members + self._next_sequence, lambda column, members=members: arrays[column][members])
+        self._next_sequence += len(columns)
+
+    @staticmethod
+    def _sorted_lists(sequences: np.ndarray,
+                      values: Callable[[str], Any]) -> Dict[str, List[int]]:
+        """A partition's sorted lists from its ascending sequences and a column's values for them.
+
+        A stable argsort of the values keeps ties in sequence order, which is
+        the (value, sequence) order.
+        """
+        lists = {INSERTION_ORDER: sequences.tolist()}
+        for column in INDEXED_COLUMNS[1:]:
+            lists[column] = sequences[np.argsort(np.asarray(values(column)), kind='stable')].tolist()
+        return lists
+
+    def query(self, criticality: Optional[Iterable[str]] = None, needs_reorder: Optional[bool] = None,
+              min_days_remaining: Optional[float] = None, max_days_remaining: Optional[float] = None,
+              sort: str = INSERTION_ORDER, descending: bool = False, cursor: Optional[str] = None,
+              limit: Optional[int] = None,
+              warehouse: Optional[Iterable[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of rows and the cursor for the next page (None at the end).
+
+        Raises ValueError for an unknown sort column or an invalid cursor.
+        """
+        if sort not in self._keys:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be positive")
+        key = self._keys[sort]
+        column = INSERTION_ORDER if sort in PARTITION_COLUMNS else sort
+        position = None if cursor is None else self._decode_cursor(cursor, sort, descending)
+
+        selected = self._select(criticality, needs_reorder, warehouse)
+
+        # Runs of (sorted list, start, end) to merge
+        check_days = False
+        if sort == 'days_remaining':
+            runs = [(lists[column], *self._days_span(lists, min_days_remaining, max_days_remaining))
+                    for lists in selected]
+        elif min_days_remaining is not None or max_days_remaining is not None:
+            spans = [(lists, *self._days_span(lists, min_days_remaining, max_days_remaining)) for lists in selected]
+            in_range = sum(end - start for _, start, end in spans)
+            total = sum(len(lists[column]) for lists in selected)
+            # A walk visits about total / in_range rows per row it returns, each
+            # through the merge; gathering visits each row in range once
+            walk_cost = total if limit is None else min(total, limit * total / max(in_range, 1))
+            if in_range < walk_cost:
+                gathered = sorted((sequence for lists, start, end in spans
+                                   for sequence in lists['days_remaining'][start:end]), key=key)
+                runs = [(gathered, 0, len(gathered))]
+            else:
+                runs = [(lists[column], 0, len(lists[column])) for lists in selected]
+                check_days = True
+        else:
+            runs = [(lists[column], 0, len(lists[column])) for lists in selected]
+
+        iterators = []
+        for keys, start, end in runs:
+            if position is not None:
+                if descending:
+                    end = min(end, bisect_left(keys, position, start, end, key=key))
+                else:
+                    start = max(start, bisect_right(keys, position, start, end, key=key))
+            if start >= end:
+                continue
+            if descending:
+                iterators.append(map(keys.__getitem__, range(end - 1, start - 1, -1)))
+            else:
+                iterators.append(islice(keys, start, end))
+        merged = iterators[0] if len(iterators) == 1 else merge(*iterators, key=key, reverse=descending)
+
+        rows = self._rows
+        page: List[Dict[str, Any]] = []
+        last = None
+        for sequence in merged:
+            row = rows[sequence]
+            if check_days:
+                if min_days_remaining is not None and row['days_remaining'] < min_days_remaining:
+                    continue
+                if max_days_remaining is not None and row['days_remaining'] > max_days_remaining:
+                    continue
+            if limit is not None and len(page) == limit:
+                return page, self._encode_cursor(sort, descending, key(last))
+            page.append(row)
+            last = sequence
+
+        return page, None
+
+    def count(self, criticality: Optional[Iterable[str]] = None, needs_reorder: Optional[bool] = None,
+              min_days_remaining: Optional[float] = None, max_days_remaining: Optional[float] = None,
+              warehouse: Optional[Iterable[str]] = None) -> int:
+        """Number of rows matching the filters of query(), in O(partitions * log n)"""
+        selected = self._select(criticality, needs_reorder, warehouse)
+        if min_days_remaining is None and max_days_remaining is None:
+            return sum(len(lists[INSERTION_ORDER]) for lists in selected)
+        return sum(end - start for start, end in (
+            self._days_span(lists, min_days_remaining, max_days_remaining) for lists in selected))
+
+    def value_counts(self, column: str) -> Dict[Any, int]:
+        """Number of rows per distinct value of a sortable column, in O(partitions * distinct values * log n)"""
+        counts: Dict[Any, int] = {}
+        for partition, lists in self._partitions.items():
+            if column in PARTITION_COLUMNS:
+                value = partition[PARTITION_COLUMNS.index(column)]
+                counts[value] = counts.get(value, 0) + len(lists[INSERTION_ORDER])
+                continue
+            keys, key = lists[column], self._keys[column]
+            i = 0
+            while i < len(keys):
+                value = key(keys[i])[0]
+                end = bisect_right(keys, (value, float('inf')), i, key=key)
+                counts[value] = counts.get(value, 0) + end - i
+                i = end
+        return counts
+
+    def _key_function(self, column: str) -> Callable[[int], Tuple[Any, int]]:
+        """Sort key of a row, by insertion sequence"""
+        rows = self._rows
+        if column == INSERTION_ORDER:
+            return lambda sequence: (sequence, sequence)
+        if column == 'criticality':
+            return lambda sequence: (CRITICALITY_ORDER[rows[sequence]['criticality']], sequence)
+        return lambda sequence: (rows[sequence][column], sequence)
+
+    def _select(self, criticality: Optional[Iterable[str]], needs_reorder: Optional[bool],
+                warehouse: Optional[Iterable[str]]) -> List[Dict[str, List[int]]]:
+        """Sorted lists of the partitions the filters select"""
+        allowed = set(criticality) if criticality else None
+        sites = set(warehouse) if warehouse else None
+        return [lists for (level, reorder, site), lists in list(self._partitions.items())
+                if (allowed is None or level in allowed)
+                and (needs_reorder is None or reorder == needs_reorder)
+                and (sites is None or site in sites)]
+
+    def _days_span(self, lists: Dict[str, List[int]], low: Optional[float],
+                   high: Optional[float]) -> Tuple[int, int]:
+        """Bounds of a days_remaining range in a partition's days_remaining list"""
+        keys, key = lists['days_remaining'], self._keys['days_remaining']
+        start = 0 if low is None else bisect_left(keys, (low,), key=key)
+        end = len(keys) if high is None else bisect_right(keys, (high, float('inf')), key=key)
+        return start, end
+
+    def _index(self, sequence: int):
+        partition = _partition(self._rows[sequence])
+        lists = self._partitions.get(partition)
+        if lists is None:
+            lists = self._partitions[partition] = {column: [] for column in INDEXED_COLUMNS}
+        for column, keys in lists.items():
+            insort(keys, sequence, key=self._keys[column])
+
+    def _unindex(self, sequence: int):
+        partition = _partition(self._rows[sequence])
+        lists = self._partitions[partition]
+        for column, keys in lists.items():
+            key = self._keys[column]
+            del keys[bisect_left(keys, key(sequence), key=key)]
+        if not lists[INSERTION_ORDER]:
+            del self._partitions[partition]
+
+    @staticmethod
+    def _encode_cursor(sort: str, descending: bool, key: Tuple[Any, int]) -> str:
+        payload = json.dumps([sort, descending, key[0], key[1]]).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+        try:
+            cursor_sort, cursor_descending, value, sequence = json.loads(base64.urlsafe_b64decode(cursor))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if cursor_sort != sort or cursor_descending != descending:
+            raise ValueError("Cursor does not match the requested sort order")
+        # A value of the wrong type would fail the comparisons in bisect
+        if sort in STRING_COLUMNS:
+            valid = isinstance(value, str)
+        elif sort == 'needs_reorder':
+            valid = isinstance(value, bool)
+        else:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if not valid or not isinstance(sequence, int) or isinstance(sequence, bool):
+            raise ValueError("Invalid cursor")
+        return (value, sequence)
@@ -0,0 +1,176 @@
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from columnar import ProductColumns, CRITICALITY_LABELS
+from metrics import timed
+
+# An expected delivery: (days from today, units)
+Arrival = Tuple[int, int]
+
+
+def schedule_arrivals(columns: ProductColumns, orders: Iterable[Dict[str, Any]] = (),
+                      today: Optional[date] = None,
+                      earlier: Optional[Dict[str, int]] = None) -> Dict[str, List[Arrival]]:
+    """Expected delivery days of each product's incoming_stock.
+
+    Recorded purchase orders (newest first, as returned by
+    SQLiteRepository.get_orders or orders_since) are assumed to be the open
+    ones and land lead_time_days after they were placed; overdue orders are
+    due today. `earlier` gives the units per product of older orders that
+    were not passed in, which are overdue too. Incoming stock not explained
+    by recorded orders arrives lead_time_days from today, as in the Monte
+    Carlo simulation.
+    """
+    today = today or date.today()
+    rows = columns.row_index()
+    open_units = dict(zip(columns.product_ids, columns.incoming_stock.tolist()))
+    lead_times = columns.lead_time_days.tolist()
+    schedule: Dict[str, List[Arrival]] = {}
+
+    def deliver(product_id: str, due: int, quantity: int):
+        units = min(quantity, open_units.get(product_id, 0))
+        if units > 0:
+            schedule.setdefault(product_id, []).append((due, units))
+            open_units[product_id] -= units
+
+    for order in orders:
+        product_id = order['product_id']
+        if open_units.get(product_id, 0) <= 0:
+            continue
+        placed = datetime.fromisoformat(order['created_at']).date()
+        deliver(product_id, max((placed - today).days + lead_times[rows[product_id]], 0), order['quantity'])
+    for product_id, quantity in (earlier or {}).items():
+        deliver(product_id, 0, quantity)
+
+    for product_id, units in open_units.items():
+        if units > 0:
+            schedule.setdefault(product_id, []).append((lead_times[rows[product_id]], units))
+    return schedule
+
+
+class StockProjector:
+    """Deterministic forward projection of on-hand stock for a whole catalog.
+
+    Every SKU sells its average_daily_sales each day (unmet demand is lost,
+    so stock never goes negative) and receives its scheduled arrivals at
+    the start of their day. The catalog is stepped one day at a time as a
+    single array operation over all SKUs, like the Monte Carlo simulation
+    but with one deterministic scenario. The result holds:
+
+    - the on-hand stock at the start of each sampled day (a downsampled curve);
+    - the first projected stockout day, with the fraction of the day at
+      which stock runs out (NaN if there is none within the horizon).
+
+    Unlike ReorderCalculator.calculate_days_remaining, incoming stock counts
+    from the day it arrives.
+    """
+
+    def __init__(self, horizon_days: int = 90):
+        self.horizon_days = horizon_days
+
+    @staticmethod
+    def sample_days(horizon_days: int, points: int) -> np.ndarray:
+        """Up to `points` evenly spaced whole days from 0 to the horizon, both included"""
+        # There are only horizon_days + 1 distinct days, so never allocate more samples
+        points = min(max(points, 2), horizon_days + 1)
+        return np.unique(np.round(np.linspace(0, horizon_days, points)).astype(np.int64))
+
+    @timed('project_stock')
+    def project(self, columns: ProductColumns, horizon_days: Optional[int] = None, points: int = 31,
+                arrivals: Optional[Dict[str, List[Arrival]]] = None) -> Dict[str, np.ndarray]:
+        """Project on-hand stock; arrivals default to all incoming stock landing after lead_time_days"""
+        horizon_days = self.horizon_days if horizon_days is None else horizon_days
+        if horizon_days <= 0:
+            raise ValueError("horizon_days must be positive")
+        if arrivals is None:
+            arrival_rows = np.flatnonzero(columns.incoming_stock > 0)
+            arrival_days = columns.lead_time_days[arrival_rows]
+            arrival_units = columns.incoming_stock[arrival_rows].astype(np.float64)
+        else:
+            index = columns.row_index()
+            scheduled = [(index[product_id], day, units) for product_id, deliveries in arrivals.items()
+                         if product_id in index for day, units in deliveries]
+            arrival_rows, arrival_days, arrival_units = (np.array(values, dtype=dtype) for values, dtype in zip(
+                zip(*scheduled) if scheduled else ((), (), ()), (np.int64, np.int64, np.float64)))
+
+        # Deliveries grouped by day, so each step adds only that day's arrivals
+        within = arrival_days <= horizon_days
+        order = np.argsort(arrival_days[within], kind='stable')
+        rows, days, units = arrival_rows[within][order], arrival_days[within][order], arrival_units[within][order]
+        bounds = np.searchsorted(days, np.arange(horizon_days + 2))
+
+        sales = columns.average_daily_sales
+        on_hand = columns.current_stock.astype(np.float64)
+        samples = self.sample_days(horizon_days, points)
+        curves = np.empty((len(on_hand), len(samples)))
+        stockout_day = np.full(len(on_hand), np.nan)
+        pending = np.ones(len(on_hand), dtype=bool)
+        sample = 0
+
+        for day in range(horizon_days + 1):
+            start, end = bounds[day], bounds[day + 1]
+            if start < end:
+                np.add.at(on_hand, rows[start:end], units[start:end])
+            if samples[sample] == day:
+                curves[:, sample] = on_hand
+                sample += 1
+            if day == horizon_days:
+                break
+            running_out = np.flatnonzero(pending & (on_hand < sales))
+            if len(running_out):
+                stockout_day[running_out] = day + on_hand[running_out] / sales[running_out]
+                pending[running_out] = False
+            on_hand -= sales
+            np.maximum(on_hand, 0, out=on_hand)
+
+        first_arrival = np.full(len(on_hand), np.inf)
+        np.minimum.at(first_arrival, arrival_rows, arrival_days)
+        return {
+            'days': samples,
+            'on_hand': curves,
+            'stockout_day': stockout_day,
+            'next_arrival_day': np.where(np.isinf(first_arrival), np.nan, first_arrival)
+        }
+
+    @staticmethod
+    def soonest_stockouts(projection: Dict[str, np.ndarray], limit: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Catalog rows ordered by projected stockout (none last), and how many stock out within the horizon"""
+        stockout_day = projection['stockout_day']
+        order = np.argsort(stockout_day, kind='stable')[:limit]
+        return order, int(np.count_nonzero(~np.isnan(stockout_day)))
+
+    @staticmethod
+    def rows(columns: ProductColumns, projection: Dict[str, np.ndarray], selected: Iterable[int],
+             start: Optional[date] = None) -> List[Dict[str, Any]]:
+        """API rows for the selected catalog rows, with stockout and arrival dates counted from start"""
+        start = start or date.today()
+
+        def as_date(day: float) -> Optional[str]:
+            return None if math.isnan(day) else (start + timedelta(days=int(day))).isoformat()
+
+        selected = np.asarray(list(selected), dtype=np.int64)
+        curves = np.round(projection['on_hand'][selected], 1).tolist()
+        stockout_days = projection['stockout_day'][selected].tolist()
+        arrival_days = projection['next_arrival_day'][selected].tolist()
+        return [
+            {
+                'product_id': columns.product_ids[row],
+                'warehouse': columns.warehouses[row],
+                'criticality': CRITICALITY_LABELS[code],
+                'current_stock': stock,
+                'incoming_stock': incoming,
+                'stockout_day': None if math.isnan(stockout) else round(stockout, 1),
+                'stockout_date': as_date(stockout),
+                'next_arrival_day': None if math.isnan(arrival) else int(arrival),
+                'next_arrival_date': as_date(arrival),
+                'on_hand': curve
+            }
+            for row, code, stock, incoming, stockout, arrival, curve in zip(
+                selected.tolist(),
+                columns.criticality_code[selected].tolist(),
+                columns.current_stock[selected].tolist(),
+                columns.incoming_stock[selected].tolist(),
+                stockout_days, arrival_days, curves)
+        ]
@@ -0,0 +1,216 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Product
+from columnar import ProductColumns, BatchReorderCalculator
+from reorder_logic import ReorderCalculator, CRITICALITY_ORDER
+from store import Change, ProductStore
+from scenario import ScenarioView
+from metrics import timed
+
+# Criticality ranks in sort order
+RANKS = sorted(CRITICALITY_ORDER.values())
+
+# Sort key of a recommendation within its criticality: (days_remaining, insertion sequence)
+Key = Tuple[float, int]
+
+
+class RecommendationIndex:
+    """Reorder recommendations maintained incrementally as the store changes.
+
+    Each mutation re-evaluates only the affected product. Recommendations are
+    partitioned by warehouse, with one sorted list per criticality level in each
+    partition, keyed by (days_remaining, insertion sequence). A warehouse query
+    reads its own partition in O(k); a global query k-way merges the partitions,
+    which gives exactly the order of
+    ReorderCalculator.generate_reorder_recommendations because the
+    insertion sequence is shared by all partitions. Neither needs a full sort of
+    the catalog.
+
+    With a BatchReorderCalculator, the initial catalog is evaluated from the
+    store's columns in one vectorized pass instead of product by product.
+    """
+
+    # Change batches larger than this (or than an eighth of the index) rebuild
+    # the sorted lists in one pass instead of inserting keys one at a time.
+    BULK_THRESHOLD = 256
+
+    def __init__(self, calculator: ReorderCalculator, store: Optional[ProductStore] = None):
+        self.calculator = calculator
+        self.store = store
+        self._partitions: Dict[str, Dict[int, List[Key]]] = {}
+        self._entries: Dict[str, Tuple[str, int, Key]] = {}
+        self._by_key: Dict[Key, Dict[str, Any]] = {}
+        # Insertion sequence per product, so ties on days_remaining keep catalog order
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+
+        if store is not None:
+            if isinstance(calculator, BatchReorderCalculator):
+                self._load(store.columns())
+            else:
+                self.apply([(None, product) for product in store])
+            store.subscribe(self.apply)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Iterate over a snapshot of each key list so a mutation during a long
+        # streaming read cannot break the iteration
+        by_key = self._by_key
+        for rank in RANKS:
+            runs = [list(partition[rank]) for partition in list(self._partitions.values()) if partition[rank]]
+            for key in (runs[0] if len(runs) == 1 else merge(*runs)):
+                recommendation = by_key.get(key)
+                if recommendation is not None:
+                    yield recommendation
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._entries
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Current recommendation for a product, or None if it needs no reorder"""
+        entry = self._entries.get(product_id)
+        return self._by_key[entry[2]] if entry else None
+
+    def warehouses(self) -> Dict[str, int]:
+        """Number of recommendations per warehouse"""
+        counts = {warehouse: sum(map(len, partition.values())) for warehouse, partition in self._partitions.items()}
+        return {warehouse: count for warehouse, count in sorted(counts.items()) if count}
+
+    @timed('recommendation_index.recommendations')
+    def recommendations(self, limit: Optional[int] = None, max_days_remaining: Optional[float] = None,
+                        warehouse: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recommendations sorted by criticality then days remaining, for one warehouse or all.
+
+        max_days_remaining is answered by a bisect on each criticality's
+        sorted keys and limit stops the scan early, so the cost is
+        O(partitions * log n + answer size).
+        """
+        if limit is None and max_days_remaining is None and warehouse is None:
+            return list(self)
+        by_key = self._by_key
+        recommendations: List[Dict[str, Any]] = []
+        for rank in RANKS:
+            count = None if limit is None else limit - len(recommendations)
+            keys = self._ranked_keys(rank, warehouse, max_days_remaining, count)
+            recommendations.extend(by_key[key] for key in keys)
+            if limit is not None and len(recommendations) >= limit:
+                break
+        return recommendations
+
+    @timed('recommendation_index.recommendations_for')
+    def recommendations_for(self, scenario: ScenarioView) -> List[Dict[str, Any]]:
+        """Recommendations as seen through a scenario overlay of the indexed store.
+
+        Only the overridden products are re-evaluated; their recommendations
+        are merged into the indexed ones, so the cost is O(k + changed SKUs).
+        Views over any other store fall back to a full calculation.
+        """
+        if self.store is None or scenario.base is not self.store:
+            return self.calculator.generate_reorder_recommendations(scenario)
+
+        overrides = scenario.overrides
+        replaced: Dict[int, List[Tuple[Key, Dict[str, Any]]]] = {rank: [] for rank in RANKS}
+        for product_id, product in overrides.items():
+            recommendation = self.calculator.process_product(product)
+            if recommendation:
+                key = (recommendation['days_remaining'], self._sequence[product_id])
+                replaced[CRITICALITY_ORDER[recommendation['criticality']]].append((key, recommendation))
+
+        by_key = self._by_key
+        recommendations = []
+        for rank in RANKS:
+            indexed = ((key, by_key[key]) for key in self._ranked_keys(rank)
+                       if by_key[key]['product_id'] not in overrides)
+            merged = merge(indexed, sorted(replaced[rank], key=itemgetter(0)), key=itemgetter(0))
+            recommendations.extend(recommendation for _, recommendation in merged)
+        return recommendations
+
+    def apply(self, changes: List[Change]):
+        """Update the index from a list of (old, new) store changes"""
+        bulk = len(changes) > max(self.BULK_THRESHOLD, len(self._entries) // 8)
+        for old, new in changes:
+            if new is None:
+                self._discard(old.product_id, bulk)
+                self._sequence.pop(old.product_id, None)
+            else:
+                if old is None:
+                    self._sequence[new.product_id] = self._next_sequence
+                    self._next_sequence += 1
+                self._refresh(new, bulk)
+
+        if bulk:
+            self._rebuild()
+
+    def _load(self, columns: ProductColumns):
+        """Index a whole catalog from its columns"""
+        product_ids, warehouses = columns.product_ids, columns.warehouses
+        self._sequence = {product_id: sequence for sequence, product_id in enumerate(product_ids)}
+        self._next_sequence = len(product_ids)
+        rows, recommendations = self.calculator.recommendation_rows(columns)
+        for row, rank, recommendation in zip(rows.tolist(), columns.criticality_code[rows].tolist(),
+                                             recommendations):
+            key = (recommendation['days_remaining'], row)
+            self._entries[product_ids[row]] = (warehouses[row], rank, key)
+            self._by_key[key] = recommendation
+        self._rebuild()
+
+    def _rebuild(self):
+        """Rebuild every sorted key list from the entries"""
+        self._partitions = {}
+        for warehouse, rank, key in self._entries.values():
+            self._partition(warehouse)[rank].append(key)
+        for partition in self._partitions.values():
+            for keys in partition.values():
+                keys.sort()
+
+    def _partition(self, warehouse: str) -> Dict[int, List[Key]]:
+        partition = self._partitions.get(warehouse)
+        if partition is None:
+            partition = self._partitions[warehouse] = {rank: [] for rank in RANKS}
+        return partition
+
+    def _ranked_keys(self, rank: int, warehouse: Optional[str] = None, max_days_remaining: Optional[float] = None,
+                     count: Optional[int] = None) -> Iterable[Key]:
+        """Keys of one criticality in order, from one warehouse's partition or merged across all"""
+        if warehouse is not None:
+            partition = self._partitions.get(warehouse)
+            runs = [partition[rank]] if partition else []
+        else:
+            runs = [partition[rank] for partition in self._partitions.values() if partition[rank]]
+        if max_days_remaining is not None:
+            bound = (max_days_remaining, float('inf'))
+            runs = [(keys, bisect_right(keys, bound)) for keys in runs]
+        else:
+            runs = [(keys, len(keys)) for keys in runs]
+        if not runs:
+            return ()
+        if len(runs) == 1:
+            keys, end = runs[0]
+            return keys[:end if count is None else min(end, count)]
+        return islice(merge(*(islice(keys, end) for keys, end in runs)), count)
+
+    def _refresh(self, product: Product, bulk: bool = False):
+        self._discard(product.product_id, bulk)
+        recommendation = self.calculator.process_product(product)
+        if recommendation:
+            rank = CRITICALITY_ORDER[recommendation['criticality']]
+            key = (recommendation['days_remaining'], self._sequence[product.product_id])
+            if not bulk:
+                insort(self._partition(product.warehouse)[rank], key)
+            self._entries[product.product_id] = (product.warehouse, rank, key)
+            self._by_key[key] = recommendation
+
+    def _discard(self, product_id: str, bulk: bool = False):
+        entry = self._entries.pop(product_id, None)
+        if entry:
+            warehouse, rank, key = entry
+            if not bulk:
+                keys = self._partitions[warehouse][rank]
+                del keys[bisect_left(keys, key)]
+            del self._by_key[key]
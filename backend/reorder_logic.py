@@ -1,5 +1,10 @@
-from typing import List, Dict, Any
-from models import Product
+from heapq import nsmallest
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from models import Product, CRITICALITY_LEVELS
+from metrics import timed
+
+# Sort order used for recommendations: high criticality first
+CRITICALITY_ORDER = {level: rank for rank, level in enumerate(CRITICALITY_LEVELS)}
 
 class ReorderCalculator:
     """Core logic for warehouse reordering decisions"""
@@ -48,22 +53,51 @@ class ReorderCalculator:
                     'suggested_reorder_quantity': reorder_qty,
                     'estimated_cost': round(estimated_cost, 2),
                     'criticality': product.criticality,
-                    'lead_time_days': product.lead_time_days
+                    'lead_time_days': product.lead_time_days,
+                    'warehouse': product.warehouse
                 }
         
         return None
     
-    def generate_reorder_recommendations(self, products: List[Product]) -> List[Dict[str, Any]]:
-        """Generate reorder recommendations for all products"""
+    @timed('generate_reorder_recommendations')
+    def generate_reorder_recommendations(self, products: List[Product], limit: Optional[int] = None,
+                                         max_days_remaining: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Generate reorder recommendations for all products.
+
+        max_days_remaining keeps only recommendations stocking out within
+        that many days; limit keeps the first `limit` in the usual order,
+        selected with a heap in O(n log limit) instead of a full sort.
+        """
         recommendations = []
         
         for product in products:
             recommendation = self.process_product(product)
-            if recommendation:
+            if recommendation and (max_days_remaining is None
+                                   or recommendation['days_remaining'] <= max_days_remaining):
                 recommendations.append(recommendation)
         
         # Sort by criticality (high first) then by days remaining
-        criticality_order = {'high': 0, 'medium': 1, 'low': 2}
-        recommendations.sort(key=lambda x: (criticality_order[x['criticality']], x['days_remaining']))
+        sort_key = lambda x: (CRITICALITY_ORDER[x['criticality']], x['days_remaining'])
+        if limit is not None and limit < len(recommendations):
+            # nsmallest is stable, so ties keep their catalog order exactly as sort() does
+            return nsmallest(limit, recommendations, key=sort_key)
+        recommendations.sort(key=sort_key)
+        
+        return recommendations
+    
+    def iter_reorder_recommendations(self, products: Iterable[Product]) -> Iterator[Dict[str, Any]]:
+        """Lazily yield recommendations in the same order as generate_reorder_recommendations.
+
+        Only a compact sort key and a product reference are held per
+        recommendation; the recommendation dicts are built one at a time as
+        the caller consumes them.
+        """
+        keys = []
+        for product in products:
+            if self.needs_reorder(product) and self.calculate_reorder_quantity(product) > 0:
+                days_remaining = round(self.calculate_days_remaining(product), 1)
+                keys.append((CRITICALITY_ORDER[product.criticality], days_remaining, len(keys), product))
         
-        return recommendations
\ No newline at end of file
+        keys.sort(key=lambda key: key[:3])
+        for key in keys:
+            yield self.process_product(key[3])
@@ -1,7 +1,28 @@
 import csv
-from typing import List, Dict, Any
+import io
+import json
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime
 
+from metrics import timed
+
+# Recommendation fields in export order, with their human-readable column titles
+CSV_FIELDNAMES = ['product_id', 'current_stock', 'incoming_stock', 'days_remaining',
+                  'suggested_reorder_quantity', 'estimated_cost', 'criticality', 'lead_time_days']
+CSV_HEADERS = ['Product ID', 'Current Stock', 'Incoming Stock', 'Days Remaining',
+               'Suggested Reorder Quantity', 'Estimated Cost', 'Criticality', 'Lead Time Days']
+
+
+def csv_fieldnames(with_warehouse: bool = False) -> List[str]:
+    """Export fields; the warehouse column is opt-in so the CSV layout stays the same for existing readers"""
+    return CSV_FIELDNAMES + ['warehouse'] if with_warehouse else CSV_FIELDNAMES
+
+
+def csv_headers(with_warehouse: bool = False) -> List[str]:
+    """Column titles matching csv_fieldnames"""
+    return CSV_HEADERS + ['Warehouse'] if with_warehouse else CSV_HEADERS
+
+
 class ReorderReportGenerator:
     """Generate reorder reports in various formats"""
     
@@ -11,14 +32,8 @@ class ReorderReportGenerator:
         print("📦 SMART WAREHOUSE REORDERING SYSTEM - INVENTORY SUMMARY")
         print("="*80)
         
-        total_products = len(products)
-        products_needing_reorder = len(recommendations)
-        total_reorder_cost = sum(rec['estimated_cost'] for rec in recommendations)
-        
-        print(f"📊 Total Products: {total_products}")
-        print(f"⚠️  Products Needing Reorder: {products_needing_reorder}")
-        print(f"💰 Total Estimated Reorder Cost: ${total_reorder_cost:,.2f}")
-        print(f"📅 Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self.print_totals(len(products), len(recommendations),
+                          sum(rec['estimated_cost'] for rec in recommendations))
         
         if not recommendations:
             print("\n✅ All products have sufficient stock levels!")
@@ -28,6 +43,13 @@ class ReorderReportGenerator:
         print("🚨 REORDER RECOMMENDATIONS")
         print("="*80)
     
+    def print_totals(self, total_products: int, products_needing_reorder: int, total_reorder_cost: float):
+        """Print the headline numbers of a report"""
+        print(f"📊 Total Products: {total_products}")
+        print(f"⚠️  Products Needing Reorder: {products_needing_reorder}")
+        print(f"💰 Total Estimated Reorder Cost: ${total_reorder_cost:,.2f}")
+        print(f"📅 Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
     def print_recommendations(self, recommendations: List[Dict[str, Any]]):
         """Print detailed reorder recommendations"""
         if not recommendations:
@@ -44,19 +66,83 @@ class ReorderReportGenerator:
             print(f"   💵 Estimated Cost: ${rec['estimated_cost']:,.2f}")
             print(f"   🕒 Lead Time: {rec['lead_time_days']} days")
     
-    def export_to_csv(self, recommendations: List[Dict[str, Any]], filename: str = "reorder_report.csv"):
-        """Export recommendations to CSV file"""
-        if not recommendations:
-            print("ℹ️  No reorder recommendations to export.")
+    def print_stockout_risk(self, risks: List[Dict[str, Any]], limit: int = 10):
+        """Print the products most likely to stock out in a Monte Carlo run"""
+        at_risk = sorted((r for r in risks if r['stockout_probability'] > 0),
+                         key=lambda r: (-r['stockout_probability'], -r['expected_shortfall']))
+        
+        print(f"\n{'='*80}")
+        print("🎲 MONTE CARLO STOCKOUT RISK")
+        print("="*80)
+        
+        if not at_risk:
+            print("✅ No stockouts in any simulated scenario!")
             return
         
-        fieldnames = ['product_id', 'current_stock', 'incoming_stock', 'days_remaining', 
-                     'suggested_reorder_quantity', 'estimated_cost', 'criticality', 'lead_time_days']
+        for i, risk in enumerate(at_risk[:limit], 1):
+            print(f"\n{i}. {risk['product_id']} ({risk['criticality'].upper()} PRIORITY)")
+            print(f"   📉 Stockout Probability: {risk['stockout_probability']:.1%}")
+            print(f"   🕳️  Expected Shortfall: {risk['expected_shortfall']:,.1f} units")
+            print(f"   📅 Mean Stockout Day: {risk['mean_stockout_day']}")
+    
+    def print_plan(self, plan: Dict[str, Any], limit: int = 20):
+        """Print a budget-constrained purchase plan"""
+        print(f"\n{'='*80}")
+        print(f"💰 PURCHASE PLAN - BUDGET ${plan['budget']:,.2f}")
+        print("="*80)
+        print(f"🧾 Orders: {len(plan['orders'])}   Deferred: {len(plan['deferred'])}")
+        print(f"💵 Spent: ${plan['spent']:,.2f} of ${plan['unconstrained_cost']:,.2f} recommended "
+              f"(${plan['remaining']:,.2f} left)")
+        print(f"📅 Demand Days Covered: {plan['covered_days']:,.1f}")
+        
+        for i, line in enumerate(plan['orders'][:limit], 1):
+            partial = f" of {line['suggested_reorder_quantity']}" if line['status'] == 'partial' else ""
+            print(f"\n{i}. {line['product_id']} ({line['criticality'].upper()} PRIORITY)")
+            print(f"   📈 Order: {line['quantity']}{partial} units for ${line['estimated_cost']:,.2f}")
+            print(f"   ⏰ Days Remaining: {line['days_remaining']}   📅 Days Covered: {line['covered_days']}")
+        if len(plan['orders']) > limit:
+            print(f"\n   ... and {len(plan['orders']) - limit} more orders")
+    
+    @timed('export_csv_stream')
+    def iter_csv(self, recommendations: Iterable[Dict[str, Any]], headers: Optional[List[str]] = None,
+                 batch_size: int = 500, with_warehouse: bool = False) -> Iterator[str]:
+        """Lazily encode recommendations as CSV text, a batch of rows per chunk"""
+        fieldnames = csv_fieldnames(with_warehouse)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers or csv_headers(with_warehouse))
+        
+        for i, rec in enumerate(recommendations, 1):
+            writer.writerow([rec[field] for field in fieldnames])
+            if i % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    @timed('export_ndjson_stream')
+    def iter_ndjson(self, recommendations: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Lazily encode recommendations as newline-delimited JSON, one line per row"""
+        for rec in recommendations:
+            yield json.dumps(rec) + "\n"
+    
+    @timed('export_to_csv')
+    def export_to_csv(self, recommendations: Iterable[Dict[str, Any]], filename: str = "reorder_report.csv",
+                      with_warehouse: bool = False):
+        """Export recommendations to CSV file, streaming rows to disk as they arrive"""
+        rows = iter(recommendations)
+        first = next(rows, None)
+        if first is None:
+            print("ℹ️  No reorder recommendations to export.")
+            return
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=csv_fieldnames(with_warehouse), extrasaction='ignore')
             writer.writeheader()
-            writer.writerows(recommendations)
+            writer.writerow(first)
+            for rec in rows:
+                writer.writerow(rec)
         
         print(f"📄 Report exported to: {filename}")
 
@@ -0,0 +1,245 @@
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from persistence import SQLiteRepository
+from store import ProductStore
+
+SECONDS_PER_DAY = 86400
+# How far past the server's clock an event timestamp may be (clock skew between producers)
+MAX_FUTURE_SECONDS = 300
+# Velocity never drops to zero: Product requires positive average_daily_sales
+MIN_DAILY_SALES = 0.01
+
+
+@dataclass(slots=True)
+class DemandState:
+    """Demand history of one SKU: daily totals in a ring buffer plus the EWMA of completed days"""
+    day: int
+    ewma: float
+    ring: array
+
+
+class DemandTracker:
+    """Incremental demand-velocity estimation from sales events.
+
+    Each SKU keeps a ring buffer with the sales of its last `window_days`
+    days and an exponentially weighted moving average of completed days,
+    with the usual span-based smoothing factor alpha = 2 / (span + 1).
+    Recording an event is O(1). Moving to a later day closes the current
+    day into the EWMA, and any empty days in between are applied in closed
+    form as one (1 - alpha)^gap decay. Late events for an already-closed day
+    are folded in exactly with their decayed weight. The same closed form
+    gives the velocity and window average as of any later day without
+    changing the state, so idle SKUs need no daily update.
+
+    The velocity also takes in the current, partial day: a day that is a
+    fraction f through counts as f of a day selling at its observed rate,
+    so velocity = (1 - alpha * f) * ewma + alpha * sales_so_far. Today's
+    sales show up at once, a quiet morning only drags the estimate down
+    as the day goes by, and at f = 1 the value is exactly the EWMA of the
+    closed day. It starts from the product's existing
+    average_daily_sales as the prior.
+    """
+
+    def __init__(self, span_days: int = 14, window_days: int = 28):
+        self.alpha = 2 / (span_days + 1)
+        self.window_days = window_days
+
+    def new_state(self, day: int, prior: float) -> DemandState:
+        return DemandState(day, prior, array('d', bytes(8 * self.window_days)))
+
+    def ewma_at(self, state: DemandState, day: int) -> float:
+        """The EWMA once every day before `day` is closed, without changing the state"""
+        gap = day - state.day
+        if gap <= 0:
+            return state.ewma
+        return (self.alpha * state.ring[state.day % self.window_days] + (1 - self.alpha) * state.ewma) \
+            * (1 - self.alpha) ** (gap - 1)
+
+    def advance(self, state: DemandState, day: int):
+        """Close every day before `day`"""
+        gap = day - state.day
+        if gap <= 0:
+            return
+        state.ewma = self.ewma_at(state, day)
+        window, ring = self.window_days, state.ring
+        for offset in range(1, min(gap, window) + 1):
+            ring[(state.day + offset) % window] = 0.0
+        state.day = day
+
+    def record(self, state: DemandState, day: int, quantity: float):
+        """Add sold units on a given day"""
+        if day > state.day:
+            self.advance(state, day)
+        age = state.day - day
+        if age < self.window_days:
+            state.ring[day % self.window_days] += quantity
+        if age > 0:
+            # The day is already part of the EWMA: add what it would have contributed
+            state.ewma += self.alpha * (1 - self.alpha) ** (age - 1) * quantity
+
+    def velocity(self, state: DemandState, day: Optional[int] = None, fraction: float = 0.0) -> float:
+        """Estimated average daily sales `fraction` of the way through `day` (default the state's day).
+
+        Days without sales since the state's day are decayed in; the
+        partial day is blended in as described above.
+        """
+        day = state.day if day is None else day
+        partial = state.ring[day % self.window_days] if day == state.day else 0.0
+        ewma = self.ewma_at(state, day)
+        return max((1 - self.alpha * fraction) * ewma + self.alpha * partial, MIN_DAILY_SALES)
+
+    def window_average(self, state: DemandState, day: Optional[int] = None) -> float:
+        """Plain average over the ring buffer window ending at `day` (default the state's day), included"""
+        kept = self.window_days - (0 if day is None else max(day - state.day, 0))
+        window, ring = self.window_days, state.ring
+        return sum(ring[(state.day - age) % window] for age in range(max(kept, 0))) / window
+
+    @staticmethod
+    def dump(state: DemandState) -> tuple:
+        return state.day, state.ewma, state.ring.tobytes()
+
+    @staticmethod
+    def load(serialized: tuple) -> DemandState:
+        day, ewma, ring = serialized
+        return DemandState(day, ewma, array('d', ring))
+
+
+def event_seconds(timestamp: Any) -> float:
+    """Epoch seconds of an event timestamp: epoch seconds, an ISO 8601 string or None for now"""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+    return float(timestamp)
+
+
+def event_day(timestamp: Any) -> int:
+    """Day number (UTC) of an event timestamp (see event_seconds)"""
+    return int(event_seconds(timestamp) // SECONDS_PER_DAY)
+
+
+def day_and_fraction(seconds: Optional[float] = None) -> Tuple[int, float]:
+    """Day number (UTC) of a time (default now) and the fraction of that day elapsed"""
+    day, remainder = divmod(time.time() if seconds is None else seconds, SECONDS_PER_DAY)
+    return int(day), remainder / SECONDS_PER_DAY
+
+
+class SalesIngestor:
+    """Applies batches of sales events to the store.
+
+    Events are aggregated per SKU and day before anything is touched, so a
+    batch costs O(events) to parse plus O(SKUs in the batch) to apply: one
+    tracker update per (SKU, day) and a single store notification that
+    decrements current_stock (clamped at 0) and sets the new
+    average_daily_sales. With a repository, tracker states are read and
+    written in the same transaction, so every worker process shares them.
+
+    Events stamped more than MAX_FUTURE_SECONDS past the server's clock are
+    rejected. The new average_daily_sales is the velocity as of the time
+    of ingestion, including today's sales so far.
+
+    Only the SKUs in the batch are touched. A SKU that stops selling keeps
+    its last average_daily_sales until its next sale, which applies the
+    decay for the idle days in one step; DemandTracker.velocity(state, day)
+    gives the decayed estimate for reads in between.
+    """
+
+    def __init__(self, store: ProductStore, tracker: Optional[DemandTracker] = None,
+                 repository: Optional[SQLiteRepository] = None, max_errors: int = 1000):
+        self.store = store
+        self.tracker = tracker or DemandTracker()
+        self.repository = repository
+        self.max_errors = max_errors
+        self.states: Dict[str, DemandState] = {}
+
+    def state(self, product_id: str) -> Optional[DemandState]:
+        """Tracked demand state of a product, or None"""
+        if self.repository is not None:
+            serialized = self.repository.load_demand_states([product_id]).get(product_id)
+            return None if serialized is None else self.tracker.load(serialized)
+        return self.states.get(product_id)
+
+    def ingest(self, records: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        """Apply (row_number, event) pairs; events are {product_id, quantity, timestamp?}"""
+        totals: Dict[str, Dict[int, float]] = {}
+        errors: List[Dict[str, Any]] = []
+        accepted = rejected = 0
+        products = self.store
+        now = time.time()
+
+        for row_number, event in records:
+            try:
+                if isinstance(event, Exception):
+                    raise ValueError(f"Unparseable event: {event}")
+                product_id = str(event['product_id'])
+                quantity = int(event['quantity'])
+                if quantity <= 0:
+                    raise ValueError("quantity must be positive")
+                timestamp = event.get('timestamp')
+                seconds = now if timestamp is None else event_seconds(timestamp)
+                # A future day would make every real sale count as a late one
+                if not seconds <= now + MAX_FUTURE_SECONDS:
+                    raise ValueError("timestamp is in the future")
+                day = int(seconds // SECONDS_PER_DAY)
+                if product_id not in products:
+                    raise ValueError(f"Unknown product '{product_id}'")
+            except (KeyError, TypeError, ValueError, AttributeError, OverflowError) as e:
+                rejected += 1
+                if len(errors) < self.max_errors:
+                    errors.append({'row': row_number, 'error': str(e) if not isinstance(e, KeyError)
+                                   else f"Missing field {e}"})
+                continue
+            by_day = totals.setdefault(product_id, {})
+            by_day[day] = by_day.get(day, 0) + quantity
+            accepted += 1
+
+        updated = self._apply(totals, now) if totals else 0
+        return {
+            'accepted': accepted,
+            'rejected': rejected,
+            'products_updated': updated,
+            'errors': errors,
+            'errors_truncated': rejected > len(errors)
+        }
+
+    def _apply(self, totals: Dict[str, Dict[int, float]], now: float) -> int:
+        tracker = self.tracker
+        today = day_and_fraction(now)
+        with self.store.lock:
+            # Products deleted since validation are skipped
+            totals = {product_id: days for product_id, days in totals.items() if product_id in self.store}
+            states = self._load_states(totals)
+
+            updates = {}
+            for product_id, days in totals.items():
+                product = self.store.get(product_id)
+                state = states.get(product_id)
+                if state is None:
+                    state = states[product_id] = tracker.new_state(min(days), product.average_daily_sales)
+                for day in sorted(days):
+                    tracker.record(state, day, days[day])
+                updates[product_id] = {
+                    'current_stock': max(0, product.current_stock - int(sum(days.values()))),
+                    # As of now, or the start of a tolerated event day just past midnight
+                    'average_daily_sales': round(tracker.velocity(state, *max(today, (state.day, 0.0))), 4)
+                }
+            self.store.update_many(updates)
+            self._save_states(states)
+        return len(updates)
+
+    def _load_states(self, product_ids: Iterable[str]) -> Dict[str, DemandState]:
+        if self.repository is None:
+            return {product_id: self.states[product_id] for product_id in product_ids if product_id in self.states}
+        loaded = self.repository.load_demand_states(product_ids)
+        return {product_id: self.tracker.load(serialized) for product_id, serialized in loaded.items()}
+
+    def _save_states(self, states: Dict[str, DemandState]):
+        if self.repository is None:
+            self.states.update(states)
+        else:
+            self.repository.save_demand_states({product_id: self.tracker.dump(state)
+                                                for product_id, state in states.items()})
@@ -0,0 +1,48 @@
+from dataclasses import replace
+from typing import Dict, Iterator, Optional
+from models import Product
+from store import ProductStore
+
+
+class ScenarioView:
+    """Copy-on-write what-if view over a ProductStore.
+
+    Only the products touched by a scenario are copied; every other read goes
+    through to the live store. Creating a view and overriding a product costs
+    O(changed SKUs), whatever the catalog size, and the live store is never
+    modified.
+    """
+
+    def __init__(self, base: ProductStore):
+        self.base = base
+        self._overrides: Dict[str, Product] = {}
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def __iter__(self) -> Iterator[Product]:
+        overrides = self._overrides
+        for product in self.base:
+            yield overrides.get(product.product_id, product)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.base
+
+    @property
+    def overrides(self) -> Dict[str, Product]:
+        """Products replaced in this scenario, keyed by product_id"""
+        return dict(self._overrides)
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Return the product as seen by this scenario, or None"""
+        product = self._overrides.get(product_id)
+        return product if product is not None else self.base.get(product_id)
+
+    def override(self, product_id: str, **changes) -> Product:
+        """Replace fields of a product in this scenario only; raises KeyError if unknown"""
+        product = self.get(product_id)
+        if product is None:
+            raise KeyError(product_id)
+        overridden = replace(product, **changes)
+        self._overrides[product_id] = overridden
+        return overridden
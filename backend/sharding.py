@@ -0,0 +1,146 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import Product
+from columnar import ProductColumns, BatchReorderCalculator
+from reorder_logic import CRITICALITY_ORDER
+
+# Ways of partitioning a catalog into shards
+PARTITION_SCHEMES = ('warehouse', 'hash')
+
+
+def shard_of(product_id: str, shards: int) -> int:
+    """Stable shard number of a product ID (the same in every process and run)"""
+    return zlib.crc32(product_id.encode('utf-8')) % shards
+
+
+def recommendation_key(recommendation: Dict[str, Any], sequence: int) -> Tuple[int, float, int]:
+    """Global sort key of a recommendation: criticality, days remaining, then catalog sequence"""
+    return CRITICALITY_ORDER[recommendation['criticality']], recommendation['days_remaining'], sequence
+
+
+def merge_recommendations(runs: Iterable[List[Tuple[int, Dict[str, Any]]]],
+                          limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """K-way merge of sorted runs of (catalog sequence, recommendation), stopping after `limit`"""
+    merged = merge(*runs, key=lambda entry: recommendation_key(entry[1], entry[0]))
+    return [recommendation for _, recommendation in islice(merged, limit)]
+
+
+def partition(products: Iterable[Product], by: str = 'warehouse', shards: int = 4) -> Dict[str, List[int]]:
+    """Catalog rows of each part, split by warehouse or into `shards` parts by hash of product_id"""
+    if by not in PARTITION_SCHEMES:
+        raise ValueError(f"Unknown partition scheme '{by}'")
+    parts: Dict[str, List[int]] = {}
+    for row, product in enumerate(products):
+        name = product.warehouse if by == 'warehouse' else f"shard-{shard_of(product.product_id, shards)}"
+        parts.setdefault(name, []).append(row)
+    return parts
+
+
+# A shard: its columns and the catalog sequence of each of its products
+Shard = Tuple[ProductColumns, Dict[str, int]]
+
+# The shard held by a worker process
+_shard: Optional[Shard] = None
+
+
+def _load_shard(shard: Shard):
+    global _shard
+    _shard = shard
+
+
+def _shard_recommendations(shard: Shard, limit: Optional[int], max_days_remaining: Optional[float],
+                           warehouse: Optional[str]) -> List[Tuple[int, Dict[str, Any]]]:
+    """The shard's sorted recommendations, each with its catalog sequence"""
+    columns, sequences = shard
+    calculator = BatchReorderCalculator()
+    if warehouse is None:
+        recommendations = calculator.generate_reorder_recommendations_batch(columns, limit, max_days_remaining)
+    else:
+        recommendations = calculator.generate_reorder_recommendations_batch(columns, None, max_days_remaining)
+        recommendations = [rec for rec in recommendations if rec['warehouse'] == warehouse][:limit]
+    return [(sequences[rec['product_id']], rec) for rec in recommendations]
+
+
+def _recommend(limit: Optional[int], max_days_remaining: Optional[float],
+               warehouse: Optional[str]) -> List[Tuple[int, Dict[str, Any]]]:
+    return _shard_recommendations(_shard, limit, max_days_remaining, warehouse)
+
+
+class ShardedCatalog:
+    """A catalog partitioned into shards, each evaluated by its own worker process.
+
+    Shards are split by warehouse or by a stable hash of product_id. With
+    processes=True every shard lives in a dedicated single-worker process
+    pool, so the parent only keeps shard names and the catalog memory is
+    spread over the workers. A query runs the batch engine on all relevant
+    shards in parallel, each returning its recommendations already sorted
+    (and cut to `limit`), and the runs are k-way merged into one global
+    order. A warehouse query on a warehouse-partitioned catalog touches one
+    shard only.
+
+    Each shard keeps the catalog sequence of its products, and the merge
+    breaks (criticality, days_remaining) ties on it, so the global list is
+    exactly the single-catalog order, tied products included.
+
+    This is an offline tool used by benchmark.py; the API serves its catalog
+    from the in-process RecommendationIndex and does not shard.
+    """
+
+    def __init__(self, products: Iterable[Product], by: str = 'warehouse', shards: int = 4,
+                 processes: bool = True):
+        self.by = by
+        self._shards: Dict[str, Shard] = {}
+        self._workers: Dict[str, ProcessPoolExecutor] = {}
+        self._sizes: Dict[str, int] = {}
+        products = list(products)
+        loading = []
+        for name, rows in sorted(partition(products, by, shards).items()):
+            columns = ProductColumns.from_products(products[row] for row in rows)
+            shard = (columns, dict(zip(columns.product_ids, rows)))
+            self._sizes[name] = len(columns)
+            if processes:
+                worker = self._workers[name] = ProcessPoolExecutor(max_workers=1)
+                loading.append(worker.submit(_load_shard, shard))
+            else:
+                self._shards[name] = shard
+        for future in loading:
+            future.result()
+
+    def __len__(self) -> int:
+        return sum(self._sizes.values())
+
+    def __enter__(self) -> 'ShardedCatalog':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def shards(self) -> Dict[str, int]:
+        """Number of products per shard"""
+        return dict(self._sizes)
+
+    def recommendations(self, limit: Optional[int] = None, max_days_remaining: Optional[float] = None,
+                        warehouse: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recommendations for one warehouse or all, in the usual criticality and days order"""
+        names = list(self._sizes)
+        if warehouse is not None and self.by == 'warehouse':
+            names = [warehouse] if warehouse in self._sizes else []
+            warehouse = None
+        if self._workers:
+            futures = [self._workers[name].submit(_recommend, limit, max_days_remaining, warehouse)
+                       for name in names]
+            runs = [future.result() for future in futures]
+        else:
+            runs = [_shard_recommendations(self._shards[name], limit, max_days_remaining, warehouse)
+                    for name in names]
+        return merge_recommendations(runs, limit)
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.shutdown()
+        self._workers.clear()
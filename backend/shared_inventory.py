@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from persistence import SQLiteRepository
+from store import Change, ProductStore
+
+
+class SharedWriteLock:
+    """The write lock of a ProductStore backed by a database shared between processes.
+
+    Entering it opens (or joins) an IMMEDIATE SQLite transaction, which
+    holds the database write lock, and then replays any writes other
+    processes committed meanwhile. A mutation made under it therefore
+    starts from the latest shared state and is committed atomically with
+    everything else done in the block.
+    """
+
+    def __init__(self, inventory: 'SharedInventory'):
+        self.inventory = inventory
+        self._transactions = []
+
+    def __enter__(self):
+        transaction = self.inventory.repository.transaction()
+        transaction.__enter__()
+        # The repository lock is held from here on, so the stack is ours
+        self._transactions.append((transaction, self.inventory.store.version))
+        if len(self._transactions) == 1:
+            try:
+                self.inventory.sync()
+            except BaseException as e:
+                self.__exit__(type(e), e, e.__traceback__)
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        transaction, version = self._transactions.pop()
+        if exc_type is not None and self.inventory.store.version != version:
+            # The database rolls back but the in-memory store already changed
+            self.inventory.stale = True
+        return transaction.__exit__(exc_type, exc, traceback)
+
+
+class SharedInventory:
+    """One consistent product catalog for every worker process using the same database.
+
+    Each process keeps its own ProductStore and indexes for fast reads,
+    while SQLite is the shared source of truth:
+
+    - Writers take the store lock (a SharedWriteLock), which serializes
+      writes across threads and processes and catches the store up first,
+      so read-modify-write updates such as create_order never lose updates.
+    - Writes are persisted with their version in the change log before
+      they reach the in-memory store, so a failed write leaves the store
+      and every index untouched.
+    - refresh() cheaply checks the shared version and replays newer changes
+      from other processes. It is called before serving each request.
+    - start_polling() runs refresh() on one background thread per process,
+      for listeners (such as the change feed) that must see other
+      processes' writes while no request comes in.
+    """
+
+    def __init__(self, repository: SQLiteRepository):
+        self.repository = repository
+        self.stale = False
+        self._replaying = False
+        with repository.transaction():
+            self.version = repository.version()
+            self.store = ProductStore.from_columns(repository.load_columns())
+        self.store.lock = SharedWriteLock(self)
+        # Changes are written to the database before the store and its listeners apply them
+        self.store.persister = self._persist
+        self._poller: Optional[threading.Thread] = None
+        self._poller_lock = threading.Lock()
+
+        # Version checks use their own connection so readers never queue
+        # behind a writer holding the repository connection
+        self._shared = repository.path != ':memory:'
+        if self._shared:
+            self._version_conn = sqlite3.connect(repository.path, check_same_thread=False)
+            self._version_lock = threading.Lock()
+
+    def shared_version(self) -> int:
+        """Latest committed version in the database"""
+        if not self._shared:
+            return self.version
+        with self._version_lock:
+            return self._version_conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def refresh(self) -> bool:
+        """Catch up with writes from other processes; returns True if the store changed"""
+        if not self.stale and self.shared_version() == self.version:
+            return False
+        before = self.store.version
+        with self.store.lock:
+            pass
+        return self.store.version != before
+
+    def start_polling(self, interval: float = 1.0):
+        """Start the process's poller thread, if not running yet; it calls refresh() every interval seconds"""
+        if not self._shared:
+            return
+        with self._poller_lock:
+            # A forked worker inherits the attribute but not the thread
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll, args=(interval,), name='shared-inventory-poller',
+                                            daemon=True)
+            self._poller.start()
+
+    def _poll(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                print(f"Error polling shared inventory: {e}")
+
+    def sync(self):
+        """Replay changes committed by other processes (the caller holds the write lock)"""
+        current = self.repository.version()
+        if current == self.version and not self.stale:
+            return
+        changes = None if self.stale else self.repository.changes_since(self.version)
+        self._replaying = True
+        try:
+            if changes is None:
+                products = self.repository.load_products()
+                known = {product.product_id for product in products}
+                self.store.merge(products, [p.product_id for p in self.store if p.product_id not in known])
+            else:
+                self.store.merge(*changes)
+        finally:
+            self._replaying = False
+        self.version = current
+        self.stale = False
+
+    def _persist(self, changes: List[Change]):
+        if self._replaying:
+            return
+        self.repository.apply(changes)
+        self.version = self.repository.version()
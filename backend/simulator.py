@@ -1,6 +1,10 @@
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Union
 from models import Product
+from monte_carlo import DemandSpike, MonteCarloSimulator
+from store import ProductStore
+from scenario import ScenarioView
 from reorder_logic import ReorderCalculator
+from metrics import timed
 
 class DemandSpikeSimulator:
     """Simulate demand spikes and their impact on reordering"""
@@ -8,29 +12,40 @@ class DemandSpikeSimulator:
     def __init__(self):
         self.calculator = ReorderCalculator()
     
-    def simulate_spike(self, products: List[Product], product_id: str, 
-                      multiplier: float = 3.0, days: int = 7) -> List[Product]:
-        """Simulate a demand spike for a specific product"""
-        simulated_products = []
-        
-        for product in products:
-            if product.product_id == product_id:
-                # Create a copy with adjusted sales
-                simulated_product = Product(
-                    product_id=product.product_id,
-                    current_stock=product.current_stock,
-                    incoming_stock=product.incoming_stock,
-                    average_daily_sales=product.average_daily_sales * multiplier,
-                    lead_time_days=product.lead_time_days,
-                    min_reorder_quantity=product.min_reorder_quantity,
-                    cost_per_unit=product.cost_per_unit,
-                    criticality=product.criticality
-                )
-                simulated_products.append(simulated_product)
-                print(f"🔥 SPIKE SIMULATION: {product_id}")
-                print(f"   Original daily sales: {product.average_daily_sales}")
-                print(f"   Spiked daily sales: {simulated_product.average_daily_sales} ({multiplier}x for {days} days)")
-            else:
-                simulated_products.append(product)
-        
-        return simulated_products
+    @timed('simulate_spike')
+    def simulate_spike(self, products: Union[ProductStore, ScenarioView, List[Product]], product_id: str,
+                      multiplier: float = 3.0, days: int = 7) -> ScenarioView:
+        """Simulate a demand spike for a specific product.
+
+        Returns a ScenarioView over the given products: only the spiked
+        product is copied and the input itself is left untouched.
+        """
+        if not isinstance(products, (ProductStore, ScenarioView)):
+            products = ProductStore(products)
+        scenario = ScenarioView(products)
+        product = scenario.get(product_id)
+        if product is None:
+            return scenario
+
+        # Override only the spiked product's sales
+        simulated_product = scenario.override(
+            product_id, average_daily_sales=product.average_daily_sales * multiplier
+        )
+        print(f"🔥 SPIKE SIMULATION: {product_id}")
+        print(f"   Original daily sales: {product.average_daily_sales}")
+        print(f"   Spiked daily sales: {simulated_product.average_daily_sales} ({multiplier}x for {days} days)")
+
+        return scenario
+
+    @timed('simulate_stockout_risk')
+    def simulate_stockout_risk(self, products: Iterable[Product], product_id: Optional[str] = None,
+                               multiplier: float = 3.0, days: int = 7, scenarios: int = 1000,
+                               horizon_days: int = 60, seed: Optional[int] = None,
+                               workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run a Monte Carlo simulation, optionally with a demand spike on one product.
+
+        Returns the stockout probability and expected shortfall per product.
+        """
+        spikes = [DemandSpike(product_id, multiplier, days)] if product_id else []
+        engine = MonteCarloSimulator(horizon_days=horizon_days, scenarios=scenarios, workers=workers)
+        return engine.run(products, spikes, seed=seed)
@@ -0,0 +1,267 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from models import Product
+from columnar import ProductColumns
+
+# A change is an (old, new) pair: (None, product) for an insert,
+# (product, None) for a delete and (old, new) for an update.
+Change = Tuple[Optional[Product], Optional[Product]]
+
+T = TypeVar('T')
+
+
+class ProductStore:
+    """In-memory product catalog keyed by product_id.
+
+    Lookups, inserts and deletes are O(1). A secondary index groups products
+    by criticality. Iteration follows insertion order, like the plain list
+    the store replaces.
+
+    Listeners registered with subscribe() receive the list of changes after
+    every mutation, so derived state can be maintained incrementally.
+    `version` is bumped once per mutation and identifies the catalog state.
+    A `persister`, if set, is called with each batch before the store or
+    any listener sees it; if it raises, the mutation is abandoned, so the
+    store and its listeners never hold a change that was not persisted.
+
+    Writers are serialized by `lock`, which also covers the listeners, so
+    derived indexes only ever see one mutation at a time. Callers hold it
+    to make a read-modify-write sequence atomic. Readers take no lock: read()
+    runs a read optimistically and retries it if a write overlapped (a
+    seqlock), so reads never wait behind writers.
+
+    Iterating copies the catalog into a list first. Whole-catalog reads
+    on request paths should use columns() instead, which is built at most
+    once per version and shared.
+    """
+
+    # Optimistic attempts before a read falls back to taking the write lock
+    READ_RETRIES = 3
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self._products: Dict[str, Product] = {}
+        self._by_criticality: Dict[str, Dict[str, Product]] = {}
+        self._listeners: List[Callable[[List[Change]], None]] = []
+        self.version = 0
+        # Replaceable, e.g. by a lock shared across worker processes (see SharedInventory)
+        self.lock = threading.RLock()
+        # Optional durable write of each change batch, made before the batch is applied
+        self.persister: Optional[Callable[[List[Change]], None]] = None
+        # Odd while a write is in progress, bumped again when it completes
+        self._write_sequence = 0
+        # (version, columns) of the latest columnar snapshot
+        self._columns: Optional[Tuple[int, ProductColumns]] = None
+        # Initial products are indexed directly, without a notification per product
+        for product in products:
+            if product.product_id in self._products:
+                raise ValueError(f"Product ID '{product.product_id}' already exists.")
+            self._index(product)
+
+    @classmethod
+    def from_columns(cls, columns: ProductColumns) -> 'ProductStore':
+        """A store holding the given catalog, which also serves as its first columns() snapshot"""
+        store = cls(columns.to_products())
+        store._columns = (store.version, columns.freeze())
+        return store
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __iter__(self) -> Iterator[Product]:
+        # Iterate over a snapshot so concurrent writes cannot break the iteration
+        return iter(list(self._products.values()))
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._products
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Return the product with the given ID, or None"""
+        return self._products.get(product_id)
+
+    def read(self, func: Callable[[], T]) -> T:
+        """Run a read-only function over a state no write overlapped.
+
+        func must not mutate anything and may be run more than once. After
+        READ_RETRIES conflicting attempts it is run under the write lock.
+        """
+        for _ in range(self.READ_RETRIES):
+            sequence = self._write_sequence
+            if sequence % 2 == 0:
+                try:
+                    result = func()
+                except (KeyError, IndexError, RuntimeError):
+                    # A write moved data under the reader; only an error if none did
+                    if self._write_sequence == sequence:
+                        raise
+                    continue
+                if self._write_sequence == sequence:
+                    return result
+        with self.lock:
+            return func()
+
+    def columns(self) -> ProductColumns:
+        """Read-only column arrays of the catalog in insertion order.
+
+        The snapshot is built on the first call after a write and then
+        shared by every caller until the next one, so repeated analytical
+        reads cost no per-call copy of the catalog.
+        """
+        cached = self._columns
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        version, columns = self.read(
+            lambda: (self.version, ProductColumns.from_products(self._products.values())))
+        self._columns = (version, columns.freeze())
+        return columns
+
+    def add(self, product: Product) -> Product:
+        """Insert a new product; raises ValueError if the ID is taken"""
+        with self._writing():
+            if product.product_id in self._products:
+                raise ValueError(f"Product ID '{product.product_id}' already exists.")
+            self._commit([(None, product)])
+        return product
+
+    def add_many(self, products: Iterable[Product]) -> List[Product]:
+        """Insert several new products as one batch with a single notification.
+
+        Raises ValueError, without inserting anything, if any ID is already
+        taken or repeated in the batch.
+        """
+        products = list(products)
+        with self._writing():
+            seen = set()
+            for product in products:
+                if product.product_id in self._products or product.product_id in seen:
+                    raise ValueError(f"Product ID '{product.product_id}' already exists.")
+                seen.add(product.product_id)
+            if products:
+                self._commit([(None, product) for product in products])
+        return products
+
+    def remove(self, product_id: str) -> Optional[Product]:
+        """Delete a product and return it, or None if it was not found"""
+        with self._writing():
+            product = self._products.get(product_id)
+            if product is not None:
+                self._commit([(product, None)])
+        return product
+
+    def update(self, product_id: str, **changes) -> Product:
+        """Replace a product with a validated copy carrying the given field changes.
+
+        Raises KeyError if the product does not exist. The stored object is
+        swapped rather than mutated, so references held by readers stay
+        consistent.
+        """
+        with self._writing():
+            product = self._products[product_id]
+            updated = replace(product, **changes)
+            if updated.product_id != product_id:
+                raise ValueError("product_id cannot be changed by an update")
+            self._commit([(product, updated)])
+        return updated
+
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> List[Product]:
+        """Apply field changes to several products as one batch with a single notification.
+
+        Every copy is built and validated first, so nothing is changed if
+        any product is missing (KeyError) or any change is invalid.
+        """
+        with self._writing():
+            changes: List[Change] = []
+            for product_id, fields in updates.items():
+                product = self._products[product_id]
+                updated = replace(product, **fields)
+                if updated.product_id != product_id:
+                    raise ValueError("product_id cannot be changed by an update")
+                changes.append((product, updated))
+            if changes:
+                self._commit(changes)
+        return [updated for _, updated in changes]
+
+    def increment(self, product_id: str, **deltas) -> Product:
+        """Atomically add the given amounts to numeric fields, e.g. incoming_stock=50.
+
+        Unlike update(product_id, field=product.field + n) computed by the
+        caller, no concurrent writer can slip in between the read and the write.
+        """
+        with self.lock:
+            product = self._products[product_id]
+            return self.update(product_id, **{field: getattr(product, field) + delta
+                                              for field, delta in deltas.items()})
+
+    def increment_many(self, increments: Dict[str, Dict[str, Any]]) -> List[Product]:
+        """Atomically add amounts to fields of several products as one batch (see update_many)"""
+        with self.lock:
+            return self.update_many({
+                product_id: {field: getattr(self._products[product_id], field) + delta
+                             for field, delta in deltas.items()}
+                for product_id, deltas in increments.items()
+            })
+
+    def merge(self, upserts: Iterable[Product], removed: Iterable[str] = ()) -> List[Change]:
+        """Apply externally made changes (e.g. by another process) as one batch.
+
+        Upserted products replace or extend the catalog and removed IDs are
+        deleted; unknown IDs are ignored. Returns the changes notified.
+        """
+        with self._writing():
+            changes: List[Change] = []
+            for product in upserts:
+                old = self._products.get(product.product_id)
+                if old != product:
+                    changes.append((old, product))
+            for product_id in removed:
+                old = self._products.get(product_id)
+                if old is not None:
+                    changes.append((old, None))
+            if changes:
+                self._commit(changes)
+        return changes
+
+    def by_criticality(self, criticality: str) -> List[Product]:
+        """Products with the given criticality, in insertion order"""
+        return list(self._by_criticality.get(criticality, {}).values())
+
+    def criticality_counts(self) -> Dict[str, int]:
+        """Number of products per criticality level"""
+        return {level: len(products) for level, products in self._by_criticality.items()}
+
+    def subscribe(self, listener: Callable[[List[Change]], None]):
+        """Register a callback invoked with the list of changes after each mutation"""
+        self._listeners.append(listener)
+
+    def _commit(self, changes: List[Change]):
+        """Persist a validated batch, then apply it and notify the listeners"""
+        if self.persister is not None:
+            # Raises before anything in memory has changed
+            self.persister(changes)
+        for old, new in changes:
+            if old is not None and (new is None or new.criticality != old.criticality):
+                del self._by_criticality[old.criticality][old.product_id]
+            if new is None:
+                del self._products[old.product_id]
+            else:
+                self._index(new)
+        self._notify(changes)
+
+    def _notify(self, changes: List[Change]):
+        self.version += 1
+        for listener in self._listeners:
+            listener(changes)
+
+    @contextmanager
+    def _writing(self):
+        with self.lock:
+            self._write_sequence += 1
+            try:
+                yield
+            finally:
+                self._write_sequence += 1
+
+    def _index(self, product: Product):
+        self._products[product.product_id] = product
+        self._by_criticality.setdefault(product.criticality, {})[product.product_id] = product
@@ -0,0 +1,124 @@
+import argparse
+import json
+from typing import Iterator, List
+import numpy as np
+
+from models import Product, CRITICALITY_LEVELS, DEFAULT_WAREHOUSE, PRODUCT_FIELDS
+from columnar import ProductColumns
+from ingest import detect_format
+
+# Share of SKUs per criticality level (high, medium, low)
+CRITICALITY_SHARES = (0.15, 0.35, 0.50)
+# Pack sizes that minimum reorder quantities are rounded up to
+PACK_SIZES = np.array([10, 25, 50, 100, 200, 500, 1000])
+
+
+def warehouse_names(count: int) -> List[str]:
+    """Names of synthetic warehouses: the default warehouse alone, or WH01, WH02, ..."""
+    return [DEFAULT_WAREHOUSE] if count <= 1 else [f"WH{i:02d}" for i in range(1, count + 1)]
+
+
+def generate_columns(size: int, seed: int = 42, start: int = 0, warehouses: int = 1) -> ProductColumns:
+    """Generate a synthetic catalog chunk with realistic distributions.
+
+    - average_daily_sales: log-normal (median about 4 units/day, long tail)
+    - lead_time_days: 70% domestic suppliers (2-10 days), 30% imports (20-45 days)
+    - current_stock: gamma-distributed days of cover around 30 days
+    - incoming_stock: about a third of SKUs have an open order of 10-60 days of cover
+    - min_reorder_quantity: about two weeks of sales rounded up to a pack size
+    - cost_per_unit: log-normal (median about $15)
+    - warehouse: uniform over `warehouses` sites
+
+    Product IDs are numbered from `start`, so chunks can be concatenated.
+    """
+    rng = np.random.default_rng(seed)
+    sales = np.round(rng.lognormal(mean=np.log(4.0), sigma=1.1, size=size), 2)
+    sales = np.maximum(sales, 0.1)
+
+    imported = rng.random(size) < 0.3
+    lead_time = np.where(imported, rng.integers(20, 46, size), rng.integers(2, 11, size))
+
+    cover_days = rng.gamma(shape=2.0, scale=15.0, size=size)
+    current_stock = np.floor(cover_days * sales).astype(np.int64)
+
+    has_incoming = rng.random(size) < 0.35
+    incoming_stock = np.where(has_incoming, np.floor(rng.uniform(10, 60, size) * sales), 0).astype(np.int64)
+
+    two_weeks = sales * 14
+    pack = PACK_SIZES[np.minimum(np.searchsorted(PACK_SIZES, two_weeks), len(PACK_SIZES) - 1)]
+    min_reorder = (np.ceil(two_weeks / pack) * pack).astype(np.int64)
+
+    cost = np.round(rng.lognormal(mean=np.log(15.0), sigma=0.9, size=size), 2)
+    cost = np.maximum(cost, 0.5)
+
+    criticality = rng.choice(len(CRITICALITY_LEVELS), size=size, p=CRITICALITY_SHARES)
+
+    # Drawn last so single-warehouse catalogs are unchanged
+    names = warehouse_names(warehouses)
+    sites = [names[i] for i in rng.integers(0, len(names), size).tolist()] if len(names) > 1 else None
+
+    return ProductColumns(
+        product_ids=[f"SKU_{i:08d}" for i in range(start, start + size)],
+        current_stock=current_stock,
+        incoming_stock=incoming_stock,
+        average_daily_sales=sales,
+        lead_time_days=lead_time,
+        min_reorder_quantity=min_reorder,
+        cost_per_unit=cost,
+        criticality_code=criticality,
+        warehouses=sites
+    )
+
+
+def iter_catalog_chunks(size: int, seed: int = 42, chunk_size: int = 100_000,
+                        warehouses: int = 1) -> Iterator[ProductColumns]:
+    """Generate a catalog of any size (up to 10^7 and beyond) in bounded-memory chunks"""
+    seeds = np.random.SeedSequence(seed).spawn((size + chunk_size - 1) // chunk_size)
+    for chunk_seed, start in zip(seeds, range(0, size, chunk_size)):
+        yield generate_columns(min(chunk_size, size - start), seed=chunk_seed, start=start, warehouses=warehouses)
+
+
+def columns_to_products(columns: ProductColumns) -> List[Product]:
+    """Materialize validated Product objects from a column chunk"""
+    return columns.to_products()
+
+
+def get_synthetic_products(size: int, seed: int = 42, warehouses: int = 1) -> List[Product]:
+    """A seeded synthetic catalog as a list of Product objects"""
+    products = []
+    for columns in iter_catalog_chunks(size, seed, warehouses=warehouses):
+        products.extend(columns_to_products(columns))
+    return products
+
+
+def write_catalog(filename: str, size: int, seed: int = 42, fmt: str = 'csv', warehouses: int = 1):
+    """Stream a synthetic catalog to a CSV or NDJSON file"""
+    with open(filename, 'w', newline='', encoding='utf-8') as out:
+        if fmt == 'csv':
+            out.write(','.join(PRODUCT_FIELDS) + '\n')
+        for columns in iter_catalog_chunks(size, seed, warehouses=warehouses):
+            for product in columns_to_products(columns):
+                values = [getattr(product, field) for field in PRODUCT_FIELDS]
+                if fmt == 'csv':
+                    out.write(','.join(map(str, values)) + '\n')
+                else:
+                    out.write(json.dumps(dict(zip(PRODUCT_FIELDS, values))) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic warehouse catalog')
+    parser.add_argument('output', help='Output file (.csv or .ndjson)')
+    parser.add_argument('--skus', type=int, default=100_000,
+                        help='Number of SKUs to generate (default: 100000)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed (default: 42)')
+    parser.add_argument('--warehouses', type=int, default=1,
+                        help='Number of warehouses to spread SKUs over (default: 1)')
+    args = parser.parse_args()
+
+    write_catalog(args.output, args.skus, args.seed, detect_format(args.output), args.warehouses)
+    print(f"📄 Wrote {args.skus:,} synthetic SKUs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import sys
+from dataclasses import replace
+
+import pytest
+
+# The backend modules are flat, so make them importable when pytest runs from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import get_synthetic_products
+
+
+@pytest.fixture(scope='session')
+def products():
+    """A 5000-SKU synthetic catalog over three warehouses"""
+    catalog = get_synthetic_products(5000, warehouses=3)
+    # Out-of-stock SKUs and whole-number sales give exact ties in days_remaining
+    catalog[:40] = [replace(product, current_stock=0) for product in catalog[:40]]
+    catalog[40:80] = [replace(product, average_daily_sales=5.0, current_stock=10, incoming_stock=0)
+                      for product in catalog[40:80]]
+    return catalog
+
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    """A test client of the API over a fresh database seeded with the sample catalog"""
+    os.environ['WAREHOUSE_DB'] = str(tmp_path_factory.mktemp('db') / 'warehouse.db')
+    os.environ['WAREHOUSE_SEED_SAMPLE_DATA'] = '1'
+    import app
+    return app.app.test_client()
@@ -0,0 +1,41 @@
+"""The chunked, parallel batch CLI writes exactly the in-memory export."""
+import filecmp
+
+import pytest
+
+from batch import CatalogBatchRunner
+from ingest import load_catalog
+from reorder_logic import ReorderCalculator
+from report import ReorderReportGenerator
+from store import ProductStore
+from synthetic_data import write_catalog
+
+
+@pytest.mark.parametrize('with_warehouse', [False, True])
+def test_batch_csv_matches_in_memory_export(tmp_path, with_warehouse):
+    catalog = str(tmp_path / 'catalog.csv')
+    write_catalog(catalog, 6000, warehouses=3)
+    batch_csv, memory_csv = str(tmp_path / 'batch.csv'), str(tmp_path / 'memory.csv')
+
+    result = CatalogBatchRunner(workers=2, chunk_size=1000).run(catalog, output=batch_csv,
+                                                                with_warehouse=with_warehouse)
+    store = ProductStore()
+    load_catalog(catalog, store)
+    ReorderReportGenerator().export_to_csv(ReorderCalculator().generate_reorder_recommendations(store),
+                                           memory_csv, with_warehouse=with_warehouse)
+    assert result['accepted'] == len(store) == 6000
+    assert result['chunks'] == 6
+    assert filecmp.cmp(batch_csv, memory_csv, shallow=False)
+
+
+def test_invalid_rows_are_reported_with_their_row_numbers(tmp_path):
+    catalog = tmp_path / 'catalog.csv'
+    write_catalog(str(catalog), 50)
+    lines = catalog.read_bytes().split(b'\n')
+    lines[3] = lines[3].replace(b'SKU', b'S\xffU')
+    lines[7] = b'BAD,not-a-number,1,1,1,1,1,high'
+    catalog.write_bytes(b'\n'.join(lines))
+
+    result = CatalogBatchRunner(workers=1, chunk_size=20).run(str(catalog))
+    assert result['accepted'] == 48 and result['rejected'] == 2
+    assert [error['row'] for error in result['errors']] == [3, 7]
@@ -0,0 +1,15 @@
+"""The benchmark suite runs end to end on a small catalog."""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_runs_every_suite(tmp_path):
+    output = tmp_path / 'results.json'
+    subprocess.run([sys.executable, 'benchmark.py', '--skus', '1000', '--repeat', '1', '--json', str(output)],
+                   cwd=BACKEND_DIR, check=True, capture_output=True, timeout=300)
+    names = {result['name'] for result in json.loads(output.read_text())['results']}
+    assert {'bytes/SKU dataclass with __dict__', 'bytes/SKU slotted Product', 'bytes/SKU ProductTable'} <= names
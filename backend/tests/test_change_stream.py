@@ -0,0 +1,28 @@
+"""Change streams are capped per process, below the worker's thread count."""
+import os
+import runpy
+import threading
+
+
+def test_gunicorn_config_keeps_threads_for_requests(monkeypatch):
+    monkeypatch.delenv('WAREHOUSE_MAX_STREAMS', raising=False)
+    monkeypatch.setenv('WAREHOUSE_THREADS', '16')
+    config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+    assert config['worker_class'] == 'gthread' and config['threads'] == 16
+    assert int(os.environ['WAREHOUSE_MAX_STREAMS']) == 12
+
+
+def test_streams_beyond_the_cap_get_503(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'stream_slots', threading.BoundedSemaphore(1))
+    first = client.get('/api/changes/stream', buffered=False)
+    assert first.status_code == 200
+    assert next(first.response).startswith(b'retry: 3000')
+
+    refused = client.get('/api/changes/stream')
+    assert refused.status_code == 503 and refused.headers['Retry-After'] == '5'
+    first.close()
+    second = client.get('/api/changes/stream', buffered=False)
+    assert second.status_code == 200
+    second.close()
+    assert client.get('/api/changes/stream?keepalive=-1').status_code == 400
@@ -0,0 +1,24 @@
+"""The batch engine must give exactly the per-product calculator's recommendations."""
+import pytest
+
+from columnar import ProductColumns, ProductTable, BatchReorderCalculator
+from reorder_logic import ReorderCalculator
+
+
+@pytest.mark.parametrize('limit, max_days_remaining', [(None, None), (25, None), (None, 3.0), (10, 7.5)])
+def test_batch_engine_matches_per_product_path(products, limit, max_days_remaining):
+    expected = ReorderCalculator().generate_reorder_recommendations(products, limit, max_days_remaining)
+    actual = BatchReorderCalculator().generate_reorder_recommendations_batch(
+        ProductColumns.from_products(products), limit, max_days_remaining)
+    assert actual == expected
+
+
+def test_batch_engine_accepts_products_and_tables(products):
+    expected = ReorderCalculator().generate_reorder_recommendations(products)
+    calculator = BatchReorderCalculator()
+    assert calculator.generate_reorder_recommendations(products) == expected
+    assert calculator.generate_reorder_recommendations(ProductTable(products)) == expected
+
+
+def test_batch_engine_handles_an_empty_catalog():
+    assert BatchReorderCalculator().generate_reorder_recommendations([]) == []
@@ -0,0 +1,22 @@
+"""ETags come from the shared database version, so every worker process agrees on them."""
+from persistence import SQLiteRepository
+from shared_inventory import SharedInventory
+
+
+def test_etag_is_the_shared_version_in_every_worker(client):
+    import app
+    response = client.get('/api/products')
+    etag = response.headers['ETag'].strip('"')
+    assert client.get('/api/products', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    # Another worker process sharing the database builds the same tag
+    repository = SQLiteRepository(app.repository.path)
+    other = SharedInventory(repository)
+    assert etag == f"{repository.generation():x}-{other.version}"
+
+    # A write made by the other worker invalidates the tag here too
+    other.store.increment('WIDGET_001', incoming_stock=1)
+    response = client.get('/api/products', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'].strip('"') == f"{repository.generation():x}-{other.version}"
+    repository.close()
@@ -0,0 +1,51 @@
+"""Purchase order endpoints validate every quantity before changing anything."""
+import pytest
+
+
+def incoming_stock(client, product_id):
+    products = client.get('/api/products').get_json()['products']
+    return next(product['incoming_stock'] for product in products if product['product_id'] == product_id)
+
+
+@pytest.mark.parametrize('quantity', ['abc', -5, 0, 2.5, True, None, [3]])
+def test_create_order_rejects_invalid_quantities(client, quantity):
+    before = incoming_stock(client, 'WIDGET_001')
+    response = client.post('/api/create-order', json={'product_id': 'WIDGET_001', 'quantity': quantity})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert incoming_stock(client, 'WIDGET_001') == before
+
+
+def test_create_order_adds_incoming_stock(client):
+    before = incoming_stock(client, 'WIDGET_001')
+    response = client.post('/api/create-order', json={'product_id': 'WIDGET_001', 'quantity': '7'})
+    assert response.status_code == 200
+    assert response.get_json()['new_incoming_stock'] == before + 7
+    assert client.post('/api/create-order', json={'product_id': 'NOPE', 'quantity': 1}).status_code == 404
+    assert client.post('/api/create-order', data='not json').status_code == 400
+
+
+def test_batch_rejects_out_of_range_quantities_before_changing_anything(client):
+    analytics = client.get('/api/analytics').get_json()
+    recommendations = client.get('/api/recommendations').get_json()
+    before = incoming_stock(client, 'CRITICAL_003')
+
+    for quantity in (2 ** 63, 1_000_001, 0, 'x', 1.5):
+        response = client.post('/api/orders/batch', json={'orders': [
+            {'product_id': 'WIDGET_001', 'quantity': 5},
+            {'product_id': 'CRITICAL_003', 'quantity': quantity}]})
+        assert response.status_code == 400
+        assert [line['status'] for line in response.get_json()['results']] == ['ok', 'error']
+
+    assert incoming_stock(client, 'CRITICAL_003') == before
+    assert client.get('/api/analytics').get_json() == analytics
+    assert client.get('/api/recommendations').get_json() == recommendations
+
+
+def test_batch_applies_valid_lines_together(client):
+    before = incoming_stock(client, 'CRITICAL_003')
+    response = client.post('/api/orders/batch', json={'orders': [
+        {'product_id': 'CRITICAL_003', 'quantity': 1_000_000},
+        {'product_id': 'CRITICAL_003', 'suggested_reorder_quantity': 4}]})
+    assert response.status_code == 201
+    assert incoming_stock(client, 'CRITICAL_003') == before + 1_000_004
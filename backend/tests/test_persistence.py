@@ -0,0 +1,49 @@
+"""The SQLite repository and its columnar snapshot must restore the catalog exactly."""
+from analytics import InventoryAggregates
+from columnar import BatchReorderCalculator
+from persistence import SQLiteRepository
+from product_index import ProductIndex
+from recommendation_index import RecommendationIndex
+from reorder_logic import ReorderCalculator
+from store import ProductStore
+
+
+def saved_repository(path, products):
+    repository = SQLiteRepository(str(path))
+    store = ProductStore()
+    store.subscribe(repository.apply)
+    store.add_many(products)
+    return repository, store
+
+
+def test_snapshot_and_table_scan_restore_the_catalog(tmp_path, products):
+    repository, store = saved_repository(tmp_path / 'warehouse.db', products)
+    # No snapshot yet: the table is scanned and a snapshot is saved
+    assert repository.load_products() == products
+    assert repository.load_products() == products
+
+    store.update(products[3].product_id, current_stock=1)
+    store.remove(products[4].product_id)
+    # The snapshot is stale after writes and must not be used
+    assert repository.load_products() == list(store)
+    repository.write_snapshot()
+    assert repository.load_products() == list(store)
+    repository.close()
+
+
+def test_column_loads_match_per_product_builds(tmp_path, products):
+    repository, _ = saved_repository(tmp_path / 'warehouse.db', products)
+    store = ProductStore.from_columns(repository.load_columns())
+    repository.close()
+    per_product, vectorized = ReorderCalculator(), BatchReorderCalculator()
+
+    a, b = ProductIndex(per_product, store), ProductIndex(vectorized, store)
+    assert a._rows == b._rows and a._partitions == b._partitions
+    a, b = RecommendationIndex(per_product, store), RecommendationIndex(vectorized, store)
+    assert list(a) == list(b)
+    a, b = InventoryAggregates(per_product, store), InventoryAggregates(vectorized, store)
+    assert a.summary() == b.summary()
+
+    with store.lock:
+        store.update_many({product.product_id: {'current_stock': 0} for product in products[200:220]})
+    assert a.summary() == b.summary()
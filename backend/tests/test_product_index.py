@@ -0,0 +1,80 @@
+"""Paginated product queries must match a brute-force filter and sort."""
+import base64
+import json
+import random
+
+import pytest
+
+from product_index import ProductIndex
+from reorder_logic import ReorderCalculator, CRITICALITY_ORDER
+from store import ProductStore
+
+
+@pytest.fixture(scope='module')
+def index(products):
+    return ProductIndex(ReorderCalculator(), ProductStore(products))
+
+
+def brute_force(index, products, criticality, needs_reorder, low, high, sort, descending):
+    rows = [index.build_row(product) for product in products]
+    expected = [row for row in rows
+                if (criticality is None or row['criticality'] in criticality)
+                and (needs_reorder is None or row['needs_reorder'] == needs_reorder)
+                and (low is None or row['days_remaining'] >= low)
+                and (high is None or row['days_remaining'] <= high)]
+    # Ties keep catalog order, and a descending sort reverses the whole ascending order
+    if sort == 'criticality':
+        expected.sort(key=lambda row: CRITICALITY_ORDER[row['criticality']])
+    elif sort != 'insertion':
+        expected.sort(key=lambda row: row[sort])
+    if descending:
+        expected.reverse()
+    return expected
+
+
+def test_pages_match_brute_force(index, products):
+    rng = random.Random(7)
+    for _ in range(30):
+        filters = dict(criticality=rng.choice([None, ['high'], ['medium', 'low']]),
+                       needs_reorder=rng.choice([None, True, False]),
+                       min_days_remaining=rng.choice([None, 5.0]),
+                       max_days_remaining=rng.choice([None, 40.0]))
+        sort = rng.choice(['insertion', 'days_remaining', 'cost_per_unit', 'criticality', 'product_id'])
+        descending = rng.random() < 0.5
+        expected = brute_force(index, products, filters['criticality'], filters['needs_reorder'],
+                               filters['min_days_remaining'], filters['max_days_remaining'], sort, descending)
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = index.query(sort=sort, descending=descending, cursor=cursor, limit=500, **filters)
+            pages.extend(page)
+            if cursor is None:
+                break
+        assert pages == expected
+        assert index.count(**filters) == len(expected)
+
+
+def tampered(cursor, value):
+    sort, descending, _, sequence = json.loads(base64.urlsafe_b64decode(cursor))
+    return base64.urlsafe_b64encode(json.dumps([sort, descending, value, sequence]).encode()).decode()
+
+
+@pytest.mark.parametrize('sort, value', [('current_stock', 'x'), ('product_id', 5), ('criticality', None),
+                                         ('insertion', [1])])
+def test_tampered_cursor_is_rejected(index, sort, value):
+    _, cursor = index.query(sort=sort, limit=10)
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        index.query(sort=sort, limit=10, cursor=tampered(cursor, value))
+
+
+def test_api_reports_matching_total_and_rejects_bad_cursors(client):
+    body = client.get('/api/products?limit=2&criticality=high').get_json()
+    everything = client.get('/api/products?criticality=high').get_json()
+    assert len(body['products']) == 2
+    assert body['total_count'] == len(everything['products']) > 2
+
+    cursor = client.get('/api/products?sort=current_stock&limit=2').get_json()['next_cursor']
+    assert client.get(f"/api/products?sort=current_stock&limit=2&cursor={cursor}").status_code == 200
+    response = client.get(f"/api/products?sort=current_stock&limit=2&cursor={tampered(cursor, 'x')}")
+    assert response.status_code == 400 and response.get_json()['error'] == 'Invalid cursor'
+    assert client.get('/api/products?cursor=%%%').status_code == 400
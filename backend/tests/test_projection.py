@@ -0,0 +1,21 @@
+"""Stock projection parameters are bounded before any array is allocated."""
+import numpy as np
+
+from projection import StockProjector
+
+
+def test_sample_days_never_exceed_the_horizon():
+    assert StockProjector.sample_days(10, 10 ** 10).tolist() == list(range(11))
+    assert StockProjector.sample_days(90, 31)[[0, -1]].tolist() == [0, 90]
+    assert len(StockProjector.sample_days(5, 1)) == 2
+
+
+def test_api_bounds_points(client):
+    assert client.get('/api/projection?points=10000000000').status_code == 400
+    assert client.get('/api/projection?horizon_days=10&points=12').status_code == 400
+    body = client.get('/api/projection?horizon_days=10&points=11').get_json()
+    assert body['days'] == list(range(11))
+    # The default number of points fits short horizons
+    body = client.get('/api/projection?horizon_days=5').get_json()
+    assert body['days'] == list(range(6))
+    assert np.all(np.diff(client.get('/api/projection').get_json()['days']) > 0)
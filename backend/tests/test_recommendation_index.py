@@ -0,0 +1,29 @@
+"""The incrementally maintained recommendations must match a full recompute."""
+from reorder_logic import ReorderCalculator
+from recommendation_index import RecommendationIndex
+from store import ProductStore
+
+
+def test_index_matches_calculator(products):
+    calculator = ReorderCalculator()
+    store = ProductStore(products)
+    index = RecommendationIndex(calculator, store)
+    assert list(index) == calculator.generate_reorder_recommendations(products)
+
+    with store.lock:
+        store.update_many({product.product_id: {'current_stock': 2} for product in products[100:150]})
+        store.remove(products[7].product_id)
+    store.add(products[7])
+    expected = calculator.generate_reorder_recommendations(list(store))
+    assert list(index) == expected
+    assert len(index) == len(expected)
+
+
+def test_limit_threshold_and_warehouse_queries(products):
+    calculator = ReorderCalculator()
+    index = RecommendationIndex(calculator, ProductStore(products))
+    expected = calculator.generate_reorder_recommendations(products)
+    assert index.recommendations(limit=30) == expected[:30]
+    assert index.recommendations(max_days_remaining=5.0) == [rec for rec in expected if rec['days_remaining'] <= 5.0]
+    in_warehouse = [rec for rec in expected if rec['warehouse'] == 'WH02']
+    assert in_warehouse and index.recommendations(limit=30, warehouse='WH02') == in_warehouse[:30]
@@ -0,0 +1,59 @@
+"""Sales events update demand velocity incrementally, including today's sales."""
+import time
+
+import pytest
+
+from sales import DemandTracker, SalesIngestor, SECONDS_PER_DAY
+from sample_data import get_sample_products
+from store import ProductStore
+
+
+def test_partial_day_blends_into_the_closed_day():
+    tracker = DemandTracker()
+    state = tracker.new_state(100, 10.0)
+    tracker.record(state, 100, 30)
+    assert tracker.velocity(state, 100, 0.0) == pytest.approx(10.0 + tracker.alpha * 30)
+    # A full day is exactly the EWMA of the closed day
+    assert tracker.velocity(state, 100, 1.0) == pytest.approx(tracker.ewma_at(state, 101))
+    assert tracker.velocity(state, 100, 0.5) > tracker.velocity(state, 100, 1.0)
+
+
+def test_lazy_decay_matches_eager_advance():
+    tracker = DemandTracker()
+    state = tracker.new_state(100, 10.0)
+    tracker.record(state, 100, 12)
+    lazy = tracker.velocity(state, 130)
+    tracker.advance(state, 130)
+    assert tracker.velocity(state) == pytest.approx(lazy)
+
+
+def test_future_events_are_rejected_and_todays_sales_count():
+    store = ProductStore(get_sample_products())
+    ingestor = SalesIngestor(store)
+    product = store.get('WIDGET_001')
+
+    result = ingestor.ingest([(1, {'product_id': 'WIDGET_001', 'quantity': 5, 'timestamp': '2999-01-01T00:00:00Z'}),
+                              (2, {'product_id': 'WIDGET_001', 'quantity': 5, 'timestamp': float('inf')}),
+                              (3, {'product_id': 'WIDGET_001', 'quantity': 5, 'timestamp': float('-inf')})])
+    assert result['accepted'] == 0 and [error['row'] for error in result['errors']] == [1, 2, 3]
+    assert result['errors'][0]['error'] == 'timestamp is in the future'
+    assert store.get('WIDGET_001') == product
+
+    # Within the clock-skew tolerance
+    assert ingestor.ingest([(1, {'product_id': 'WIDGET_001', 'quantity': 1,
+                                 'timestamp': time.time() + 60})])['accepted'] == 1
+    before = store.get('WIDGET_001').average_daily_sales
+    ingestor.ingest([(1, {'product_id': 'WIDGET_001', 'quantity': 200})])
+    assert store.get('WIDGET_001').average_daily_sales > before
+
+
+def test_api_rejects_future_events(client):
+    future = time.time() + 2 * SECONDS_PER_DAY
+    response = client.post('/api/sales/events', json={'events': [
+        {'product_id': 'GADGET_002', 'quantity': 3, 'timestamp': future}]})
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0] == {'row': 1, 'error': 'timestamp is in the future'}
+    assert client.post('/api/sales/events', json={'events': [
+        {'product_id': 'GADGET_002', 'quantity': 3}]}).status_code == 200
+    body = client.get('/api/sales/GADGET_002').get_json()
+    assert body['tracked'] and body['velocity'] > 0
@@ -0,0 +1,27 @@
+"""A sharded catalog's merged recommendations are exactly the single-catalog order."""
+import pytest
+
+from recommendation_index import RecommendationIndex
+from reorder_logic import ReorderCalculator
+from sharding import ShardedCatalog
+from store import ProductStore
+
+
+def product_ids(recommendations):
+    return [rec['product_id'] for rec in recommendations]
+
+
+@pytest.mark.parametrize('by', ['warehouse', 'hash'])
+def test_merge_matches_recommendation_index_exactly(products, by):
+    index = RecommendationIndex(ReorderCalculator(), ProductStore(products))
+    with ShardedCatalog(products, by=by, shards=3, processes=False) as catalog:
+        assert catalog.recommendations() == list(index)
+        for query in (dict(limit=50), dict(max_days_remaining=10.0), dict(limit=20, max_days_remaining=3.0),
+                      dict(warehouse='WH02'), dict(warehouse='WH01', limit=15)):
+            assert product_ids(catalog.recommendations(**query)) == product_ids(index.recommendations(**query))
+
+
+def test_worker_processes_give_the_same_order(products):
+    index = RecommendationIndex(ReorderCalculator(), ProductStore(products))
+    with ShardedCatalog(products, by='hash', shards=2) as catalog:
+        assert product_ids(catalog.recommendations(limit=100)) == product_ids(index.recommendations(limit=100))
@@ -0,0 +1,64 @@
+"""A shared inventory keeps the store, its indexes and the database consistent."""
+import pytest
+
+from analytics import InventoryAggregates
+from load_test import run_local
+from persistence import SQLiteRepository
+from recommendation_index import RecommendationIndex
+from reorder_logic import ReorderCalculator
+from sample_data import get_sample_products
+from shared_inventory import SharedInventory
+from store import ProductStore
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / 'warehouse.db'))
+    inventory = SharedInventory(repository)
+    inventory.store.add_many(get_sample_products())
+    yield inventory
+    repository.close()
+
+
+def assert_derived_state_matches(store, aggregates, index):
+    calculator = ReorderCalculator()
+    fresh = ProductStore(list(store))
+    assert aggregates.summary() == InventoryAggregates(calculator, fresh).summary()
+    assert list(index) == calculator.generate_reorder_recommendations(list(fresh))
+
+
+def test_failed_write_changes_nothing(inventory):
+    store = inventory.store
+    calculator = ReorderCalculator()
+    aggregates, index = InventoryAggregates(calculator, store), RecommendationIndex(calculator, store)
+    before, version = list(store), store.version
+
+    # SQLite rejects the value, before the store or any listener has seen it
+    with pytest.raises(OverflowError):
+        store.increment('CRITICAL_003', incoming_stock=2 ** 63)
+    assert list(store) == before and store.version == version
+    assert not inventory.stale
+    inventory.refresh()
+    assert_derived_state_matches(store, aggregates, index)
+    assert inventory.repository.load_products() == before
+
+
+def test_rolled_back_block_resyncs_every_listener(inventory):
+    store = inventory.store
+    calculator = ReorderCalculator()
+    aggregates, index = InventoryAggregates(calculator, store), RecommendationIndex(calculator, store)
+    before = list(store)
+
+    with pytest.raises(RuntimeError):
+        with store.lock:
+            store.update('CRITICAL_003', current_stock=0)
+            raise RuntimeError("order record failed")
+    # The database rolled back; the next refresh brings memory back in line
+    assert inventory.stale
+    inventory.refresh()
+    assert list(store) == before
+    assert_derived_state_matches(store, aggregates, index)
+
+
+def test_concurrent_orders_lose_no_updates():
+    assert run_local(processes=2, threads=4, orders=10)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Header from './components/Header';
 import TabNav from './components/TabNav';
 import ProductCard from './components/ProductCard';
@@ -9,6 +9,16 @@ import AddProductPanel from './components/AddProductPanel'; // ✨ Import new co
 import api from './services/api';
 import { AlertTriangle, RefreshCw, Play, Package, TrendingUp, DollarSign } from 'lucide-react';
 
+const CRITICALITY_RANK = { high: 0, medium: 1, low: 2 };
+
+// Same order as the backend: criticality (high first), then days remaining
+const sortRecommendations = (recommendations) =>
+    [...recommendations].sort((a, b) =>
+        (CRITICALITY_RANK[a.criticality] - CRITICALITY_RANK[b.criticality]) || (a.days_remaining - b.days_remaining));
+
+const toStockLevel = ({ product_id, days_remaining, criticality, current_stock }) =>
+    ({ product_id, days_remaining, criticality, current_stock });
+
 // Main App Component
 const App = () => {
     const [activeTab, setActiveTab] = useState('overview');
@@ -20,24 +30,100 @@ const App = () => {
     const [isExporting, setIsExporting] = useState(false);
     const [error, setError] = useState(null);
     const [simulationResult, setSimulationResult] = useState(null);
+    // True while the change feed is connected; mutations then rely on pushed deltas
+    const liveUpdates = useRef(false);
+    // Simulated recommendations are not overwritten by live deltas
+    const simulationActive = useRef(false);
+    const analyticsTimer = useRef(null);
 
-    // Initial data load
+    // Initial data load, then live deltas from the server instead of re-polling
     useEffect(() => {
         loadData();
+        const unsubscribe = api.subscribeToChanges(applyChange, (connected) => {
+            liveUpdates.current = connected;
+        });
+        return () => {
+            unsubscribe();
+            clearTimeout(analyticsTimer.current);
+        };
+        // eslint-disable-next-line react-hooks/exhaustive-deps
     }, []);
 
+    // The analytics summary is O(1) on the server; refetch it once per burst of changes
+    const scheduleAnalyticsRefresh = () => {
+        clearTimeout(analyticsTimer.current);
+        analyticsTimer.current = setTimeout(async () => {
+            try {
+                const analyticsData = await api.getAnalytics();
+                setAnalytics(prev => ({ ...analyticsData, stock_levels: prev ? prev.stock_levels : [] }));
+            } catch (err) {
+                console.error('Error refreshing analytics:', err);
+            }
+        }, 250);
+    };
+
+    // --- Apply one change-feed event to local state ---
+    const applyChange = (event) => {
+        switch (event.type) {
+            case 'product_added':
+                setProducts(prev => [...prev.filter(p => p.product_id !== event.product.product_id), event.product]);
+                setAnalytics(prev => prev && {
+                    ...prev,
+                    stock_levels: [...prev.stock_levels.filter(s => s.product_id !== event.product.product_id),
+                                   toStockLevel(event.product)]
+                });
+                break;
+            case 'product_updated':
+                setProducts(prev => prev.map(p => p.product_id === event.product_id ? { ...p, ...event.changes } : p));
+                setAnalytics(prev => prev && {
+                    ...prev,
+                    stock_levels: prev.stock_levels.map(s =>
+                        s.product_id === event.product_id ? toStockLevel({ ...s, ...event.changes }) : s)
+                });
+                break;
+            case 'product_removed':
+                setProducts(prev => prev.filter(p => p.product_id !== event.product_id));
+                setAnalytics(prev => prev && {
+                    ...prev,
+                    stock_levels: prev.stock_levels.filter(s => s.product_id !== event.product_id)
+                });
+                break;
+            case 'recommendation_entered':
+            case 'recommendation_updated':
+                if (!simulationActive.current) {
+                    setRecommendations(prev => sortRecommendations([
+                        ...prev.filter(r => r.product_id !== event.recommendation.product_id),
+                        event.recommendation
+                    ]));
+                }
+                break;
+            case 'recommendation_left':
+                if (!simulationActive.current) {
+                    setRecommendations(prev => prev.filter(r => r.product_id !== event.product_id));
+                }
+                break;
+            case 'resync':
+                loadData();
+                return;
+            default:
+                return;
+        }
+        scheduleAnalyticsRefresh();
+    };
+
     // --- Central function to fetch all data and update state ---
     const loadData = async () => {
         setError(null);
         try {
-            const [productsData, recommendationsData, analyticsData] = await Promise.all([
+            const [productsData, recommendationsData, analyticsData, stockLevelsData] = await Promise.all([
                 api.getProducts(),
                 api.getRecommendations(),
-                api.getAnalytics()
+                api.getAnalytics(),
+                api.getStockLevels()
             ]);
             setProducts(productsData.products);
             setRecommendations(recommendationsData.recommendations);
-            setAnalytics(analyticsData);
+            setAnalytics({ ...analyticsData, stock_levels: stockLevelsData.stock_levels });
         } catch (err) {
             setError(err.message || 'Failed to load data. Make sure the API is running.');
             console.error('Error loading data:', err);
@@ -50,7 +136,7 @@ const App = () => {
     const handleAddProduct = async (productData) => {
         try {
             await api.addProduct(productData);
-            await loadData(); // Refresh all data after adding
+            if (!liveUpdates.current) await loadData(); // Otherwise the change feed delivers the new product
         } catch (err) {
             setError(err.message); // Show specific error from backend
             console.error('Add product error:', err);
@@ -62,7 +148,7 @@ const App = () => {
         if (window.confirm(`Are you sure you want to delete product: ${productId}?`)) {
             try {
                 await api.deleteProduct(productId);
-                await loadData(); // Refresh all data after deleting
+                if (!liveUpdates.current) await loadData(); // Otherwise the change feed delivers the removal
             } catch (err) {
                 setError(err.message);
                 console.error('Delete product error:', err);
@@ -74,7 +160,7 @@ const App = () => {
     const handleCreateOrder = async (productId, quantity) => {
         try {
             await api.createOrder(productId, quantity);
-            await loadData(); // Refresh all data after creating order
+            if (!liveUpdates.current) await loadData(); // Otherwise the change feed delivers the update
             setActiveTab('overview');
         } catch (err) {
             setError(err.message);
@@ -86,6 +172,7 @@ const App = () => {
         setIsSimulating(true);
         try {
             const result = await api.simulateSpike(productId, multiplier, days);
+            simulationActive.current = true;
             setSimulationResult(result);
             setRecommendations(result.recommendations);
         } catch (err) {
@@ -126,6 +213,7 @@ const App = () => {
     };
 
     const clearSimulation = () => {
+        simulationActive.current = false;
         setSimulationResult(null);
         loadData(); // Reload original data
     };
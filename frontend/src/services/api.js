@@ -29,12 +29,34 @@ class ApiService {
         }
     }
 
-    getProducts() {
-        return this.request('/products');
+    // Optional params: criticality, needs_reorder, min_days_remaining,
+    // max_days_remaining, sort, order, limit, cursor
+    getProducts(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(query ? `/products?${query}` : '/products');
     }
 
-    getRecommendations() {
-        return this.request('/recommendations');
+    // Optional params: limit (N most urgent), max_days_remaining
+    getRecommendations(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(query ? `/recommendations?${query}` : '/recommendations');
+    }
+
+    planPurchases(budget, warehouse) {
+        return this.request('/plan', {
+            method: 'POST',
+            body: JSON.stringify({ budget, warehouse }),
+        });
+    }
+
+    // params: horizon_days, points, limit, warehouse, product_id
+    getProjection(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(query ? `/projection?${query}` : '/projection');
+    }
+
+    getWarehouses() {
+        return this.request('/warehouses');
     }
 
     // --- NEW: Function to Add a Product ---
@@ -62,6 +84,14 @@ class ApiService {
         });
     }
 
+    // orders: [{product_id, quantity}] or rows of getRecommendations()
+    createOrders(orders) {
+        return this.request('/orders/batch', {
+            method: 'POST',
+            body: JSON.stringify({ orders }),
+        });
+    }
+
     simulateSpike(productId, multiplier, days) {
         return this.request('/simulate-spike', {
             method: 'POST',
@@ -77,6 +107,29 @@ class ApiService {
         return this.request('/analytics');
     }
 
+    // Optional params: sort, order, limit, cursor
+    getStockLevels(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(query ? `/analytics/stock-levels?${query}` : '/analytics/stock-levels');
+    }
+
+    // Subscribe to the server-sent change feed. onEvent receives each delta
+    // event ({ type, version, ... }); the browser reconnects and resumes
+    // automatically. Returns a function that closes the subscription.
+    subscribeToChanges(onEvent, onStatus = () => {}) {
+        const source = new EventSource(`${this.baseURL}/changes/stream`);
+        const eventTypes = [
+            'product_added', 'product_updated', 'product_removed',
+            'recommendation_entered', 'recommendation_updated', 'recommendation_left', 'resync'
+        ];
+        eventTypes.forEach(type => {
+            source.addEventListener(type, (message) => onEvent(JSON.parse(message.data)));
+        });
+        source.onopen = () => onStatus(true);
+        source.onerror = () => onStatus(false);
+        return () => source.close();
+    }
+
     exportData(format) {
         return this.request('/export', {
             method: 'POST',